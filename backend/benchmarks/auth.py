@@ -0,0 +1,56 @@
+"""Authenticated request throughput with and without the principal cache.
+
+    python -m backend.benchmarks.auth --concurrency 32 --seconds 10
+"""
+
+import argparse
+import asyncio
+import time
+from ..helpers.db_conf import ENGINE
+from ..main import app
+from ..services.UserService import PRINCIPAL_CACHE
+from .common import asgi_request, ensure_user, percentile
+
+
+async def run(path: str, headers: dict, concurrency: int, seconds: float):
+    samples = []
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status, _ = await asgi_request(app, "GET", path, headers)
+            samples.append((time.perf_counter() - start) * 1000)
+            assert status == 200, status
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return len(samples) / (time.perf_counter() - start), samples
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default="/orders/?limit=1")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    _, token = await ensure_user()
+    headers = {"Authorization": f"Bearer {token}"}
+    ttl = PRINCIPAL_CACHE.ttl
+
+    print(f"{'principal cache':<16} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for label, cache_ttl in (("off", 0), ("on", ttl)):
+        PRINCIPAL_CACHE.ttl = cache_ttl
+        PRINCIPAL_CACHE.clear()
+        await run(args.path, headers, args.concurrency, 1)
+        rps, samples = await run(args.path, headers, args.concurrency, args.seconds)
+        print(
+            f"{label:<16} {rps:>9.0f} {percentile(samples, 50):>8.2f} "
+            f"{percentile(samples, 95):>8.2f}"
+        )
+    await ENGINE.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
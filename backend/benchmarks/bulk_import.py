@@ -0,0 +1,118 @@
+"""Throughput of POST /cars/bulk and PATCH /cars/stock for large batches.
+
+    python -m backend.benchmarks.bulk_import --rows 100000
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import random
+import time
+from sqlalchemy import select
+from ..helpers.db_conf import AsyncSessionLocal, ENGINE, ORM_BASE
+from ..main import app
+from ..models import CarModel
+from ..schemas.CarSchema import CarBase
+from .common import asgi_request
+from .wire_format import make_cars
+
+COLUMNS = list(CarBase.model_fields)
+
+
+def rows_for(cars: list[dict], ids: list[int] = None) -> list[dict]:
+    rows = []
+    for i, car in enumerate(cars):
+        row = {name: car[name] for name in COLUMNS}
+        row["price_usd"] = float(row["price_usd"])
+        row["discount_percent"] = float(row["discount_percent"])
+        if ids:
+            row["id"] = ids[i]
+        rows.append(row)
+    return rows
+
+
+def chunked(data: bytes, size: int = 64 * 1024) -> list[bytes]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+def as_ndjson(rows: list[dict]) -> bytes:
+    return "\n".join(json.dumps(row) for row in rows).encode()
+
+
+def as_csv(rows: list[dict]) -> bytes:
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=list(rows[0]), lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(rows)
+    return out.getvalue().encode()
+
+
+async def timed(label: str, rows: int, method: str, path: str, headers, body):
+    start = time.perf_counter()
+    status, response = await asgi_request(app, method, path, headers, body)
+    elapsed = time.perf_counter() - start
+    result = json.loads(response)
+    assert status == 200 and not result["failed"], (status, result)
+    print(f"{label:<26} {rows:>9,} {elapsed:>8.2f} s {rows / elapsed:>10,.0f} rows/s")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    async with ENGINE.begin() as conn:
+        await conn.run_sync(ORM_BASE.metadata.create_all)
+    cars = make_cars(args.rows, seed=1)
+    ndjson = {"content-type": "application/x-ndjson"}
+
+    await timed(
+        "POST /cars/bulk ndjson",
+        args.rows,
+        "POST",
+        "/cars/bulk",
+        ndjson,
+        chunked(as_ndjson(rows_for(cars))),
+    )
+    await timed(
+        "POST /cars/bulk csv",
+        args.rows,
+        "POST",
+        "/cars/bulk",
+        {"content-type": "text/csv"},
+        chunked(as_csv(rows_for(cars))),
+    )
+    async with AsyncSessionLocal() as session:
+        ids = (
+            await session.execute(
+                select(CarModel.id).order_by(CarModel.id.desc()).limit(args.rows)
+            )
+        ).scalars().all()
+    await timed(
+        "POST /cars/bulk upsert",
+        len(ids),
+        "POST",
+        "/cars/bulk",
+        ndjson,
+        chunked(as_ndjson(rows_for(cars[: len(ids)], ids))),
+    )
+    rng = random.Random(2)
+    stock = [
+        {"id": car_id, "num_in_stock": rng.randint(0, 20), "price_usd": 25000.0}
+        for car_id in ids
+    ]
+    await timed(
+        "PATCH /cars/stock",
+        len(stock),
+        "PATCH",
+        "/cars/stock",
+        {"content-type": "application/json"},
+        json.dumps(stock).encode(),
+    )
+    await ENGINE.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,135 @@
+"""Concurrent checkouts against a few hot cars: throughput and an oversell check.
+
+    python -m backend.benchmarks.checkout --orders 500 --cars 3 --stock 200
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from sqlalchemy import func, select, update
+from ..helpers.db_conf import AsyncSessionLocal, ENGINE
+from ..models import CarModel
+from ..models.OrderItemModel import order_items
+from ..main import app
+from .common import asgi_request, ensure_cars, ensure_user, percentile
+
+
+async def stock_levels(car_ids: list[int]) -> dict[int, int]:
+    async with AsyncSessionLocal() as session:
+        rows = await session.execute(
+            select(CarModel.id, CarModel.num_in_stock).where(CarModel.id.in_(car_ids))
+        )
+        return dict(rows.all())
+
+
+async def reserved(order_ids: list[int]) -> dict[int, int]:
+    async with AsyncSessionLocal() as session:
+        rows = await session.execute(
+            select(order_items.c.car_id, func.sum(order_items.c.quantity))
+            .where(order_items.c.order_id.in_(order_ids))
+            .group_by(order_items.c.car_id)
+        )
+        return {car_id: int(total) for car_id, total in rows.all()}
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--cars", type=int, default=3)
+    parser.add_argument("--stock", type=int, default=200)
+    parser.add_argument("--max-quantity", type=int, default=3)
+    args = parser.parse_args()
+
+    await ensure_cars(args.cars)
+    _, token = await ensure_user("checkout")
+    headers = {
+        "authorization": f"Bearer {token}",
+        "content-type": "application/json",
+    }
+    async with AsyncSessionLocal() as session:
+        car_ids = (
+            await session.execute(
+                select(CarModel.id).order_by(CarModel.id).limit(args.cars)
+            )
+        ).scalars().all()
+        await session.execute(
+            update(CarModel)
+            .where(CarModel.id.in_(car_ids))
+            .values(num_in_stock=args.stock)
+        )
+        await session.commit()
+
+    rng = random.Random(42)
+    bodies = [
+        json.dumps(
+            {
+                "items": [
+                    {"car_id": car_id, "quantity": rng.randint(1, args.max_quantity)}
+                    for car_id in rng.sample(car_ids, rng.randint(1, len(car_ids)))
+                ]
+            }
+        ).encode()
+        for _ in range(args.orders)
+    ]
+    gate = asyncio.Semaphore(args.concurrency)
+    statuses, samples, order_ids = {}, [], []
+
+    async def place(body: bytes):
+        async with gate:
+            start = time.perf_counter()
+            status, payload = await asgi_request(app, "POST", "/orders/", headers, body)
+            samples.append((time.perf_counter() - start) * 1000)
+        statuses[status] = statuses.get(status, 0) + 1
+        if status == 201:
+            order_ids.append(json.loads(payload)["id"])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(place(body) for body in bodies))
+    elapsed = time.perf_counter() - start
+
+    left = await stock_levels(car_ids)
+    taken = await reserved(order_ids)
+    oversold = [
+        car_id
+        for car_id in car_ids
+        if left[car_id] < 0 or left[car_id] + taken.get(car_id, 0) != args.stock
+    ]
+
+    print(
+        f"{args.orders} orders, {args.concurrency} concurrent, "
+        f"{len(car_ids)} hot cars x {args.stock} in stock"
+    )
+    print(
+        f"{'orders/s':>9} {'placed':>7} {'409s':>6} {'other':>6}"
+        f" {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    print(
+        f"{args.orders / elapsed:>9.1f} {statuses.get(201, 0):>7} "
+        f"{statuses.get(409, 0):>6} "
+        f"{sum(n for s, n in statuses.items() if s not in (201, 409)):>6} "
+        f"{percentile(samples, 50):>8.2f} {percentile(samples, 95):>8.2f} "
+        f"{percentile(samples, 99):>8.2f}"
+    )
+    for car_id in car_ids:
+        print(
+            f"car {car_id}: {taken.get(car_id, 0)} reserved, {left[car_id]} left"
+        )
+    print("oversell: " + (f"cars {oversold}" if oversold else "none"))
+
+    # Cancelling every placed order must hand all the stock back.
+    for order_id in order_ids:
+        status, _ = await asgi_request(app, "DELETE", f"/orders/{order_id}", headers)
+        assert status == 204, status
+    restored = await stock_levels(car_ids)
+    print(
+        "restored after cancel: "
+        + ("yes" if all(n == args.stock for n in restored.values()) else "no")
+    )
+    await ENGINE.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
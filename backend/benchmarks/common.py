@@ -0,0 +1,137 @@
+import re
+import statistics
+from sqlalchemy import func, select, text
+from ..helpers.db_conf import AsyncSessionLocal, ENGINE, ORM_BASE
+from ..helpers.hash import hash_password
+from ..helpers.security import create_access_token
+from ..models import CarModel, UserModel
+
+FILL_CARS = """
+INSERT INTO cars (
+    brand, model, year, body_type, engine_type, engine_size_liters, horsepower,
+    transmission, fuel_type, mileage_km, top_speed_kmh, color, features,
+    price_usd, discount_percent, num_in_stock, description
+)
+SELECT
+    (ARRAY['Toyota','Honda','Ford','Chevrolet','BMW','Mercedes-Benz','Audi',
+           'Volkswagen','Nissan','Hyundai','Tesla','Subaru','Mazda','Kia','Lexus'])[pick(15)],
+    (ARRAY['Camry','Civic','Mustang','Accord','F-150','Model 3','X5','A4',
+           'Passat','Altima','Elantra'])[pick(11)],
+    2014 + pick(11),
+    (ARRAY['Sedan','Hatchback','Coupe','SUV','Truck','Convertible','Minivan','Wagon'])[pick(8)],
+    (ARRAY['Inline-4','V6','V8','Electric','Hybrid','Inline-6'])[pick(6)],
+    1.0 + pick(50) / 10.0,
+    100 + pick(500),
+    (ARRAY['Automatic','Manual','CVT','Dual-Clutch'])[pick(4)],
+    (ARRAY['Gasoline','Diesel','Electric','Hybrid','Plug-in Hybrid'])[pick(5)],
+    pick(200000),
+    150 + pick(150),
+    (ARRAY['Black','White','Silver','Red','Blue','Gray','Green','Yellow','Orange'])[pick(9)],
+    (ARRAY['Bluetooth','Cruise Control','Backup Camera','Apple CarPlay','Android Auto',
+           'Lane Assist','Leather Seats'])[pick(7)] || ', ' ||
+    (ARRAY['Premium Audio','Navigation','Sunroof','Heated Seats','Adaptive Headlights',
+           'Blind Spot Monitoring'])[pick(6)],
+    10000 + pick(90000),
+    pick(200) / 10.0,
+    pick(21) - 1,
+    (ARRAY['Reliable','Sporty','Powerful','Luxurious','Efficient','Versatile',
+           'Eco-friendly'])[pick(7)] || ' car for ' ||
+    (ARRAY['daily commuting','family use','performance enthusiasts','long trips'])[pick(4)] || '.'
+FROM generate_series(1, :n) AS g
+"""
+# pick(n) is a uniform 1..n draw; setseed() keeps the catalog reproducible.
+FILL_CARS = re.sub(r"pick\((\d+)\)", r"(1 + floor(random() * \1)::int)", FILL_CARS)
+
+
+async def ensure_cars(rows: int):
+    async with ENGINE.begin() as conn:
+        await conn.run_sync(ORM_BASE.metadata.create_all)
+    async with AsyncSessionLocal() as session:
+        count = (await session.execute(select(func.count(CarModel.id)))).scalar_one()
+        if count < rows:
+            print(f"seeding {rows - count:,} cars")
+            await session.execute(text("SELECT setseed(0.42)"))
+            await session.execute(text(FILL_CARS), {"n": rows - count})
+            await session.commit()
+            await session.execute(text("ANALYZE cars"))
+            await session.commit()
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100, method="inclusive")[int(pct) - 1]
+
+
+async def ensure_user(username: str = "bench") -> tuple[int, str]:
+    async with AsyncSessionLocal() as session:
+        user = (
+            await session.execute(
+                select(UserModel).where(UserModel.username == username)
+            )
+        ).scalar_one_or_none()
+        if user is None:
+            user = UserModel(
+                username=username,
+                email=f"{username}@bench.local",
+                hashed_password=await hash_password(username),
+            )
+            session.add(user)
+            await session.flush()
+        user_id = user.id
+        await session.commit()
+    return user_id, create_access_token({"sub": username})
+
+
+async def asgi_request(
+    app,
+    method: str,
+    path: str,
+    headers: dict = None,
+    body: bytes | list = b"",
+    response_headers: dict = None,
+) -> tuple[int, bytes]:
+    """Drive one request through the ASGI app in-process, without a server.
+
+    A list body is sent as separate chunks, like a streamed upload. Response
+    headers are copied into `response_headers` when given.
+    """
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": [
+            (k.lower().encode(), v.encode()) for k, v in (headers or {}).items()
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    pending = [body] if isinstance(body, bytes) else list(body) or [b""]
+    status, chunks = 0, []
+
+    async def receive():
+        if not pending:
+            return {"type": "http.disconnect"}
+        chunk = pending.pop(0)
+        return {"type": "http.request", "body": chunk, "more_body": bool(pending)}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            if response_headers is not None:
+                response_headers.update(
+                    (k.decode(), v.decode()) for k, v in message["headers"]
+                )
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
@@ -0,0 +1,59 @@
+"""Checks that a write committing late is still picked up by the next
+incremental export.
+
+Updates a car in a transaction held open past the export's watermark, as a
+long import does, and exits non-zero if its updated_at falls at or below the
+`since` the next run would use.
+
+    python -m backend.benchmarks.export_horizon --hold 8
+"""
+
+import argparse
+import asyncio
+from datetime import timedelta
+from sqlalchemy import func, select, update
+from ..helpers.config import get_settings
+from ..helpers.db_conf import AsyncSessionLocal, ENGINE, REPLICAS
+from ..helpers.export import export_horizon
+from ..models import CarModel
+from .common import ensure_cars
+
+SETTINGS = get_settings()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hold", type=float, default=8.0)
+    args = parser.parse_args()
+
+    await ensure_cars(1)
+    async with AsyncSessionLocal() as writer:
+        car_id = (await writer.execute(select(func.min(CarModel.id)))).scalar_one()
+        await writer.execute(
+            update(CarModel)
+            .where(CarModel.id == car_id)
+            .values(updated_at=func.now())
+        )
+        await asyncio.sleep(args.hold)
+        async with AsyncSessionLocal() as session, REPLICAS.session() as reader:
+            until = await export_horizon(session, reader)
+        await writer.commit()
+
+    async with AsyncSessionLocal() as session:
+        updated_at = await session.scalar(
+            select(CarModel.updated_at).where(CarModel.id == car_id)
+        )
+    since = until - timedelta(seconds=SETTINGS.EXPORT_WATERMARK_OVERLAP_SECONDS)
+    print(
+        f"write started {updated_at}, committed {args.hold:.0f} s later; "
+        f"watermark {until}, next since {since}"
+    )
+    await ENGINE.dispose()
+    if updated_at <= since:
+        print("the next incremental export would miss it")
+        raise SystemExit(1)
+    print("the next incremental export picks it up")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
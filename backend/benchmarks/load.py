@@ -0,0 +1,369 @@
+"""End-to-end load test: throughput, tail latency and queries per route.
+
+Virtual users loop over a weighted mix of catalog browsing, logins, and
+creating, listing, updating and deleting their own orders. Requests go through
+the full app in-process, or to a running server with --url (needs httpx).
+Results are written as JSON; --baseline compares the run with an earlier one
+and exits non-zero on a regression.
+
+    python -m backend.benchmarks.load --users 20 --seconds 30 --out base.json
+    python -m backend.benchmarks.load --users 20 --seconds 30 --baseline base.json
+    python -m backend.benchmarks.load --compare base.json head.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from ..helpers.db_conf import ENGINE
+from ..main import app
+from .common import asgi_request, ensure_cars, percentile
+
+FORM = {"content-type": "application/x-www-form-urlencoded"}
+JSON = {"content-type": "application/json"}
+MIX = {"browse": 6, "login": 1, "orders": 3}
+# Fewer requests than this in either run make a route's percentiles too noisy
+# to flag; its query counts are still compared.
+MIN_SAMPLES = 50
+SEARCH_TERMS = ["sporty", "family", "electric", "luxurious", "efficient", "sedan"]
+
+
+class AppClient:
+    def __init__(self, target):
+        self.target = target
+
+    async def request(self, method, path, headers=None, body=b""):
+        response_headers = {}
+        status, content = await asgi_request(
+            self.target, method, path, headers, body, response_headers
+        )
+        return status, response_headers, content
+
+    async def close(self):
+        pass
+
+
+class HttpClient:
+    def __init__(self, url: str, connections: int):
+        if httpx is None:
+            raise SystemExit("--url needs httpx: pip install httpx")
+        self.client = httpx.AsyncClient(
+            base_url=url,
+            timeout=30,
+            limits=httpx.Limits(max_connections=connections),
+        )
+
+    async def request(self, method, path, headers=None, body=b""):
+        response = await self.client.request(
+            method, path, headers=headers, content=body
+        )
+        return response.status_code, response.headers, response.content
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class Recorder:
+    def __init__(self, client):
+        self.client = client
+        # "METHOD /route/{param}" -> latencies (ms), errors, query counts
+        self.routes = {}
+        self.elapsed = 0.0
+
+    async def call(self, route, path, expect=200, headers=None, body=b""):
+        method = route.split(" ", 1)[0]
+        start = time.perf_counter()
+        status, response_headers, content = await self.client.request(
+            method, path, headers, body
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+        stats = self.routes.setdefault(
+            route, {"latencies": [], "errors": 0, "queries": []}
+        )
+        stats["latencies"].append(elapsed)
+        if status != expect:
+            stats["errors"] += 1
+        queries = response_headers.get("x-query-count")
+        if queries is not None:
+            stats["queries"].append(int(queries))
+        return status, content
+
+
+async def browse(rec: Recorder, rng: random.Random, user: dict, car_ids: list):
+    status, content = await rec.call("GET /cars/", "/cars/?cursor=&limit=20")
+    if status == 200:
+        cursor = json.loads(content)["next_cursor"]
+        if cursor:
+            await rec.call("GET /cars/", f"/cars/?cursor={quote(cursor)}&limit=20")
+    await rec.call(
+        "GET /cars/search",
+        f"/cars/search?q={rng.choice(SEARCH_TERMS)}&limit=20",
+    )
+    for car_id in rng.sample(car_ids, 2):
+        await rec.call("GET /cars/{car_id}", f"/cars/{car_id}")
+
+
+async def login(rec: Recorder, rng: random.Random, user: dict, car_ids: list):
+    body = f"username={user['username']}&password={user['username']}".encode()
+    status, content = await rec.call(
+        "POST /users/token", "/users/token", 200, FORM, body
+    )
+    if status == 200:
+        token = json.loads(content)["access_token"]
+        user["headers"]["Authorization"] = f"Bearer {token}"
+    await rec.call("GET /users/me", "/users/me", headers=user["headers"])
+
+
+def order_body(rng: random.Random, car_ids: list) -> bytes:
+    cars = rng.sample(car_ids, rng.randint(1, 3))
+    return json.dumps({"items": [{"car_id": car_id} for car_id in cars]}).encode()
+
+
+async def orders(rec: Recorder, rng: random.Random, user: dict, car_ids: list):
+    headers = {**user["headers"], **JSON}
+    status, content = await rec.call(
+        "POST /orders/", "/orders/", 201, headers, order_body(rng, car_ids)
+    )
+    await rec.call("GET /orders/", "/orders/?limit=20", headers=headers)
+    if status != 201:
+        return
+    order_id = json.loads(content)["id"]
+    await rec.call(
+        "GET /orders/{order_id}", f"/orders/{order_id}?expand=cars", headers=headers
+    )
+    await rec.call(
+        "PUT /orders/{order_id}",
+        f"/orders/{order_id}",
+        200,
+        headers,
+        order_body(rng, car_ids),
+    )
+    # Deleting puts the stock back, so long runs do not sell out the catalog.
+    await rec.call("DELETE /orders/{order_id}", f"/orders/{order_id}", 204, headers)
+
+
+SCENARIOS = {"browse": browse, "login": login, "orders": orders}
+
+
+async def setup(client, users: int, seed: int) -> tuple[list, list]:
+    accounts = []
+    for i in range(users):
+        username = f"load{seed}_{i}"
+        account = {
+            "username": username,
+            "email": f"{username}@load.local",
+            "password": username,
+        }
+        body = json.dumps(account).encode()
+        # 400 means the account is left over from an earlier run.
+        await client.request("POST", "/users/signup", JSON, body)
+        form = f"username={username}&password={username}".encode()
+        status, _, content = await client.request("POST", "/users/token", FORM, form)
+        assert status == 200, f"login failed for {username}: {status}"
+        token = json.loads(content)["access_token"]
+        accounts.append(
+            {"username": username, "headers": {"Authorization": f"Bearer {token}"}}
+        )
+    status, _, content = await client.request("GET", "/cars/?limit=500")
+    assert status == 200, f"GET /cars/ failed: {status}"
+    car_ids = [car["id"] for car in json.loads(content) if car["num_in_stock"] >= 10]
+    assert len(car_ids) >= 3, "need cars with stock to place orders"
+    return accounts, car_ids
+
+
+async def drive(client, accounts, car_ids, seconds: float, seed: int) -> Recorder:
+    rec = Recorder(client)
+    names, weights = list(MIX), list(MIX.values())
+    started = time.perf_counter()
+    deadline = started + seconds
+
+    async def virtual_user(i: int, user: dict):
+        rng = random.Random(f"{seed}:{i}")
+        while time.perf_counter() < deadline:
+            scenario = rng.choices(names, weights)[0]
+            await SCENARIOS[scenario](rec, rng, user, car_ids)
+
+    await asyncio.gather(*(virtual_user(i, user) for i, user in enumerate(accounts)))
+    # Scenarios in progress at the deadline run to completion.
+    rec.elapsed = time.perf_counter() - started
+    return rec
+
+
+def summarize(rec: Recorder) -> dict:
+    routes = {}
+    for route, stats in sorted(rec.routes.items()):
+        latencies = stats["latencies"]
+        queries = stats["queries"]
+        routes[route] = {
+            "requests": len(latencies),
+            "errors": stats["errors"],
+            "rps": len(latencies) / rec.elapsed,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "max_ms": max(latencies),
+            "queries_avg": sum(queries) / len(queries) if queries else None,
+            "queries_max": max(queries) if queries else None,
+        }
+    requests = sum(r["requests"] for r in routes.values())
+    return {
+        "requests": requests,
+        "errors": sum(r["errors"] for r in routes.values()),
+        "rps": requests / rec.elapsed,
+        "routes": routes,
+    }
+
+
+def commit() -> str:
+    try:
+        sha = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{sha}-dirty" if dirty else sha
+
+
+def report(result: dict):
+    print(
+        f"{'route':<26} {'reqs':>7} {'err':>5} {'rps':>8} {'p50 ms':>8} "
+        f"{'p95 ms':>8} {'p99 ms':>8} {'queries':>7}"
+    )
+    for route, r in result["routes"].items():
+        queries = "-" if r["queries_avg"] is None else f"{r['queries_avg']:.1f}"
+        print(
+            f"{route:<26} {r['requests']:>7} {r['errors']:>5} {r['rps']:>8.1f} "
+            f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {queries:>7}"
+        )
+    print(
+        f"total: {result['requests']} requests, {result['errors']} errors, "
+        f"{result['rps']:.1f} req/s"
+    )
+
+
+def _cell(old, new, flagged: bool) -> str:
+    return f"{old:>7.1f} {new:>7.1f}{'!' if flagged else ' '}"
+
+
+def compare(base: dict, head: dict, threshold: float) -> list[str]:
+    """Print per-route changes and return the regressions.
+
+    A route regresses when p95 latency grows or throughput drops by more than
+    `threshold` percent, or when it starts running more queries.
+    """
+    print(f"{base['commit']} -> {head['commit']} (old new, ! = regression)")
+    print(
+        f"{'route':<26} {'p50 ms':>16} {'p95 ms':>16} {'p99 ms':>16} "
+        f"{'rps':>16} {'max queries':>16}"
+    )
+    regressions = []
+    limit = 1 + threshold / 100
+    for route, new in head["routes"].items():
+        old = base["routes"].get(route)
+        if old is None:
+            print(f"{route:<26} (new)")
+            continue
+        enough = min(old["requests"], new["requests"]) >= MIN_SAMPLES
+        slower = enough and new["p95_ms"] > old["p95_ms"] * limit
+        dropped = enough and new["rps"] * limit < old["rps"]
+        old_queries, new_queries = old["queries_max"] or 0, new["queries_max"] or 0
+        print(
+            f"{route:<26} {_cell(old['p50_ms'], new['p50_ms'], False)} "
+            f"{_cell(old['p95_ms'], new['p95_ms'], slower)} "
+            f"{_cell(old['p99_ms'], new['p99_ms'], False)} "
+            f"{_cell(old['rps'], new['rps'], dropped)} "
+            f"{_cell(old_queries, new_queries, new_queries > old_queries)}"
+        )
+        if slower:
+            regressions.append(
+                f"{route}: p95 {old['p95_ms']:.1f} -> {new['p95_ms']:.1f} ms"
+            )
+        if dropped:
+            regressions.append(f"{route}: {old['rps']:.1f} -> {new['rps']:.1f} req/s")
+        if new_queries > old_queries:
+            regressions.append(f"{route}: {old_queries} -> {new_queries} queries")
+    return regressions
+
+
+def load_result(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20, help="virtual users")
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--url", help="load a running server instead of the app")
+    parser.add_argument("--out", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare with an earlier results file")
+    parser.add_argument(
+        "--compare", nargs=2, metavar=("BASE", "HEAD"), help="compare two files"
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=20, help="allowed regression, percent"
+    )
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(*map(load_result, args.compare), args.threshold)
+        if regressions:
+            raise SystemExit("regressions:\n" + "\n".join(regressions))
+        return
+
+    if args.url:
+        client = HttpClient(args.url, args.users)
+    else:
+        await ensure_cars(1000)
+        client = AppClient(app)
+    accounts, car_ids = await setup(client, args.users, args.seed)
+    await drive(client, accounts, car_ids, args.warmup, args.seed)
+    started_at = datetime.now(timezone.utc).isoformat()
+    rec = await drive(client, accounts, car_ids, args.seconds, args.seed)
+    await client.close()
+    await ENGINE.dispose()
+
+    result = {
+        "commit": commit(),
+        "started_at": started_at,
+        "target": args.url or "in-process",
+        "config": {
+            "users": args.users,
+            "seconds": args.seconds,
+            "seed": args.seed,
+            "mix": MIX,
+        },
+        **summarize(rec),
+    }
+    report(result)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        regressions = compare(load_result(args.baseline), result, args.threshold)
+        if regressions:
+            raise SystemExit("regressions:\n" + "\n".join(regressions))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
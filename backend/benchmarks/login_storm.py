@@ -0,0 +1,85 @@
+"""GET /cars latency while a burst of logins runs bcrypt, inline vs worker pool.
+
+    python -m backend.benchmarks.login_storm --logins 16 --seconds 10
+"""
+
+import argparse
+import asyncio
+import time
+from ..helpers import hash as hasher
+from ..helpers.db_conf import ENGINE
+from ..main import app
+from .common import asgi_request, ensure_user, percentile
+
+FORM = {"content-type": "application/x-www-form-urlencoded"}
+
+
+async def probe(path: str, seconds: float, interval: float) -> list[float]:
+    samples = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        status, _ = await asgi_request(app, "GET", path)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert status == 200, status
+        await asyncio.sleep(interval)
+    return samples
+
+
+async def storm(username: str, workers: int, seconds: float) -> dict:
+    counts = {"ok": 0, "rejected": 0}
+    body = f"username={username}&password={username}".encode()
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            status, _ = await asgi_request(app, "POST", "/users/token", FORM, body)
+            counts["ok" if status == 200 else "rejected"] += 1
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return counts
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default="/cars/?limit=20")
+    parser.add_argument("--logins", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--interval", type=float, default=0.01)
+    args = parser.parse_args()
+
+    username = f"storm{hasher.SETTINGS.SALT_ROUNDS}"
+    await ensure_user(username)
+    await probe(args.path, 1, args.interval)
+    executor = hasher.HASH_EXECUTOR
+
+    print(
+        f"salt rounds {hasher.SETTINGS.SALT_ROUNDS}, {args.logins} concurrent logins, "
+        f"{hasher.SETTINGS.HASH_WORKERS} hash workers"
+    )
+    print(
+        f"{'mode':<14} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+        f" {'logins/s':>9} {'503s':>6}"
+    )
+    for label, mode_executor, logins in (
+        ("idle", executor, 0),
+        ("storm inline", None, args.logins),
+        ("storm pool", executor, args.logins),
+    ):
+        hasher.HASH_EXECUTOR = mode_executor
+        samples, counts = await asyncio.gather(
+            probe(args.path, args.seconds, args.interval),
+            storm(username, logins, args.seconds),
+        )
+        print(
+            f"{label:<14} {percentile(samples, 50):>8.2f} "
+            f"{percentile(samples, 95):>8.2f} {percentile(samples, 99):>8.2f} "
+            f"{max(samples):>8.2f} {counts['ok'] / args.seconds:>9.1f} "
+            f"{counts['rejected']:>6}"
+        )
+    hasher.HASH_EXECUTOR = executor
+    await ENGINE.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
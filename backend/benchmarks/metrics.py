@@ -0,0 +1,136 @@
+"""Overhead of always-on metrics: the HTTP middleware, SQL timing and a scrape.
+
+    python -m backend.benchmarks.metrics --requests 20000 --statements 5000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from fastapi import FastAPI
+from sqlalchemy import event, select
+from ..helpers.db_conf import ENGINE, SQLALCHEMY_DATABASE_URL, make_engine
+from ..helpers.metrics import (
+    REGISTRY,
+    MetricsMiddleware,
+    after_cursor_execute,
+    before_cursor_execute,
+    instrument_engine,
+)
+from ..main import app
+from ..models import CarModel
+from .common import asgi_request, ensure_cars, percentile
+
+ROUNDS = 9
+SQL_LISTENERS = (
+    ("before_cursor_execute", before_cursor_execute),
+    ("after_cursor_execute", after_cursor_execute),
+)
+
+
+def bare_app() -> FastAPI:
+    bench = FastAPI()
+
+    @bench.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        return {"id": item_id}
+
+    return bench
+
+
+async def per_request_us(target, requests: int) -> float:
+    start = time.perf_counter()
+    for i in range(requests):
+        await asgi_request(target, "GET", f"/items/{i}")
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def per_statement_us(conn, car_ids: list[int], statements: int) -> float:
+    start = time.perf_counter()
+    for i in range(statements):
+        result = await conn.execute(
+            select(CarModel.id, CarModel.price_usd).where(
+                CarModel.id == car_ids[i % len(car_ids)]
+            )
+        )
+        result.all()
+    return (time.perf_counter() - start) / statements * 1e6
+
+
+def set_sql_timing(engine, enabled: bool):
+    for name, listener in SQL_LISTENERS:
+        if enabled:
+            event.listen(engine.sync_engine, name, listener)
+        else:
+            event.remove(engine.sync_engine, name, listener)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--statements", type=int, default=5000)
+    args = parser.parse_args()
+
+    # The middleware adds a fixed cost per request, so measure it on the
+    # cheapest possible route, where it is the largest share.
+    bench = bare_app()
+    instrumented = MetricsMiddleware(bench)
+    plain, timed = [], []
+    for _ in range(ROUNDS):
+        plain.append(await per_request_us(bench, args.requests // ROUNDS))
+        timed.append(await per_request_us(instrumented, args.requests // ROUNDS))
+    plain_us, timed_us = statistics.median(plain), statistics.median(timed)
+    print(f"{'case':<28} {'plain us':>9} {'timed us':>9} {'overhead us':>12}")
+    print(
+        f"{'request (trivial route)':<28} {plain_us:>9.1f} {timed_us:>9.1f} "
+        f"{timed_us - plain_us:>12.1f}"
+    )
+
+    await ensure_cars(1000)
+    async with ENGINE.connect() as conn:
+        car_ids = (
+            await conn.execute(select(CarModel.id).order_by(CarModel.id).limit(1000))
+        ).scalars().all()
+    # Same connection both ways, so only the listeners differ between rounds.
+    engine = make_engine(SQLALCHEMY_DATABASE_URL)
+    instrument_engine(engine, "bench")
+    plain, timed = [], []
+    per_round = args.statements // ROUNDS
+    async with engine.connect() as conn:
+        await per_statement_us(conn, car_ids, 200)
+        for _ in range(ROUNDS):
+            set_sql_timing(engine, False)
+            plain.append(await per_statement_us(conn, car_ids, per_round))
+            set_sql_timing(engine, True)
+            timed.append(await per_statement_us(conn, car_ids, per_round))
+    plain_us, timed_us = statistics.median(plain), statistics.median(timed)
+    print(
+        f"{'SQL statement (pk lookup)':<28} {plain_us:>9.1f} {timed_us:>9.1f} "
+        f"{timed_us - plain_us:>12.1f}"
+    )
+    await engine.dispose()
+
+    # For scale: what real requests cost, and what a scrape costs once they
+    # have filled the registry.
+    for path in ("/cars/?limit=20", f"/cars/{car_ids[0]}"):
+        samples = []
+        for _ in range(200):
+            start = time.perf_counter()
+            await asgi_request(app, "GET", path)
+            samples.append((time.perf_counter() - start) * 1e6)
+        print(f"GET {path}: p50 {percentile(samples, 50):.0f} us")
+    samples = []
+    for _ in range(50):
+        start = time.perf_counter()
+        body = REGISTRY.render()
+        samples.append((time.perf_counter() - start) * 1e3)
+    lines = body.count(b"\n")
+    print(
+        f"scrape: {len(body):,} bytes, {lines:,} lines, "
+        f"p50 {percentile(samples, 50):.2f} ms"
+    )
+    await ENGINE.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
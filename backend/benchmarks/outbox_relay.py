@@ -0,0 +1,69 @@
+"""Checks that relays running on several replicas at once publish each
+aggregate's events in outbox id order.
+
+Records events for a few cars, runs the relays concurrently against a
+publisher that records what it is handed, and exits non-zero if any car's
+events come out of order. Relays every unpublished event, so run it against
+a database without a live broker to feed.
+
+    python -m backend.benchmarks.outbox_relay --events 2000 --relays 4
+"""
+
+import argparse
+import asyncio
+from ..helpers.db_conf import AsyncSessionLocal, ENGINE
+from ..helpers.outbox import record_event, relay_outbox
+
+
+class RecordingPublisher:
+    def __init__(self):
+        self.published = []
+
+    async def publish_batch(self, messages, exchange: str):
+        for message, _ in messages:
+            # Yield between messages so concurrent relays interleave.
+            await asyncio.sleep(0)
+            headers = message.headers
+            self.published.append(
+                (
+                    (headers["aggregate"], headers["aggregate_id"]),
+                    headers["outbox_id"],
+                )
+            )
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--cars", type=int, default=5)
+    parser.add_argument("--relays", type=int, default=4)
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as session:
+        for i in range(args.events):
+            record_event(session, "bench", i % args.cars, "updated", {"seq": i})
+        await session.commit()
+
+    publisher = RecordingPublisher()
+    while True:
+        relayed = await asyncio.gather(
+            *(relay_outbox(publisher) for _ in range(args.relays))
+        )
+        if not any(relayed):
+            break
+
+    last, out_of_order = {}, 0
+    for aggregate, outbox_id in publisher.published:
+        out_of_order += outbox_id < last.get(aggregate, 0)
+        last[aggregate] = outbox_id
+    print(
+        f"{len(publisher.published)} events relayed by {args.relays} concurrent "
+        f"relays, {out_of_order} out of order"
+    )
+    await ENGINE.dispose()
+    if out_of_order:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+"""Page latency of offset vs keyset pagination on a large cars table.
+
+    python -m backend.benchmarks.pagination --rows 1000000 --pages 1 10000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from sqlalchemy import select
+from ..helpers.db_conf import AsyncSessionLocal, ENGINE
+from ..helpers.pagination import encode_cursor
+from ..models import CarModel
+from ..services.CarService import get_cars, get_cars_page
+from .common import ensure_cars
+
+
+async def timed(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        async with AsyncSessionLocal() as session:
+            start = time.perf_counter()
+            await fn(session)
+            samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10_000])
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    await ensure_cars(args.rows)
+
+    print(f"{'page':>8} {'offset ms':>12} {'keyset ms':>12}")
+    for page in args.pages:
+        skip = (page - 1) * args.limit
+        async with AsyncSessionLocal() as session:
+            last_id = (
+                await session.execute(
+                    select(CarModel.id).order_by(CarModel.id).offset(skip - 1).limit(1)
+                )
+            ).scalar_one_or_none() if skip else None
+        cursor = encode_cursor([last_id]) if last_id is not None else ""
+
+        offset_ms = await timed(lambda s: get_cars(s, skip, args.limit), args.runs)
+        keyset_ms = await timed(
+            lambda s: get_cars_page(s, cursor, args.limit), args.runs
+        )
+        print(f"{page:>8} {offset_ms:>12.2f} {keyset_ms:>12.2f}")
+
+    await ENGINE.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
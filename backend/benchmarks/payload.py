@@ -0,0 +1,98 @@
+"""Response size and latency of full vs projected list responses.
+
+    python -m backend.benchmarks.payload --orders 100 --cars-per-order 5
+"""
+
+import argparse
+import asyncio
+import gc
+import random
+import statistics
+import time
+from sqlalchemy import delete, func, insert, select
+from ..helpers.db_conf import AsyncSessionLocal, ENGINE
+from ..models import CarModel, OrderModel, order_items
+from ..main import app
+from ..services.CarService import CAR_CACHE
+from .common import asgi_request, ensure_cars, ensure_user, percentile
+
+
+async def ensure_orders(user_id: int, orders: int, cars_per_order: int):
+    async with AsyncSessionLocal() as session:
+        count = (
+            await session.execute(
+                select(func.count(OrderModel.id)).where(OrderModel.user_id == user_id)
+            )
+        ).scalar_one()
+        if count == orders:
+            return
+        await session.execute(delete(OrderModel).where(OrderModel.user_id == user_id))
+        car_ids = (
+            await session.execute(select(CarModel.id).order_by(CarModel.id).limit(1000))
+        ).scalars().all()
+        rng = random.Random(42)
+        order_ids = (
+            await session.execute(
+                insert(OrderModel).returning(OrderModel.id),
+                [{"user_id": user_id}] * orders,
+            )
+        ).scalars().all()
+        await session.execute(
+            insert(order_items),
+            [
+                {"order_id": order_id, "car_id": car_id, "quantity": 1}
+                for order_id in order_ids
+                for car_id in rng.sample(car_ids, cars_per_order)
+            ],
+        )
+        await session.commit()
+
+
+async def measure(path: str, headers: dict, runs: int) -> tuple[int, list[float]]:
+    samples, size = [], 0
+    for _ in range(runs):
+        # Time the database round-trip, not a cache hit, and keep one run's
+        # garbage out of the next run's timing.
+        CAR_CACHE.clear()
+        gc.collect()
+        start = time.perf_counter()
+        status, body = await asgi_request(app, "GET", path, headers)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert status == 200, (status, body[:200])
+        size = len(body)
+    return size, samples
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument("--cars-per-order", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    await ensure_cars(1000)
+    user_id, token = await ensure_user("payload")
+    await ensure_orders(user_id, args.orders, args.cars_per_order)
+    headers = {"authorization": f"Bearer {token}"}
+
+    limit = f"limit={args.limit}"
+    print(f"{'request':<52} {'bytes':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for path in (
+        f"/cars/?{limit}",
+        f"/cars/?{limit}&fields=brand,model,year,price_usd",
+        f"/orders/?{limit}&expand=cars",
+        f"/orders/?{limit}",
+    ):
+        await measure(path, headers, 3)
+        size, samples = await measure(path, headers, args.runs)
+        print(
+            f"{path:<52} {size:>9,} {statistics.median(samples):>8.2f} "
+            f"{percentile(samples, 95):>8.2f}"
+        )
+
+    await ENGINE.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+"""Connection pool sizing and the asyncpg prepared-statement cache under load.
+
+Each operation checks out a connection and runs the same mix of catalog and
+order reads the API issues; concurrency above the pool size makes requests
+queue for a connection, which shows up as acquire wait.
+
+    python -m backend.benchmarks.pool --ops 5000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import selectinload
+from ..helpers.db_conf import AsyncSessionLocal, ENGINE, SQLALCHEMY_DATABASE_URL
+from ..helpers.pool import PoolStats, TimedQueuePool
+from ..models import CarModel, OrderModel
+from .common import ensure_cars, ensure_user
+from .payload import ensure_orders
+
+
+def queries(car_ids: list[int], user_id: int) -> list:
+    rng = random.Random(7)
+    return [
+        lambda: select(CarModel).where(CarModel.id == rng.choice(car_ids)),
+        lambda: select(CarModel.id, CarModel.brand, CarModel.price_usd)
+        .where(CarModel.id > rng.choice(car_ids))
+        .order_by(CarModel.id)
+        .limit(20),
+        lambda: select(func.count(OrderModel.id)).where(OrderModel.user_id == user_id),
+        lambda: select(OrderModel)
+        .options(selectinload(OrderModel.cars))
+        .where(OrderModel.user_id == user_id)
+        .limit(5),
+    ]
+
+
+async def run(
+    pool_size: int, cache_size: int, ops: int, concurrency: int, mix: list
+) -> dict:
+    engine = create_async_engine(
+        SQLALCHEMY_DATABASE_URL,
+        poolclass=TimedQueuePool,
+        pool_size=pool_size,
+        max_overflow=0,
+        connect_args={"prepared_statement_cache_size": cache_size},
+    )
+    # Warm the pool so connection setup is not part of the timing.
+    remaining = iter(range(pool_size * len(mix)))
+
+    async def worker():
+        for i in remaining:
+            async with engine.connect() as conn:
+                result = await conn.execute(mix[i % len(mix)]())
+                result.all()
+
+    await asyncio.gather(*(worker() for _ in range(pool_size)))
+    engine.pool.stats = PoolStats()
+    remaining = iter(range(ops))
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stats = engine.pool.snapshot()
+    await engine.dispose()
+    return {"ops_per_s": ops / elapsed, **stats}
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[5, 20])
+    parser.add_argument("--cache-sizes", type=int, nargs="+", default=[0, 100])
+    args = parser.parse_args()
+
+    await ensure_cars(1000)
+    user_id, _ = await ensure_user("payload")
+    await ensure_orders(user_id, 100, 5)
+    async with AsyncSessionLocal() as session:
+        car_ids = (
+            await session.execute(select(CarModel.id).order_by(CarModel.id).limit(1000))
+        ).scalars().all()
+    await ENGINE.dispose()
+    mix = queries(car_ids, user_id)
+    print(f"{args.ops} ops, {args.concurrency} concurrent")
+    print(
+        f"{'pool':>5} {'stmt cache':>10} {'ops/s':>9} "
+        f"{'wait avg ms':>12} {'wait max ms':>12}"
+    )
+    for pool_size in args.pool_sizes:
+        for cache_size in args.cache_sizes:
+            stats = await run(pool_size, cache_size, args.ops, args.concurrency, mix)
+            print(
+                f"{pool_size:>5} {cache_size:>10} {stats['ops_per_s']:>9.1f} "
+                f"{stats['acquire_wait_avg_ms']:>12.2f} "
+                f"{stats['acquire_wait_max_ms']:>12.2f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
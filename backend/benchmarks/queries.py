@@ -0,0 +1,140 @@
+"""Queries per request for the main read routes, checked against a budget, and
+the cost of counting them.
+
+Fails if a route runs more statements than its budget, e.g. after someone
+reintroduces a per-row lazy load.
+
+    python -m backend.benchmarks.queries --statements 5000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from sqlalchemy import event, select
+from sqlalchemy.exc import InvalidRequestError
+from ..helpers.db_conf import AsyncSessionLocal, ENGINE, SQLALCHEMY_DATABASE_URL
+from ..helpers.db_conf import make_engine
+from ..helpers.querylog import (
+    after_cursor_execute,
+    before_cursor_execute,
+    log_queries,
+    query_budget,
+)
+from ..main import app
+from ..models import CarModel, OrderModel
+from ..services.CarService import CAR_CACHE
+from .common import asgi_request, ensure_cars, ensure_user
+from .payload import ensure_orders
+
+ROUNDS = 9
+SQL_LISTENERS = (
+    ("before_cursor_execute", before_cursor_execute),
+    ("after_cursor_execute", after_cursor_execute),
+)
+
+
+def routes(car_ids: list[int], order_id: int) -> list[tuple[str, int]]:
+    """(path, query budget) for a cold cache; none may grow with the row count."""
+    return [
+        ("/cars/?limit=50", 1),
+        ("/cars/?limit=50&fields=brand,model,price_usd", 1),
+        (f"/cars/{car_ids[0]}", 1),
+        (f"/cars/?ids={','.join(map(str, car_ids[:100]))}", 1),
+        ("/cars/search?q=sporty&limit=20", 1),
+        ("/orders/?limit=50", 4),
+        ("/orders/?limit=50&expand=cars", 3),
+        (f"/orders/{order_id}?expand=cars", 3),
+        ("/users/me", 1),
+    ]
+
+
+async def per_statement_us(conn, car_ids: list[int], statements: int) -> float:
+    start = time.perf_counter()
+    for i in range(statements):
+        result = await conn.execute(
+            select(CarModel.id).where(CarModel.id == car_ids[i % len(car_ids)])
+        )
+        result.all()
+    return (time.perf_counter() - start) / statements * 1e6
+
+
+def set_query_log(engine, enabled: bool):
+    for name, listener in SQL_LISTENERS:
+        if enabled:
+            event.listen(engine.sync_engine, name, listener)
+        else:
+            event.remove(engine.sync_engine, name, listener)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--statements", type=int, default=5000)
+    args = parser.parse_args()
+
+    await ensure_cars(1000)
+    user_id, token = await ensure_user("payload")
+    await ensure_orders(user_id, 100, 5)
+    headers = {"Authorization": f"Bearer {token}"}
+    async with AsyncSessionLocal() as session:
+        car_ids = (
+            await session.execute(select(CarModel.id).order_by(CarModel.id).limit(1000))
+        ).scalars().all()
+        order_id = (
+            await session.execute(
+                select(OrderModel.id).where(OrderModel.user_id == user_id).limit(1)
+            )
+        ).scalar_one()
+
+    print(f"{'route':<48} {'queries':>7} {'budget':>6}")
+    failures = []
+    for path, budget in routes(car_ids, order_id):
+        CAR_CACHE.clear()
+        try:
+            with query_budget(budget) as counter:
+                status, _ = await asgi_request(app, "GET", path, headers)
+            assert status == 200, f"status {status}"
+        except AssertionError as e:
+            failures.append(f"GET {path}: {e}")
+        print(f"{'GET ' + path[:44]:<48} {counter.count:>7} {budget:>6}")
+
+    # What the detector sees when a loop runs one query per row.
+    with query_budget(len(car_ids)) as counter:
+        async with AsyncSessionLocal() as session:
+            for car_id in car_ids[:20]:
+                await session.get(CarModel, car_id)
+    count, key, text = counter.repeated(10)[0]
+    print(f"one query per row: {count}x [{key}] {text[:60]}")
+    async with AsyncSessionLocal() as session:
+        orders = (await session.execute(select(OrderModel).limit(5))).scalars().all()
+        try:
+            orders[0].user
+        except InvalidRequestError as e:
+            print(f"lazy load refused: {str(e).splitlines()[0]}")
+
+    # Same connection both ways, so only the listeners differ between rounds.
+    engine = make_engine(SQLALCHEMY_DATABASE_URL)
+    log_queries(engine)
+    plain, logged = [], []
+    per_round = args.statements // ROUNDS
+    async with engine.connect() as conn:
+        await per_statement_us(conn, car_ids, 200)
+        with query_budget(args.statements * 2):
+            for _ in range(ROUNDS):
+                set_query_log(engine, False)
+                plain.append(await per_statement_us(conn, car_ids, per_round))
+                set_query_log(engine, True)
+                logged.append(await per_statement_us(conn, car_ids, per_round))
+    plain_us, logged_us = statistics.median(plain), statistics.median(logged)
+    print(
+        f"per statement: {plain_us:.1f} us plain, {logged_us:.1f} us counted "
+        f"(+{logged_us - plain_us:.1f} us)"
+    )
+    await engine.dispose()
+    await ENGINE.dispose()
+    if failures:
+        raise SystemExit("\n".join(failures))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+"""Build time, lookup and update latency of the related cars index, on
+synthetic orders, plus reading this database's order_items.
+
+Also checks that adding orders one by one, and folding them in as the
+periodic incremental rebuild does, both end where a full rebuild does.
+
+    python -m backend.benchmarks.related --orders 1000000 --cars 100000
+    python -m backend.benchmarks.related --orders 10000000 --added 100000
+"""
+
+import argparse
+import asyncio
+import time
+import numpy as np
+from ..helpers.cooccurrence import RelatedIndex
+from ..helpers.db_conf import ENGINE, REPLICAS
+from ..services.CarService import read_order_items
+from .common import percentile
+
+
+def synthetic_orders(
+    orders: int, cars: int, seed: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """1-5 distinct cars per order, a few popular cars in most orders."""
+    rng = np.random.default_rng(seed)
+    order_ids = np.repeat(np.arange(orders), rng.integers(1, 6, orders))
+    car_ids = (rng.zipf(1.5, len(order_ids)) - 1) % cars
+    keys = np.unique(order_ids * cars + car_ids)
+    return keys // cars, keys % cars
+
+
+def timed_us(call, args: list) -> list[float]:
+    samples = []
+    for arg in args:
+        start = time.perf_counter()
+        call(arg)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--cars", type=int, default=100_000)
+    parser.add_argument("--added", type=int, default=10_000)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--overlap", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    order_ids, car_ids = synthetic_orders(args.orders, args.cars, args.seed)
+    split = np.searchsorted(order_ids, args.orders - args.added)
+    index = RelatedIndex(args.top_k, 50, args.overlap)
+    start = time.perf_counter()
+    index.replace(index.build(order_ids[:split], car_ids[:split]))
+    build_s = time.perf_counter() - start
+    stats = index.snapshot()
+    print(
+        f"build: {build_s:.2f} s for {stats['orders']} orders, "
+        f"{len(order_ids[:split])} items, {stats['pairs']} pairs"
+    )
+
+    rng = np.random.default_rng(args.seed)
+    lookups = rng.choice(index.current.cars, 20_000).tolist()
+    samples = timed_us(lambda car_id: index.related(car_id, 10), lookups)
+    print(
+        f"lookup: p50 {percentile(samples, 50):.1f} us, "
+        f"p99 {percentile(samples, 99):.1f} us"
+    )
+
+    added = np.split(car_ids[split:], np.flatnonzero(np.diff(order_ids[split:])) + 1)
+    added = list(zip(np.unique(order_ids[split:]).tolist(), added))
+    samples = timed_us(
+        lambda order: index.add_order(order[0], order[1].tolist()), added
+    )
+    print(
+        f"add order: p50 {percentile(samples, 50):.1f} us, "
+        f"p99 {percentile(samples, 99):.1f} us ({len(added)} orders)"
+    )
+
+    rebuilt = RelatedIndex(args.top_k, 50, args.overlap)
+    start = time.perf_counter()
+    rebuilt.replace(rebuilt.build(order_ids, car_ids))
+    rebuild_s = time.perf_counter() - start
+
+    def mismatches(other: RelatedIndex) -> int:
+        return sum(
+            other.related(car_id, args.top_k) != rebuilt.related(car_id, args.top_k)
+            for car_id in rebuilt.current.cars.tolist()
+        )
+
+    added_mismatches = mismatches(index)
+    # The incremental read covers the overlap below the newest order too.
+    low_water = index.low_water()
+    start = time.perf_counter()
+    index.replace(
+        index.extend(
+            index.current,
+            order_ids[order_ids > low_water],
+            car_ids[order_ids > low_water],
+        )
+    )
+    extend_s = time.perf_counter() - start
+    extended_mismatches = mismatches(index)
+    print(
+        f"rebuild: {rebuild_s:.2f} s from all orders, "
+        f"incremental: {extend_s:.2f} s for the {len(added)} new orders"
+    )
+    print(
+        f"vs rebuilt: {added_mismatches} cars differ after adding orders, "
+        f"{extended_mismatches} after the incremental rebuild"
+    )
+
+    async with REPLICAS.session() as session:
+        start = time.perf_counter()
+        db_orders, _ = await read_order_items(session)
+    print(
+        f"read order_items: {len(db_orders)} rows in "
+        f"{time.perf_counter() - start:.2f} s"
+    )
+    await ENGINE.dispose()
+    if added_mismatches or extended_mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,65 @@
+"""Latency percentiles of GET /cars/search query shapes on a large catalog.
+
+    python -m backend.benchmarks.search --rows 1000000 --runs 200
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from ..helpers.db_conf import AsyncSessionLocal, ENGINE
+from ..schemas.CarSchema import CarSearch
+from ..services.CarService import search_cars
+from .common import ensure_cars, percentile
+
+BRANDS = ["Toyota", "Honda", "BMW", "Tesla", "Kia", "Audi"]
+TERMS = ["sunroof", "leather seats", "navigation family", "heated seats sporty"]
+
+QUERIES = {
+    "brand+model+year": lambda r: CarSearch(
+        brand=r.choice(BRANDS), model="Civic", year_min=2018, year_max=2022
+    ),
+    "price range, price sort": lambda r: CarSearch(
+        price_min=(low := r.randint(10000, 80000)),
+        price_max=low + 5000,
+        sort="price_asc",
+    ),
+    "in stock, cheapest": lambda r: CarSearch(in_stock=True, sort="price_asc"),
+    "facets + in stock": lambda r: CarSearch(
+        body_type="SUV", fuel_type="Hybrid", transmission="Automatic", in_stock=True
+    ),
+    "full text, relevance": lambda r: CarSearch(q=r.choice(TERMS)),
+    "full text + brand, price sort": lambda r: CarSearch(
+        q=r.choice(TERMS), brand=r.choice(BRANDS), sort="price_desc"
+    ),
+}
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    await ensure_cars(args.rows)
+    rng = random.Random(args.seed)
+
+    print(f"{'query':<32} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    async with AsyncSessionLocal() as session:
+        for name, build in QUERIES.items():
+            samples = []
+            for _ in range(args.runs):
+                params = build(rng)
+                start = time.perf_counter()
+                await search_cars(session, params)
+                samples.append((time.perf_counter() - start) * 1000)
+            print(
+                f"{name:<32} {percentile(samples, 50):>8.2f} "
+                f"{percentile(samples, 95):>8.2f} {max(samples):>8.2f}"
+            )
+    await ENGINE.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
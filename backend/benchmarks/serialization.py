@@ -0,0 +1,104 @@
+"""Response rendering cost: FastAPI response_model re-validation vs ModelResponse.
+
+Both routes serve the same pre-loaded service results, so only validation,
+encoding and compression are timed.
+
+    python -m backend.benchmarks.serialization --cars 1000 --orders 100
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Union
+from fastapi import FastAPI
+from ..helpers.compression import CompressionMiddleware
+from ..helpers.db_conf import AsyncSessionLocal, ENGINE
+from ..helpers.responses import ModelResponse
+from ..schemas.CarSchema import Car, CarPage, CarFields, CarFieldsPage
+from ..schemas.OrderSchema import Order, OrderPage, OrderWithCars, OrderWithCarsPage
+from ..services.CarService import get_cars
+from ..services.OrderService import get_orders
+from .common import asgi_request, ensure_cars, ensure_user, percentile
+from .payload import ensure_orders
+
+CAR_RESPONSE = Union[List[Car], CarPage, List[CarFields], CarFieldsPage]
+ORDER_RESPONSE = Union[List[Order], OrderPage, List[OrderWithCars], OrderWithCarsPage]
+
+
+def build_app(cars: list, orders: list) -> FastAPI:
+    bench = FastAPI()
+
+    @bench.get("/validated/cars", response_model=CAR_RESPONSE)
+    async def validated_cars():
+        return cars
+
+    @bench.get("/validated/orders", response_model=ORDER_RESPONSE)
+    async def validated_orders():
+        return orders
+
+    @bench.get("/fast/cars", response_model=CAR_RESPONSE)
+    async def fast_cars():
+        return ModelResponse(cars, exclude_unset=True)
+
+    @bench.get("/fast/orders", response_model=ORDER_RESPONSE)
+    async def fast_orders():
+        return ModelResponse(orders)
+
+    return bench
+
+
+async def measure(app, path: str, headers: dict, runs: int) -> tuple[int, list]:
+    samples, size = [], 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        status, body = await asgi_request(app, "GET", path, headers)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert status == 200, status
+        size = len(body)
+    return size, samples
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cars", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument("--cars-per-order", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    await ensure_cars(args.cars)
+    user_id, _ = await ensure_user("payload")
+    await ensure_orders(user_id, args.orders, args.cars_per_order)
+    async with AsyncSessionLocal() as session:
+        cars = await get_cars(session, 0, args.cars)
+        orders = await get_orders(
+            session, user_id, 0, args.orders, expand_cars=True
+        )
+    await ENGINE.dispose()
+
+    bench = build_app(cars, orders)
+    compressed = CompressionMiddleware(bench)
+    print(f"{len(cars)} cars, {len(orders)} orders with full cars")
+    print(
+        f"{'response':<20} {'encoding':<9} {'bytes':>9} {'p50 ms':>8} {'p95 ms':>8}"
+    )
+    for resource in ("cars", "orders"):
+        for label, app, encoding in (
+            ("validated", bench, None),
+            ("fast", bench, None),
+            ("fast", compressed, "gzip"),
+            ("fast", compressed, "br"),
+        ):
+            headers = {"accept-encoding": encoding} if encoding else {}
+            path = f"/{label}/{resource}"
+            await measure(app, path, headers, 3)
+            size, samples = await measure(app, path, headers, args.runs)
+            print(
+                f"{path:<20} {encoding or '-':<9} {size:>9,} "
+                f"{statistics.median(samples):>8.2f} {percentile(samples, 95):>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""Encode/decode cost and bytes on the wire for one export of N cars.
+
+    python -m backend.benchmarks.wire_format --sizes 10000 100000 1000000
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from ..helpers.wire import (
+    CAR_SCHEMA,
+    decode_payload,
+    encode_payload,
+    msgpack,
+    pack_rows,
+    unpack_rows,
+    zstandard,
+)
+
+WORDS = ["Bluetooth", "Sunroof", "Navigation", "Heated Seats", "Lane Assist"]
+
+
+def make_cars(n: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    cars = []
+    for i in range(n):
+        cars.append(
+            {
+                "id": i + 1,
+                "brand": rng.choice(["Toyota", "Honda", "BMW", "Tesla", "Kia"]),
+                "model": rng.choice(["Camry", "Civic", "X5", "Model 3"]),
+                "year": rng.randint(2015, 2025),
+                "body_type": rng.choice(["Sedan", "SUV", "Coupe"]),
+                "engine_type": rng.choice(["V6", "Electric", "Hybrid"]),
+                "engine_size_liters": round(rng.uniform(1.0, 6.0), 1),
+                "horsepower": rng.randint(100, 600),
+                "transmission": rng.choice(["Automatic", "Manual", "CVT"]),
+                "fuel_type": rng.choice(["Gasoline", "Diesel", "Electric"]),
+                "mileage_km": rng.randint(0, 200000),
+                "top_speed_kmh": rng.randint(150, 300),
+                "color": rng.choice(["Black", "White", "Red"]),
+                "features": ", ".join(rng.sample(WORDS, 3)),
+                "price_usd": Decimal(f"{rng.uniform(10000, 100000):.2f}"),
+                "discount_percent": Decimal(f"{rng.uniform(0, 20):.1f}"),
+                "num_in_stock": rng.randint(0, 20),
+                "description": "Reliable sedan with great fuel efficiency.",
+                "updated_at": now,
+            }
+        )
+    return cars
+
+
+def measure(label: str, encode, decode, runs: int):
+    encode_times, decode_times = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        body, content_type, content_encoding = encode()
+        encode_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        decode(body, content_type, content_encoding)
+        decode_times.append(time.perf_counter() - start)
+    print(
+        f"  {label:<22} {len(body):>14,} B"
+        f"  encode {min(encode_times) * 1000:>9.1f} ms"
+        f"  decode {min(decode_times) * 1000:>9.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"car schema: {len(CAR_SCHEMA)} columns")
+    for size in args.sizes:
+        cars = make_cars(size)
+        print(f"{size:,} cars")
+
+        legacy = {"cars": [dict(c, _sa_instance_state="<state>") for c in cars]}
+        measure(
+            "legacy json",
+            lambda: (json.dumps(legacy, default=str).encode(), None, None),
+            lambda body, *_: json.loads(body.decode()),
+            args.runs,
+        )
+
+        def chunk(fmt, compression):
+            payload = {"type": "chunk", "table": "cars", "op": "upsert"}
+            payload.update(pack_rows("cars", cars))
+            return encode_payload(payload, fmt, compression)
+
+        def roundtrip(body, content_type, content_encoding):
+            return unpack_rows(decode_payload(body, content_type, content_encoding))
+
+        measure("json v1", lambda: chunk("json", "none"), roundtrip, args.runs)
+        if zstandard is not None:
+            measure("json v1 + zstd", lambda: chunk("json", "zstd"), roundtrip, args.runs)
+        if msgpack is not None:
+            measure("msgpack v1", lambda: chunk("msgpack", "none"), roundtrip, args.runs)
+            if zstandard is not None:
+                measure(
+                    "msgpack v1 + zstd",
+                    lambda: chunk("msgpack", "zstd"),
+                    roundtrip,
+                    args.runs,
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Writes/sec of the single-row service write paths against the local Postgres.
+
+    python -m backend.benchmarks.writes --ops 500 --workers 1 8
+"""
+
+import argparse
+import asyncio
+import itertools
+import time
+from sqlalchemy import delete, insert, select, update
+from ..helpers.db_conf import AsyncSessionLocal, ENGINE
+from ..models import CarModel, OrderModel, UserModel, order_items
+from ..schemas.CarSchema import CarUpdate
+from ..schemas.OrderSchema import OrderItemCreate, OrderUpdate
+from ..schemas.UserSchema import UserUpdate
+from ..services.CarService import delete_car, update_car
+from ..services.OrderService import delete_order, update_order
+from ..services.UserService import delete_user, update_user
+from .common import ensure_cars, ensure_user
+
+PREFIX = "writes-bench"
+
+
+async def car_ids(limit: int) -> list[int]:
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(CarModel.id).order_by(CarModel.id).limit(limit)
+        )
+        return list(result.scalars().all())
+
+
+async def make_cars(n: int) -> list[int]:
+    async with AsyncSessionLocal() as session:
+        template = (
+            await session.execute(select(CarModel).order_by(CarModel.id).limit(1))
+        ).scalar_one()
+        row = {
+            c.name: getattr(template, c.key)
+            for c in CarModel.__table__.columns
+            if c.name not in ("id", "created_at", "updated_at")
+            and not c.computed
+        }
+        ids = (
+            await session.execute(
+                insert(CarModel).returning(CarModel.id), [row] * n
+            )
+        ).scalars().all()
+        await session.commit()
+        return list(ids)
+
+
+async def make_users(n: int) -> list[int]:
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            delete(UserModel).where(UserModel.username.like(f"{PREFIX}-%"))
+        )
+        ids = (
+            await session.execute(
+                insert(UserModel).returning(UserModel.id),
+                [
+                    {
+                        "username": f"{PREFIX}-{i}",
+                        "email": f"{PREFIX}-{i}@bench.local",
+                        "hashed_password": "-",
+                    }
+                    for i in range(n)
+                ],
+            )
+        ).scalars().all()
+        await session.commit()
+        return list(ids)
+
+
+async def make_orders(user_id: int, cars: list[int], n: int) -> list[int]:
+    async with AsyncSessionLocal() as session:
+        ids = (
+            await session.execute(
+                insert(OrderModel).returning(OrderModel.id), [{"user_id": user_id}] * n
+            )
+        ).scalars().all()
+        await session.execute(
+            insert(order_items),
+            [
+                {"order_id": order_id, "car_id": car_id, "quantity": 1}
+                for order_id in ids
+                for car_id in cars[:3]
+            ],
+        )
+        # Stock the deletes hand back must not push the hot cars anywhere odd.
+        await session.execute(
+            update(CarModel).where(CarModel.id.in_(cars)).values(num_in_stock=100_000)
+        )
+        await session.commit()
+        return list(ids)
+
+
+async def run(op, targets: list, workers: int) -> float:
+    queue = iter(targets)
+
+    async def worker():
+        for target in queue:
+            async with AsyncSessionLocal() as session:
+                await op(session, target)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return len(targets) / (time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8])
+    args = parser.parse_args()
+
+    await ensure_cars(1000)
+    user_id, _ = await ensure_user("writes")
+    cars = await car_ids(1000)
+    # Fresh values every run; the ORM skips UPDATEs that change nothing.
+    prices = itertools.count(time.time_ns() // 1000 % 10**7)
+    quantities = itertools.cycle([1, 2])
+
+    async def update_car_op(session, car_id):
+        await update_car(session, car_id, CarUpdate(price_usd=next(prices) / 100))
+
+    async def update_user_op(session, target_id):
+        await update_user(
+            session, target_id, UserUpdate(email=f"{PREFIX}-{target_id}@bench.updated")
+        )
+
+    async def update_order_op(session, order_id):
+        # Keep two cars, change one quantity, swap the third car.
+        quantity = next(quantities)
+        items = [(cars[0], 1), (cars[1], quantity), (cars[2 + quantity], 1)]
+        await update_order(
+            session,
+            order_id,
+            OrderUpdate(items=[OrderItemCreate(car_id=c, quantity=q) for c, q in items]),
+        )
+
+    print(f"{'operation':<14} " + " ".join(f"{f'{w} workers':>11}" for w in args.workers))
+    print(f"{'':<14} " + " ".join(f"{'writes/s':>11}" for _ in args.workers))
+    results = {}
+    for workers in args.workers:
+        hot = cars[: args.ops]
+        results.setdefault("update car", []).append(
+            await run(update_car_op, hot, workers)
+        )
+        users = await make_users(args.ops)
+        results.setdefault("update user", []).append(
+            await run(update_user_op, users, workers)
+        )
+        results.setdefault("delete user", []).append(
+            await run(delete_user, users, workers)
+        )
+        doomed = await make_cars(args.ops)
+        results.setdefault("delete car", []).append(
+            await run(delete_car, doomed, workers)
+        )
+        orders = await make_orders(user_id, cars, args.ops)
+        results.setdefault("update order", []).append(
+            await run(update_order_op, orders, workers)
+        )
+        results.setdefault("delete order", []).append(
+            await run(delete_order, orders, workers)
+        )
+    for name, rates in results.items():
+        print(f"{name:<14} " + " ".join(f"{rate:>11.1f}" for rate in rates))
+    await ENGINE.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
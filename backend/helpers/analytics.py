@@ -0,0 +1,156 @@
+import time
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Date,
+    MetaData,
+    Numeric,
+    String,
+    Table,
+    func,
+    select,
+    text,
+)
+from sqlalchemy.dialects.postgresql import insert
+from .db_conf import AsyncSessionLocal
+from ..models import AnalyticsStateModel
+
+# Materialized views, kept out of ORM_BASE so create_all leaves them alone.
+VIEWS = MetaData()
+# Revenue is at each car's current discounted price: order_items does not
+# record what was paid.
+MONTH = "date_trunc('month', o.created_at AT TIME ZONE 'UTC')::date"
+VIEW_DEFINITIONS = {
+    "sales_by_month": (
+        f"""
+        SELECT {MONTH} AS month,
+               count(DISTINCT o.id) AS orders,
+               coalesce(sum(i.quantity), 0) AS units,
+               coalesce(sum(i.quantity * c.effective_price), 0) AS revenue,
+               coalesce(sum(i.quantity * c.discount_percent), 0) AS discount_units
+        FROM orders o
+        LEFT JOIN order_items i ON i.order_id = o.id
+        LEFT JOIN cars c ON c.id = i.car_id
+        GROUP BY 1
+        """,
+        ("month",),
+    ),
+    "sales_by_model": (
+        f"""
+        SELECT {MONTH} AS month,
+               c.brand,
+               c.model,
+               sum(i.quantity) AS units,
+               sum(i.quantity * c.effective_price) AS revenue,
+               sum(i.quantity * c.discount_percent) AS discount_units
+        FROM order_items i
+        JOIN orders o ON o.id = i.order_id
+        JOIN cars c ON c.id = i.car_id
+        GROUP BY 1, 2, 3
+        """,
+        ("month", "brand", "model"),
+    ),
+}
+sales_by_month = Table(
+    "sales_by_month",
+    VIEWS,
+    Column("month", Date, primary_key=True),
+    Column("orders", BigInteger),
+    Column("units", BigInteger),
+    Column("revenue", Numeric),
+    Column("discount_units", Numeric),
+)
+sales_by_model = Table(
+    "sales_by_model",
+    VIEWS,
+    Column("month", Date, primary_key=True),
+    Column("brand", String, primary_key=True),
+    Column("model", String, primary_key=True),
+    Column("units", BigInteger),
+    Column("revenue", Numeric),
+    Column("discount_units", Numeric),
+)
+
+# Rows written to the tables the views read, ever. Backends report them some
+# seconds after committing, so a write one run misses is caught by the next;
+# aborted writes count too, which only costs a refresh.
+CHANGE_COUNT = text(
+    "SELECT sum(n_tup_ins + n_tup_upd + n_tup_del) FROM pg_stat_user_tables "
+    "WHERE relid IN ('orders'::regclass, 'order_items'::regclass, 'cars'::regclass)"
+)
+POPULATED = text(
+    "SELECT matviewname, ispopulated FROM pg_matviews "
+    "WHERE schemaname = current_schema() AND matviewname = ANY(:names)"
+)
+
+
+async def create_views(conn):
+    # Created empty so startup does not wait on the first aggregation.
+    for name, (query, key) in VIEW_DEFINITIONS.items():
+        await conn.execute(
+            text(
+                f"CREATE MATERIALIZED VIEW IF NOT EXISTS {name} AS {query} "
+                "WITH NO DATA"
+            )
+        )
+        # REFRESH ... CONCURRENTLY needs a unique index over all rows.
+        await conn.execute(
+            text(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS ix_{name}_key ON {name} "
+                f"({', '.join(key)})"
+            )
+        )
+
+
+async def refresh_analytics(force: bool = False) -> dict:
+    """Refresh the views the tables changed under since their last refresh.
+
+    CONCURRENTLY keeps them readable meanwhile; the first refresh of an empty
+    view cannot be concurrent. Returns the refresh time in ms per view.
+    """
+    async with AsyncSessionLocal() as session:
+        # Read before refreshing: a write counted later triggers another refresh.
+        changes = (await session.execute(CHANGE_COUNT)).scalar_one()
+        states = {
+            state.name: state
+            for state in (await session.execute(select(AnalyticsStateModel))).scalars()
+        }
+        populated = dict(
+            (
+                await session.execute(POPULATED, {"names": list(VIEW_DEFINITIONS)})
+            ).all()
+        )
+
+    refreshed = {}
+    for name in VIEW_DEFINITIONS:
+        state = states.get(name)
+        if (
+            not force
+            and populated.get(name)
+            and state is not None
+            and state.change_count == changes
+        ):
+            continue
+        concurrently = "CONCURRENTLY " if populated.get(name) else ""
+        async with AsyncSessionLocal() as session:
+            start = time.perf_counter()
+            await session.execute(
+                text(f"REFRESH MATERIALIZED VIEW {concurrently}{name}")
+            )
+            duration_ms = (time.perf_counter() - start) * 1000
+            # now() is when this transaction began, so every order committed
+            # before refreshed_at is in the view.
+            values = {
+                "refreshed_at": func.now(),
+                "change_count": changes,
+                "duration_ms": duration_ms,
+            }
+            await session.execute(
+                insert(AnalyticsStateModel)
+                .values(name=name, **values)
+                .on_conflict_do_update(index_elements=["name"], set_=values)
+            )
+            await session.commit()
+        print(f"Refreshed {name} in {duration_ms:.0f} ms")
+        refreshed[name] = round(duration_ms, 1)
+    return refreshed
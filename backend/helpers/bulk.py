@@ -0,0 +1,62 @@
+import csv
+import json
+from typing import AsyncIterator, Optional
+
+BULK_FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+async def parse_records(
+    chunks: AsyncIterator[bytes], fmt: str
+) -> AsyncIterator[tuple[int, Optional[dict], Optional[str]]]:
+    """Yield (row, record, error) per non-empty data line; rows count from 1.
+
+    CSV takes its column names from the first line and holds one record per
+    line, so quoted fields cannot contain newlines.
+    """
+    header = None
+    row = 0
+    async for raw in iter_lines(chunks):
+        try:
+            line = raw.decode("utf-8").rstrip("\r")
+        except UnicodeDecodeError:
+            row += 1
+            yield row, None, "Line is not valid UTF-8"
+            continue
+        if not line.strip():
+            continue
+        if fmt == "csv" and header is None:
+            header = [name.strip() for name in next(csv.reader([line]))]
+            continue
+        row += 1
+        if fmt == "csv":
+            values = next(csv.reader([line]))
+            if len(values) != len(header):
+                yield row, None, f"Expected {len(header)} columns, got {len(values)}"
+                continue
+            # Empty cells mean "not set", e.g. a blank id inserts a new car.
+            yield row, {k: v for k, v in zip(header, values) if v != ""}, None
+        else:
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield row, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield row, None, "Expected a JSON object"
+                continue
+            yield row, record, None
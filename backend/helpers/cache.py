@@ -0,0 +1,191 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+import aio_pika
+
+MISSING = object()
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.pending = {}
+        self.version = 0
+        self.invalidated_at = float("-inf")
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: Hashable) -> Any:
+        entry = self.entries.get(key)
+        if entry is None:
+            return MISSING
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            self.stats.expirations += 1
+            return MISSING
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def invalidate(self, *keys: Hashable):
+        self.version += 1
+        self.invalidated_at = time.monotonic()
+        for key in keys:
+            if self.entries.pop(key, None) is not None:
+                self.stats.invalidations += 1
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]):
+        self.version += 1
+        self.invalidated_at = time.monotonic()
+        for key in [k for k, (_, v) in self.entries.items() if predicate(k, v)]:
+            del self.entries[key]
+            self.stats.invalidations += 1
+
+    def clear(self):
+        self.version += 1
+        self.invalidated_at = time.monotonic()
+        self.stats.invalidations += len(self.entries)
+        self.entries.clear()
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        lag_seconds: float = 0.0,
+    ):
+        value = self.get(key)
+        if value is not MISSING:
+            self.stats.hits += 1
+            return value
+
+        # Singleflight: concurrent misses on one key wait for the first load.
+        future = self.pending.get(key)
+        if future is not None:
+            self.stats.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The loading request was cancelled, not this one.
+                return await self.get_or_load(key, loader, lag_seconds)
+
+        self.stats.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self.pending[key] = future
+        version = self.version
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            del self.pending[key]
+        if self._storable(version, lag_seconds):
+            self.set(key, value)
+        future.set_result(value)
+        return value
+
+    async def get_many_or_load(
+        self,
+        keys: list,
+        loader: Callable[[list], Awaitable[dict]],
+        lag_seconds: float = 0.0,
+    ) -> dict:
+        """Look up several keys, loading all misses with one loader(missing) call.
+
+        Keys missing from the loader's result are cached as None. Unlike
+        get_or_load, concurrent misses are not coalesced.
+        """
+        values, missing = {}, []
+        for key in dict.fromkeys(keys):
+            value = self.get(key)
+            if value is MISSING:
+                missing.append(key)
+            else:
+                values[key] = value
+        self.stats.hits += len(values)
+        if not missing:
+            return values
+        self.stats.misses += len(missing)
+        version = self.version
+        loaded = await loader(missing)
+        storable = self._storable(version, lag_seconds)
+        for key in missing:
+            values[key] = loaded.get(key)
+            if storable:
+                self.set(key, values[key])
+        return values
+
+    def _storable(self, version: int, lag_seconds: float) -> bool:
+        # A write landed while loading, or so recently that a source lagging up
+        # to lag_seconds may have missed it; serve the result but do not keep it.
+        return (
+            version == self.version
+            and time.monotonic() - self.invalidated_at >= lag_seconds
+        )
+
+    def snapshot(self) -> dict:
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            **self.stats.snapshot(),
+        }
+
+
+async def subscribe_invalidations(
+    connection,
+    exchange_name: str,
+    routing_key: str,
+    on_event: Callable[[aio_pika.abc.AbstractIncomingMessage], None],
+):
+    channel = await connection.channel()
+    exchange = await channel.get_exchange(exchange_name)
+    queue = await channel.declare_queue(exclusive=True, auto_delete=True)
+    await queue.bind(exchange, routing_key)
+
+    async def consume(message: aio_pika.abc.AbstractIncomingMessage):
+        async with message.process():
+            on_event(message)
+
+    await queue.consume(consume)
+    return channel
@@ -0,0 +1,97 @@
+import gzip
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from .config import get_settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SETTINGS = get_settings()
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def _encoders() -> dict:
+    encoders = {}
+    if brotli is not None:
+        encoders["br"] = lambda body: brotli.compress(
+            body, quality=SETTINGS.BROTLI_QUALITY
+        )
+    encoders["gzip"] = lambda body: gzip.compress(
+        body, compresslevel=SETTINGS.GZIP_LEVEL, mtime=0
+    )
+    return encoders
+
+
+# In order of preference when the client weighs encodings equally.
+ENCODERS = _encoders()
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    for name in ENCODERS:
+        weight = weights.get(name, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = name, weight
+    return best
+
+
+class CompressionMiddleware:
+    """Compress large, single-message responses with brotli or gzip.
+
+    Streamed responses pass through unchanged.
+    """
+
+    def __init__(self, app, minimum_size: int = SETTINGS.COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(
+            Headers(scope=scope).get("accept-encoding", "")
+        )
+        start = None
+
+        async def compressing_send(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+            headers = MutableHeaders(raw=list(start["headers"]))
+            body = message.get("body", b"")
+            if headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES):
+                headers.add_vary_header("Accept-Encoding")
+                if (
+                    encoding is not None
+                    and not message.get("more_body", False)
+                    and len(body) >= self.minimum_size
+                    and "content-encoding" not in headers
+                ):
+                    body = ENCODERS[encoding](body)
+                    headers["content-encoding"] = encoding
+                    headers["content-length"] = str(len(body))
+                    message = {**message, "body": body}
+            await send({**start, "headers": headers.raw})
+            start = None
+            await send(message)
+
+        await self.app(scope, receive, compressing_send)
@@ -10,6 +10,57 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     SECRET_KEY: str
     ALGORITHM: str
+    EXPORT_INTERVAL_MINUTES: int = 1
+    EXPORT_FULL_SNAPSHOT_MINUTES: int = 60
+    EXPORT_WATERMARK_OVERLAP_SECONDS: int = 5
+    EXPORT_CHUNK_SIZE: int = 500
+    EXPORT_WIRE_FORMAT: str = "msgpack"
+    EXPORT_COMPRESSION: str = "zstd"
+    LEADER_RENEW_SECONDS: int = 10
+    LEADER_LEASE_SECONDS: int = 30
+    PUBLISHER_POOL_SIZE: int = 4
+    PUBLISHER_MAX_IN_FLIGHT: int = 256
+    OUTBOX_RELAY_INTERVAL_SECONDS: int = 2
+    OUTBOX_BATCH_SIZE: int = 200
+    OUTBOX_RETENTION_HOURS: int = 72
+    SEARCH_RANK_CANDIDATES: int = 1000
+    CAR_CACHE_SIZE: int = 10000
+    CAR_CACHE_TTL_SECONDS: int = 60
+    CAR_BATCH_MAX_IDS: int = 500
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 30
+    HASH_WORKERS: int = 4
+    HASH_MAX_PENDING: int = 64
+    BULK_COPY_BATCH_SIZE: int = 5000
+    BULK_MAX_ERRORS: int = 1000
+    COMPRESSION_MIN_BYTES: int = 1024
+    GZIP_LEVEL: int = 5
+    BROTLI_QUALITY: int = 4
+    POSTGRES_READ_REPLICAS: str = ""
+    ADMIN_USERNAMES: str = ""
+    POSTGRES_LOCK_HOST: str = ""
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = False
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PGBOUNCER: bool = False
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_HEALTH_INTERVAL_SECONDS: int = 5
+    REPLICA_CONNECT_TIMEOUT_SECONDS: float = 2.0
+    READ_YOUR_WRITES_SECONDS: int = 5
+    SLOW_QUERY_MS: float = 200.0
+    SLOW_QUERY_EXPLAIN_SAMPLE: float = 0.1
+    QUERY_COUNT_LOG_THRESHOLD: int = 25
+    N_PLUS_ONE_THRESHOLD: int = 10
+    ANALYTICS_REFRESH_MINUTES: int = 5
+    RELATED_TOP_K: int = 20
+    RELATED_MAX_ORDER_ITEMS: int = 50
+    RELATED_REBUILD_MINUTES: int = 10
+    RELATED_FULL_REBUILD_HOURS: int = 24
+    RELATED_ORDER_ID_OVERLAP: int = 1000
 
     class Config:
         env_file = ".env"
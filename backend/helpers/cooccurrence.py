@@ -0,0 +1,236 @@
+import numpy as np
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+
+def pair_counts(
+    order_ids: np.ndarray, car_ids: np.ndarray, max_order_items: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Count the orders each ordered pair of distinct cars appears in together.
+
+    Returns the cars seen, sorted, and the pairs as sorted keys
+    ``row * len(cars) + col`` over indexes into them, with their counts.
+    """
+    order = np.argsort(order_ids, kind="stable")
+    order_ids, car_ids = order_ids[order], car_ids[order]
+    starts = np.flatnonzero(np.r_[True, order_ids[1:] != order_ids[:-1]])
+    sizes = np.diff(np.r_[starts, len(order_ids)])
+    # Pairs grow with the square of the order size: a few huge orders would
+    # dominate both the build and the results.
+    keep = np.repeat((sizes > 1) & (sizes <= max_order_items), sizes)
+    cars, dense = np.unique(car_ids, return_inverse=True)
+    dense = dense[keep].astype(np.int64)
+    sizes = sizes[(sizes > 1) & (sizes <= max_order_items)]
+    starts = np.cumsum(sizes) - sizes
+
+    # Each item pairs with every item of its order, itself included.
+    item_sizes = np.repeat(sizes, sizes)
+    item_starts = np.repeat(starts, sizes)
+    left = np.repeat(np.arange(len(dense)), item_sizes)
+    first = np.repeat(np.cumsum(item_sizes) - item_sizes, item_sizes)
+    right = np.repeat(item_starts, item_sizes) + np.arange(len(left)) - first
+    distinct = left != right
+    keys = dense[left[distinct]] * len(cars) + dense[right[distinct]]
+    keys, counts = np.unique(keys, return_counts=True)
+    return cars, keys, counts
+
+
+def merge_counts(
+    cars: np.ndarray,
+    keys: np.ndarray,
+    counts: np.ndarray,
+    other_cars: np.ndarray,
+    other_keys: np.ndarray,
+    other_counts: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sum two pair_counts results over the union of their cars."""
+    union = np.union1d(cars, other_cars)
+
+    def remap(cars, keys):
+        index = np.searchsorted(union, cars).astype(np.int64)
+        return index[keys // len(cars)] * len(union) + index[keys % len(cars)]
+
+    keys, inverse = np.unique(
+        np.concatenate([remap(cars, keys), remap(other_cars, other_keys)]),
+        return_inverse=True,
+    )
+    counts = np.bincount(inverse, np.concatenate([counts, other_counts]))
+    return union, keys, counts.astype(np.int64)
+
+
+class CoOccurrence:
+    """Cars bought together, from the pair counts of a set of orders.
+
+    Holds every pair count, to score later orders against, and the ``top_k``
+    pairs of each car by count, then car id.
+    """
+
+    def __init__(
+        self,
+        orders: np.ndarray,
+        cars: np.ndarray,
+        keys: np.ndarray,
+        counts: np.ndarray,
+        top_k: int,
+        full_at: Optional[datetime] = None,
+    ):
+        self.orders = orders
+        self.cars, self.keys, self.counts = cars, keys, counts
+        n = len(self.cars)
+        rows, cols = self.keys // n, self.keys % n
+        ranked = np.lexsort((cols, -self.counts, rows))
+        rows, cols, counts = rows[ranked], cols[ranked], self.counts[ranked]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+        top = rank < top_k
+        self.rows = rows[top]
+        self.neighbors = self.cars[cols[top]]
+        self.scores = counts[top]
+        self.built_at = datetime.now(timezone.utc)
+        # When the counts were last read from every order.
+        self.full_at = full_at or self.built_at
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    def has_order(self, order_id: int) -> bool:
+        i = np.searchsorted(self.orders, order_id)
+        return i < len(self.orders) and self.orders[i] == order_id
+
+    def _position(self, car_id: int) -> Optional[int]:
+        i = int(np.searchsorted(self.cars, car_id))
+        if i < len(self.cars) and self.cars[i] == car_id:
+            return i
+        return None
+
+    def count(self, car_id: int, other_id: int) -> int:
+        row, col = self._position(car_id), self._position(other_id)
+        if row is None or col is None:
+            return 0
+        key = row * len(self.cars) + col
+        i = np.searchsorted(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return int(self.counts[i])
+        return 0
+
+    def top(self, car_id: int) -> list[tuple[int, int]]:
+        row = self._position(car_id)
+        if row is None:
+            return []
+        start, end = np.searchsorted(self.rows, [row, row + 1])
+        return list(
+            zip(self.neighbors[start:end].tolist(), self.scores[start:end].tolist())
+        )
+
+
+class RelatedIndex:
+    """The current CoOccurrence plus the orders it has not seen yet.
+
+    An added order only raises the counts of pairs among its own cars, so
+    each of their rows is its old top k merged with those pairs, rescored.
+    """
+
+    def __init__(self, top_k: int, max_order_items: int, order_id_overlap: int):
+        self.top_k = top_k
+        self.max_order_items = max_order_items
+        # Orders commit out of id order: one this far below the newest order
+        # read may still be missing from a read.
+        self.order_id_overlap = order_id_overlap
+        self.current = None
+        # order_id -> car_ids of the orders added since `current` was read
+        self.pending = {}
+        self.added = {}
+        self.rescored = {}
+
+    def build(self, order_ids: np.ndarray, car_ids: np.ndarray) -> CoOccurrence:
+        cars, keys, counts = pair_counts(order_ids, car_ids, self.max_order_items)
+        return CoOccurrence(np.unique(order_ids), cars, keys, counts, self.top_k)
+
+    def low_water(self) -> int:
+        """Orders above this id may be missing from `current`; an incremental
+        read starts here."""
+        if self.current is None or not len(self.current):
+            return 0
+        return max(int(self.current.orders[-1]) - self.order_id_overlap, 0)
+
+    def extend(
+        self, current: CoOccurrence, order_ids: np.ndarray, car_ids: np.ndarray
+    ) -> CoOccurrence:
+        """current plus the orders among these it does not have yet."""
+        if len(current):
+            known = np.searchsorted(current.orders, order_ids)
+            known = np.minimum(known, len(current) - 1)
+            new = current.orders[known] != order_ids
+            order_ids, car_ids = order_ids[new], car_ids[new]
+        cars, keys, counts = merge_counts(
+            current.cars,
+            current.keys,
+            current.counts,
+            *pair_counts(order_ids, car_ids, self.max_order_items),
+        )
+        # New orders are few and mostly last: insert rather than re-sort all.
+        added = np.unique(order_ids)
+        orders = np.insert(
+            current.orders, np.searchsorted(current.orders, added), added
+        )
+        return CoOccurrence(
+            orders,
+            cars,
+            keys,
+            counts,
+            self.top_k,
+            current.full_at,
+        )
+
+    def replace(self, current: CoOccurrence):
+        self.current = current
+        self.added, self.rescored = {}, {}
+        low_water = self.low_water()
+        pending, self.pending = self.pending, {}
+        for order_id, car_ids in pending.items():
+            # Older orders missing from it were deleted meanwhile.
+            if order_id > low_water and not current.has_order(order_id):
+                self.add_order(order_id, car_ids)
+
+    def add_order(self, order_id: int, car_ids: Iterable[int]):
+        car_ids = sorted(set(car_ids))
+        if order_id in self.pending or (
+            self.current is not None and self.current.has_order(order_id)
+        ):
+            return
+        self.pending[order_id] = car_ids
+        if self.current is None or not 1 < len(car_ids) <= self.max_order_items:
+            return
+        for car_id in car_ids:
+            added = self.added.setdefault(car_id, {})
+            row = self.rescored.get(car_id)
+            scores = dict(self.current.top(car_id) if row is None else row)
+            for other_id in car_ids:
+                if other_id != car_id:
+                    added[other_id] = added.get(other_id, 0) + 1
+                    scores[other_id] = (
+                        self.current.count(car_id, other_id) + added[other_id]
+                    )
+            self.rescored[car_id] = sorted(
+                scores.items(), key=lambda pair: (-pair[1], pair[0])
+            )[: self.top_k]
+
+    def related(self, car_id: int, limit: int) -> Optional[list[tuple[int, int]]]:
+        """(car_id, orders together) pairs, most often bought together first;
+        None until the first build."""
+        if self.current is None:
+            return None
+        row = self.rescored.get(car_id)
+        if row is None:
+            row = self.current.top(car_id)
+        return row[:limit]
+
+    def snapshot(self) -> dict:
+        current = self.current
+        return {
+            "built_at": current.built_at if current else None,
+            "full_at": current.full_at if current else None,
+            "orders": len(current) if current else 0,
+            "cars": len(current.cars) if current else 0,
+            "pairs": len(current.keys) if current else 0,
+            "pending_orders": len(self.pending),
+        }
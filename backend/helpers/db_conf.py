@@ -1,14 +1,83 @@
+import uuid
+from fastapi import Depends, Request
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import get_settings
+from .loader import Loaders
+from .metrics import instrument_engine
+from .pool import TimedNullPool, TimedQueuePool
+from .querylog import log_queries
+from .replicas import (
+    PIN_COOKIE,
+    Replica,
+    ReplicaSet,
+    pinned_by_header,
+    requester_key,
+)
 
 SETTINGS = get_settings()
-SQLALCHEMY_DATABASE_URL = f"postgresql+asyncpg://{SETTINGS.POSTGRES_USER}:{SETTINGS.POSTGRES_PASSWORD}@{SETTINGS.POSTGRES_USER}:5432/{SETTINGS.POSTGRES_DB}"
-ENGINE = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=True)
+
+
+def database_url(host: str) -> str:
+    if ":" not in host:
+        host = f"{host}:5432"
+    return f"postgresql+asyncpg://{SETTINGS.POSTGRES_USER}:{SETTINGS.POSTGRES_PASSWORD}@{host}/{SETTINGS.POSTGRES_DB}"
+
+
+def make_engine(url: str, **connect_args):
+    connect_args["prepared_statement_cache_size"] = SETTINGS.DB_STATEMENT_CACHE_SIZE
+    if SETTINGS.DB_PGBOUNCER:
+        # In transaction pooling each transaction may land on another server
+        # connection, so nothing can stay prepared and PgBouncer does the pooling.
+        connect_args.update(
+            prepared_statement_cache_size=0,
+            statement_cache_size=0,
+            prepared_statement_name_func=lambda: f"__asyncpg_{uuid.uuid4()}__",
+        )
+        return create_async_engine(
+            url,
+            echo=SETTINGS.DB_ECHO,
+            poolclass=TimedNullPool,
+            connect_args=connect_args,
+        )
+    return create_async_engine(
+        url,
+        echo=SETTINGS.DB_ECHO,
+        poolclass=TimedQueuePool,
+        pool_size=SETTINGS.DB_POOL_SIZE,
+        max_overflow=SETTINGS.DB_MAX_OVERFLOW,
+        pool_timeout=SETTINGS.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=SETTINGS.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=SETTINGS.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+
+
+SQLALCHEMY_DATABASE_URL = database_url(SETTINGS.POSTGRES_USER)
+ENGINE = make_engine(SQLALCHEMY_DATABASE_URL)
 AsyncSessionLocal = sessionmaker(
     bind=ENGINE, class_=AsyncSession, expire_on_commit=False
 )
+REPLICAS = ReplicaSet(
+    AsyncSessionLocal,
+    [
+        Replica(
+            host,
+            make_engine(
+                database_url(host), timeout=SETTINGS.REPLICA_CONNECT_TIMEOUT_SECONDS
+            ),
+        )
+        for host in (h.strip() for h in SETTINGS.POSTGRES_READ_REPLICAS.split(","))
+        if host
+    ],
+)
+
+instrument_engine(ENGINE, "primary")
+log_queries(ENGINE)
+for replica in REPLICAS.replicas:
+    instrument_engine(replica.engine, replica.name)
+    log_queries(replica.engine)
 
 ORM_BASE = declarative_base()
 
@@ -16,3 +85,25 @@ ORM_BASE = declarative_base()
 async def get_session():
     async with AsyncSessionLocal() as session:
         yield session
+
+
+async def get_read_session(request: Request):
+    # Reads only, whatever the method: a POST here does not pin the caller.
+    request.state.read_only = True
+    pinned = bool(REPLICAS.replicas) and (
+        PIN_COOKIE in request.cookies
+        or pinned_by_header(request.headers)
+        or REPLICAS.is_pinned(requester_key(request.headers, request.client))
+    )
+    async with REPLICAS.session(pinned) as session:
+        yield session
+
+
+async def get_loaders(session: AsyncSession = Depends(get_session)) -> Loaders:
+    return Loaders(session)
+
+
+async def get_read_loaders(
+    session: AsyncSession = Depends(get_read_session),
+) -> Loaders:
+    return Loaders(session)
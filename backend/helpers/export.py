@@ -0,0 +1,195 @@
+import asyncio
+import time
+import uuid
+import aio_pika
+from datetime import timedelta
+from sqlalchemy import select, delete, inspect, text
+from .config import get_settings
+from .db_conf import AsyncSessionLocal, REPLICAS
+from .wire import encode_payload, pack_rows, resolve_format
+from ..models import (
+    UserModel,
+    CarModel,
+    OrderModel,
+    order_items,
+    DeletedRowModel,
+    ExportStateModel,
+)
+
+SETTINGS = get_settings()
+QUEUE_NAME = "db_export_queue"
+EXPORT_STATE_NAME = "db_export"
+EXPORTED_MODELS = {"users": UserModel, "cars": CarModel, "orders": OrderModel}
+# updated_at is the writing transaction's start time, not its commit time, so
+# the watermark may not pass the start of a transaction still open: its rows
+# would commit below the next run's `since`. Read on the primary, with the WAL
+# position every transaction that started earlier has committed by.
+EXPORT_HORIZON = text(
+    "SELECT least(now(), min(xact_start)), pg_current_wal_lsn() "
+    "FROM pg_stat_activity "
+    "WHERE datname = current_database() AND backend_type = 'client backend' "
+    "AND pid <> pg_backend_pid()"
+)
+REPLAYED = text(
+    "SELECT NOT pg_is_in_recovery() OR pg_last_wal_replay_lsn() >= CAST(:lsn AS pg_lsn)"
+)
+
+
+def row_to_dict(obj) -> dict:
+    state = inspect(obj)
+    return {
+        attr.key: state.dict[attr.key]
+        for attr in state.mapper.column_attrs
+        if attr.key in state.dict
+    }
+
+
+class ChunkPublisher:
+    def __init__(self, stream, export_id: str, mode: str):
+        self.stream = stream
+        self.export_id = export_id
+        self.mode = mode
+        self.seq = 0
+        self.counts = {}
+        self.wire_format, self.compression = resolve_format(
+            SETTINGS.EXPORT_WIRE_FORMAT, SETTINGS.EXPORT_COMPRESSION
+        )
+
+    async def _send(self, payload: dict):
+        body, content_type, content_encoding = encode_payload(
+            payload, self.wire_format, self.compression
+        )
+        message = aio_pika.Message(
+            body=body,
+            content_type=content_type,
+            content_encoding=content_encoding,
+            delivery_mode=2,
+            headers={"export_id": self.export_id, "seq": self.seq},
+        )
+        await self.stream.publish(message, QUEUE_NAME)
+        self.seq += 1
+
+    async def send_chunk(self, table: str, op: str, rows: list):
+        payload = {
+            "type": "chunk",
+            "export_id": self.export_id,
+            "mode": self.mode,
+            "seq": self.seq,
+            "table": table,
+            "op": op,
+        }
+        if op == "delete":
+            payload["ids"] = rows
+        else:
+            payload.update(pack_rows(table, rows))
+        await self._send(payload)
+        key = f"{op} {table}"
+        self.counts[key] = self.counts.get(key, 0) + len(rows)
+
+    async def send_end(self, since, until):
+        await self.stream.flush()
+        await self._send(
+            {
+                "type": "end",
+                "export_id": self.export_id,
+                "mode": self.mode,
+                "seq": self.seq,
+                "chunks": self.seq,
+                "since": since,
+                "until": until,
+            }
+        )
+
+
+async def export_horizon(session, reader):
+    """The time every row updated before is committed and readable on the
+    reader, or None if the reader does not catch up within the lag bound."""
+    until, lsn = (await session.execute(EXPORT_HORIZON)).one()
+    deadline = time.monotonic() + SETTINGS.REPLICA_MAX_LAG_SECONDS
+    while not (await reader.execute(REPLAYED, {"lsn": lsn})).scalar_one():
+        if time.monotonic() > deadline:
+            return None
+        await asyncio.sleep(0.1)
+    return until
+
+
+async def export_db_data(publisher):
+    # Rows stream from a read replica; the watermark lives on the primary.
+    async with AsyncSessionLocal() as session, REPLICAS.session() as reader:
+        until = await export_horizon(session, reader)
+        if until is None:
+            print("DB export skipped: the read replica is lagging")
+            return
+        state = await session.get(ExportStateModel, EXPORT_STATE_NAME)
+
+        full = (
+            state is None
+            or state.last_full_at is None
+            or until - state.last_full_at
+            >= timedelta(minutes=SETTINGS.EXPORT_FULL_SNAPSHOT_MINUTES)
+        )
+        overlap = timedelta(seconds=SETTINGS.EXPORT_WATERMARK_OVERLAP_SECONDS)
+        # A full snapshot only upserts the rows that exist, so it still sends
+        # the deletes since the last run; the prune below drops them.
+        deletes_since = None if state is None else state.watermark - overlap
+        since = None if full else deletes_since
+        chunk_size = SETTINGS.EXPORT_CHUNK_SIZE
+
+        async with publisher.stream() as stream:
+            chunks = ChunkPublisher(
+                stream, uuid.uuid4().hex, "full" if full else "incremental"
+            )
+
+            for name, model in EXPORTED_MODELS.items():
+                stmt = select(model).execution_options(yield_per=chunk_size)
+                if since is not None:
+                    stmt = stmt.where(model.updated_at > since)
+                result = await reader.stream_scalars(stmt)
+                async for partition in result.partitions():
+                    await chunks.send_chunk(
+                        name, "upsert", [row_to_dict(obj) for obj in partition]
+                    )
+
+            items_stmt = select(order_items).execution_options(yield_per=chunk_size)
+            if since is not None:
+                items_stmt = items_stmt.where(
+                    order_items.c.order_id.in_(
+                        select(OrderModel.id).where(OrderModel.updated_at > since)
+                    )
+                )
+            result = await reader.stream(items_stmt)
+            async for partition in result.partitions():
+                await chunks.send_chunk(
+                    "order_items", "upsert", [row._asdict() for row in partition]
+                )
+
+            if deletes_since is not None:
+                for name in EXPORTED_MODELS:
+                    result = await reader.stream_scalars(
+                        select(DeletedRowModel.row_id)
+                        .where(
+                            DeletedRowModel.table_name == name,
+                            DeletedRowModel.deleted_at > deletes_since,
+                        )
+                        .execution_options(yield_per=chunk_size)
+                    )
+                    async for partition in result.partitions():
+                        await chunks.send_chunk(name, "delete", list(partition))
+
+            if full or chunks.seq:
+                await chunks.send_end(since, until)
+                print(
+                    f"DB {chunks.mode} export sent to queue in {chunks.seq} messages: "
+                    + ", ".join(f"{n} {k}" for k, n in chunks.counts.items())
+                )
+
+        if state is None:
+            state = ExportStateModel(name=EXPORT_STATE_NAME, watermark=until)
+            session.add(state)
+        state.watermark = until
+        if full:
+            state.last_full_at = until
+        await session.execute(
+            delete(DeletedRowModel).where(DeletedRowModel.deleted_at <= until - overlap)
+        )
+        await session.commit()
@@ -1,17 +1,105 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 import bcrypt
 from .config import get_settings
 
 SETTINGS = get_settings()
+# bcrypt releases the GIL, so worker threads hash in parallel off the event loop.
+HASH_EXECUTOR = (
+    ThreadPoolExecutor(max_workers=SETTINGS.HASH_WORKERS, thread_name_prefix="bcrypt")
+    if SETTINGS.HASH_WORKERS > 0
+    else None
+)
 
 
-def hash_password(password: str) -> str:
+class HashStats:
+    def __init__(self):
+        self.completed = 0
+        self.rejected = 0
+        self.pending = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.hash_total = 0.0
+        self.hash_max = 0.0
+
+    def observe(self, wait: float, elapsed: float):
+        self.completed += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.hash_total += elapsed
+        self.hash_max = max(self.hash_max, elapsed)
+
+    def snapshot(self) -> dict:
+        done = self.completed or 1
+        return {
+            "workers": SETTINGS.HASH_WORKERS,
+            "max_pending": SETTINGS.HASH_MAX_PENDING,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_wait_avg_ms": self.wait_total / done * 1000,
+            "queue_wait_max_ms": self.wait_max * 1000,
+            "hash_avg_ms": self.hash_total / done * 1000,
+            "hash_max_ms": self.hash_max * 1000,
+        }
+
+
+HASH_STATS = HashStats()
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    return fn(*args), started, time.perf_counter()
+
+
+class HashBusy(Exception):
+    """Too many password operations are already queued."""
+
+
+def _release():
+    HASH_STATS.pending -= 1
+
+
+async def _run(fn, *args):
+    if HASH_STATS.pending >= SETTINGS.HASH_MAX_PENDING:
+        HASH_STATS.rejected += 1
+        raise HashBusy()
+    HASH_STATS.pending += 1
+    submitted = time.perf_counter()
+    if HASH_EXECUTOR is None:
+        try:
+            timed = _timed(fn, *args)
+        finally:
+            _release()
+    else:
+        loop = asyncio.get_running_loop()
+        future = HASH_EXECUTOR.submit(_timed, fn, *args)
+        # Released when the worker is done, not when the caller stops waiting:
+        # a cancelled request does not stop a hash already running.
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(_release))
+        timed = await asyncio.wrap_future(future)
+    result, started, finished = timed
+    HASH_STATS.observe(started - submitted, finished - started)
+    return result
+
+
+def _hash(password: str) -> str:
     password_bytes = password.encode("utf-8")
     return bcrypt.hashpw(
         password_bytes, bcrypt.gensalt(rounds=SETTINGS.SALT_ROUNDS)
     ).decode("utf-8")
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+def _verify(plain_password: str, hashed_password: str) -> bool:
     password_bytes = plain_password.encode("utf-8")
     hashed_bytes = hashed_password.encode("utf-8")
     return bcrypt.checkpw(password_bytes, hashed_bytes)
+
+
+async def hash_password(password: str) -> str:
+    return await _run(_hash, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run(_verify, plain_password, hashed_password)
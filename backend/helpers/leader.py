@@ -0,0 +1,120 @@
+import os
+import socket
+from datetime import datetime, timezone
+from functools import wraps
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from .config import get_settings
+from .db_conf import SQLALCHEMY_DATABASE_URL, database_url
+
+SETTINGS = get_settings()
+SCHEDULER_LOCK_KEY = 0x5CED01E
+
+
+class LeaderElector:
+    def __init__(self, lock_key: int = SCHEDULER_LOCK_KEY):
+        self.lock_key = lock_key
+        self.identity = f"{socket.gethostname()}:{os.getpid()}"[:63]
+        # The lock is held by one server session, which PgBouncer's transaction
+        # pooling would not keep; POSTGRES_LOCK_HOST can bypass it.
+        self.engine = create_async_engine(
+            (
+                database_url(SETTINGS.POSTGRES_LOCK_HOST)
+                if SETTINGS.POSTGRES_LOCK_HOST
+                else SQLALCHEMY_DATABASE_URL
+            ),
+            poolclass=NullPool,
+            isolation_level="AUTOCOMMIT",
+            connect_args={
+                "server_settings": {
+                    "application_name": self.identity,
+                    "idle_session_timeout": str(SETTINGS.LEADER_LEASE_SECONDS * 1000),
+                }
+            },
+        )
+        self.conn = None
+        self.leader_since = None
+        self.renewed_at = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.conn is not None
+
+    async def campaign(self):
+        if self.conn is not None:
+            try:
+                await self.conn.execute(text("SELECT 1"))
+                self.renewed_at = datetime.now(timezone.utc)
+                return
+            except Exception as e:
+                print(f"Lost scheduler leadership: {e}")
+                await self._drop()
+
+        conn = await self.engine.connect()
+        try:
+            acquired = (
+                await conn.execute(
+                    text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_key}
+                )
+            ).scalar()
+        except Exception:
+            await conn.close()
+            raise
+        if not acquired:
+            await conn.close()
+            return
+        self.conn = conn
+        self.leader_since = self.renewed_at = datetime.now(timezone.utc)
+        print(f"{self.identity} became scheduler leader")
+
+    async def resign(self):
+        if self.conn is None:
+            return
+        try:
+            await self.conn.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": self.lock_key}
+            )
+        finally:
+            await self._drop()
+
+    async def _drop(self):
+        conn, self.conn = self.conn, None
+        self.leader_since = self.renewed_at = None
+        try:
+            await conn.close()
+        except Exception:
+            await conn.invalidate()
+
+    async def current_leader(self, session) -> dict | None:
+        result = await session.execute(
+            text(
+                "SELECT a.application_name, a.client_addr, a.backend_start "
+                "FROM pg_locks l JOIN pg_stat_activity a ON a.pid = l.pid "
+                "WHERE l.locktype = 'advisory' AND l.granted "
+                "AND l.classid = :classid AND l.objid = :objid AND l.objsubid = 1"
+            ),
+            {"classid": self.lock_key >> 32, "objid": self.lock_key & 0xFFFFFFFF},
+        )
+        row = result.first()
+        if row is None:
+            return None
+        return {
+            "identity": row.application_name,
+            "client_addr": str(row.client_addr) if row.client_addr else None,
+            "connected_at": row.backend_start,
+        }
+
+    async def dispose(self):
+        await self.resign()
+        await self.engine.dispose()
+
+
+def leader_only(elector: LeaderElector, job):
+    @wraps(job)
+    async def wrapper(*args, **kwargs):
+        if not elector.is_leader:
+            return None
+        return await job(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,90 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, Iterable
+
+
+class DataLoader:
+    """Batch and dedupe lookups by key.
+
+    Keys requested while other coroutines are still running are collected and
+    resolved by a single ``batch_load(keys) -> {key: value}`` call. Each key is
+    loaded at most once per loader, and keys missing from the result resolve
+    to None.
+    """
+
+    def __init__(
+        self,
+        batch_load: Callable[[list], Awaitable[dict]],
+        lock: asyncio.Lock,
+    ):
+        self.batch_load = batch_load
+        self.lock = lock
+        self.futures = {}
+        self.queue = []
+        self.dispatches = set()
+
+    def _future(self, key: Hashable) -> asyncio.Future:
+        future = self.futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self.futures[key] = loop.create_future()
+            self.queue.append(key)
+            if len(self.queue) == 1:
+                # Dispatch once the coroutines already scheduled have had a
+                # chance to add their keys to this batch.
+                loop.call_soon(self._dispatch_soon)
+        return future
+
+    def _dispatch_soon(self):
+        task = asyncio.ensure_future(self._dispatch())
+        self.dispatches.add(task)
+        task.add_done_callback(self.dispatches.discard)
+
+    async def _dispatch(self):
+        keys, self.queue = self.queue, []
+        try:
+            # The loaders of one request share its session, which runs one
+            # statement at a time.
+            async with self.lock:
+                values = await self.batch_load(keys)
+        except BaseException as e:
+            for key in keys:
+                # Forget the failure so a later load can retry.
+                future = self.futures.pop(key)
+                if isinstance(e, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        for key in keys:
+            self.futures[key].set_result(values.get(key))
+
+    async def load(self, key: Hashable) -> Any:
+        # Shielded: one caller giving up must not cancel a shared result.
+        return await asyncio.shield(self._future(key))
+
+    async def load_many(self, keys: Iterable[Hashable]) -> list:
+        futures = [self._future(key) for key in keys]
+        return list(await asyncio.shield(asyncio.gather(*futures)))
+
+
+class Loaders:
+    """The data loaders of one request, one per batch function, all bound to
+    the request's session.
+
+        cars = await loaders(load_cars).load_many(car_ids)
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.lock = asyncio.Lock()
+        self.loaders = {}
+
+    def __call__(self, batch_load: Callable[[Any, list], Awaitable[dict]]):
+        loader = self.loaders.get(batch_load)
+        if loader is None:
+            loader = self.loaders[batch_load] = DataLoader(
+                lambda keys: batch_load(self.session, keys), self.lock
+            )
+        return loader
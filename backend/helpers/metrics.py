@@ -0,0 +1,303 @@
+import bisect
+import hashlib
+import re
+import time
+from functools import lru_cache
+from sqlalchemy import event
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, doc: str, labelnames: tuple = ()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = labelnames
+        self.values = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield self.name, _labels(self.labelnames, labels), value
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labelnames: tuple = (),
+        buckets: tuple = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.doc = doc
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [per-bucket counts, +Inf last; sum]
+        self.series = {}
+
+    def observe(self, labels: tuple, value: float):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self):
+        for labels, (counts, total) in self.series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    _labels(self.labelnames, labels, f'le="{bound}"'),
+                    cumulative,
+                )
+            yield f"{self.name}_sum", _labels(self.labelnames, labels), total
+            yield f"{self.name}_count", _labels(self.labelnames, labels), cumulative
+
+
+class Collected:
+    """A gauge or counter whose values are read from `collect` at scrape time."""
+
+    def __init__(self, name: str, doc: str, type: str, labelnames: tuple, collect):
+        self.name = name
+        self.doc = doc
+        self.type = type
+        self.labelnames = labelnames
+        self.collect = collect
+
+    def samples(self):
+        for labels, value in self.collect().items():
+            yield self.name, _labels(self.labelnames, labels), value
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> bytes:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.doc}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+        return ("\n".join(lines) + "\n").encode()
+
+
+REGISTRY = Registry()
+# Requests being served, keyed by id(scope). Their route label is read at
+# scrape time, once routing has filled in scope["route"].
+ACTIVE_REQUESTS = {}
+
+
+def route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", "unmatched")
+
+
+def _in_flight() -> dict:
+    counts = {}
+    for scope in list(ACTIVE_REQUESTS.values()):
+        key = (scope["method"], route_label(scope))
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+HTTP_REQUESTS = REGISTRY.register(
+    Counter(
+        "http_requests_total",
+        "HTTP requests by route and status.",
+        ("method", "route", "status"),
+    )
+)
+HTTP_LATENCY = REGISTRY.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Time from receiving a request to sending its last byte.",
+        ("method", "route"),
+    )
+)
+REGISTRY.register(
+    Collected(
+        "http_requests_in_flight",
+        "HTTP requests currently being served.",
+        "gauge",
+        ("method", "route"),
+        _in_flight,
+    )
+)
+SQL_LATENCY = REGISTRY.register(
+    Histogram(
+        "sql_statement_duration_seconds",
+        "SQL statement execution time by statement fingerprint.",
+        ("database", "operation", "fingerprint"),
+    )
+)
+SQL_STATEMENTS = {}
+REGISTRY.register(
+    Collected(
+        "sql_statement_info",
+        "Normalized SQL text of each statement fingerprint.",
+        "gauge",
+        ("fingerprint", "statement"),
+        lambda: {key: 1 for key in SQL_STATEMENTS.items()},
+    )
+)
+
+
+INSTRUMENTED_ENGINES = {}
+DATABASE_LABELS = {}
+
+
+def _pools(read) -> dict:
+    return {
+        (database,): read(engine.pool)
+        for database, engine in INSTRUMENTED_ENGINES.items()
+        if hasattr(engine.pool, "stats")
+    }
+
+
+def _pool_connections() -> dict:
+    counts = {}
+    for database, engine in INSTRUMENTED_ENGINES.items():
+        snapshot = engine.pool.snapshot() if hasattr(engine.pool, "stats") else {}
+        for state in ("checked_out", "idle", "overflow"):
+            if state in snapshot:
+                counts[(database, state)] = snapshot[state]
+    return counts
+
+
+REGISTRY.register(
+    Collected(
+        "db_pool_connections",
+        "Pooled database connections by state.",
+        "gauge",
+        ("database", "state"),
+        _pool_connections,
+    )
+)
+REGISTRY.register(
+    Collected(
+        "db_pool_acquires_total",
+        "Connection checkouts.",
+        "counter",
+        ("database",),
+        lambda: _pools(lambda pool: pool.stats.acquired),
+    )
+)
+REGISTRY.register(
+    Collected(
+        "db_pool_acquire_wait_seconds_total",
+        "Time checkouts spent waiting for a connection.",
+        "counter",
+        ("database",),
+        lambda: _pools(lambda pool: pool.stats.wait_total),
+    )
+)
+REGISTRY.register(
+    Collected(
+        "db_pool_timeouts_total",
+        "Checkouts that gave up waiting for a connection.",
+        "counter",
+        ("database",),
+        lambda: _pools(lambda pool: pool.stats.timeouts),
+    )
+)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def recording_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = id(scope)
+        ACTIVE_REQUESTS[token] = scope
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, recording_send)
+        finally:
+            elapsed = time.perf_counter() - started
+            del ACTIVE_REQUESTS[token]
+            route = route_label(scope)
+            HTTP_LATENCY.observe((scope["method"], route), elapsed)
+            HTTP_REQUESTS.inc((scope["method"], route, str(status)))
+
+
+NORMALIZERS = (
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\$\d+|\b\d+(?:\.\d+)?\b"), "?"),
+    # IN lists and multi-row VALUES vary in length with the data.
+    (re.compile(r"\(\s*\?[^()]*\)"), "(...)"),
+    (re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+"), "(...)"),
+    (re.compile(r"\s+"), " "),
+)
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> tuple[str, str, str]:
+    """Return (operation, fingerprint id, normalized text) for a SQL statement."""
+    text = statement
+    for pattern, replacement in NORMALIZERS:
+        text = pattern.sub(replacement, text)
+    text = text.strip()
+    operation = text.split(" ", 1)[0].upper()
+    return operation, hashlib.sha1(text.encode()).hexdigest()[:12], text
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    if context is not None:
+        context.query_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    if context is None:
+        return
+    elapsed = time.perf_counter() - context.query_started
+    operation, key, text = fingerprint(statement)
+    if key not in SQL_STATEMENTS:
+        SQL_STATEMENTS[key] = text[:500]
+    SQL_LATENCY.observe((DATABASE_LABELS[conn.engine], operation, key), elapsed)
+
+
+def instrument_engine(engine, database: str):
+    INSTRUMENTED_ENGINES[database] = engine
+    DATABASE_LABELS[engine.sync_engine] = database
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
@@ -0,0 +1,136 @@
+import json
+import aio_pika
+from datetime import timedelta
+from itertools import chain
+from typing import List, Optional
+from sqlalchemy import select, update, delete, func, insert, literal, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from .config import get_settings
+from .db_conf import AsyncSessionLocal
+from ..models import OutboxEventModel
+
+SETTINGS = get_settings()
+EVENTS_EXCHANGE = "db_events"
+# One relay at a time across replicas: concurrent batches would publish a
+# later event of a car before an earlier one still held by another relay.
+RELAY_LOCK = text("SELECT pg_try_advisory_xact_lock(:key)")
+RELAY_LOCK_KEY = 0x0B7B0C5
+
+
+def record_event(
+    session: AsyncSession,
+    aggregate: str,
+    aggregate_id: int,
+    event_type: str,
+    payload: dict,
+):
+    session.add(
+        OutboxEventModel(
+            aggregate=aggregate,
+            aggregate_id=aggregate_id,
+            event_type=f"{aggregate}.{event_type}",
+            payload=payload,
+        )
+    )
+
+
+def record_events_from(changed, aggregate: str, event_type: str, columns: List[str]):
+    """INSERT one outbox row per row of a RETURNING CTE, in the same statement.
+
+    The payload is a JSON object of ``columns``; ``changed`` must expose ``id``.
+    """
+    payload = func.jsonb_build_object(
+        *chain.from_iterable((literal(name), changed.c[name]) for name in columns)
+    )
+    return insert(OutboxEventModel).from_select(
+        ["aggregate", "aggregate_id", "event_type", "payload"],
+        select(
+            literal(aggregate),
+            changed.c.id,
+            literal(f"{aggregate}.{event_type}"),
+            payload,
+        ),
+    )
+
+
+def build_message(event, replay: bool = False) -> aio_pika.Message:
+    return aio_pika.Message(
+        body=json.dumps(event.payload).encode(),
+        content_type="application/json",
+        delivery_mode=2,
+        message_id=str(event.id),
+        type=event.event_type,
+        timestamp=event.created_at,
+        headers={
+            "outbox_id": event.id,
+            "aggregate": event.aggregate,
+            "aggregate_id": event.aggregate_id,
+            "replay": replay,
+        },
+    )
+
+
+async def relay_outbox(publisher) -> int:
+    published = 0
+    while True:
+        async with AsyncSessionLocal() as session:
+            locked = await session.scalar(RELAY_LOCK, {"key": RELAY_LOCK_KEY})
+            if not locked:
+                break
+            result = await session.execute(
+                select(OutboxEventModel)
+                .where(OutboxEventModel.published_at.is_(None))
+                .order_by(OutboxEventModel.id)
+                .limit(SETTINGS.OUTBOX_BATCH_SIZE)
+            )
+            events = result.scalars().all()
+            if not events:
+                break
+            await publisher.publish_batch(
+                ((build_message(e), e.event_type) for e in events), EVENTS_EXCHANGE
+            )
+            await session.execute(
+                update(OutboxEventModel)
+                .where(OutboxEventModel.id.in_([e.id for e in events]))
+                .values(published_at=func.now())
+            )
+            await session.commit()
+        published += len(events)
+        if len(events) < SETTINGS.OUTBOX_BATCH_SIZE:
+            break
+    if published:
+        print(f"Relayed {published} outbox events")
+    return published
+
+
+async def replay_outbox(publisher, from_id: int, to_id: Optional[int] = None) -> int:
+    replayed = 0
+    async with AsyncSessionLocal() as session:
+        stmt = (
+            select(OutboxEventModel)
+            .where(OutboxEventModel.id >= from_id)
+            .order_by(OutboxEventModel.id)
+            .execution_options(yield_per=SETTINGS.OUTBOX_BATCH_SIZE)
+        )
+        if to_id is not None:
+            stmt = stmt.where(OutboxEventModel.id <= to_id)
+        result = await session.stream_scalars(stmt)
+        async with publisher.stream(EVENTS_EXCHANGE) as stream:
+            async for events in result.partitions():
+                for e in events:
+                    await stream.publish(build_message(e, replay=True), e.event_type)
+                replayed += len(events)
+    print(f"Replayed {replayed} outbox events from id {from_id}")
+    return replayed
+
+
+async def purge_outbox() -> int:
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            delete(OutboxEventModel).where(
+                OutboxEventModel.published_at
+                < func.now() - timedelta(hours=SETTINGS.OUTBOX_RETENTION_HOURS)
+            )
+        )
+        await session.commit()
+    return result.rowcount
@@ -0,0 +1,43 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException, status
+
+INT4_MAX = 2**31 - 1
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps(
+        [v.isoformat() if isinstance(v, datetime) else v for v in values],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _cursor_value(value, kind: type):
+    if kind is datetime:
+        if not isinstance(value, str):
+            raise ValueError(value)
+        return datetime.fromisoformat(value)
+    # bool is an int too; ids must also fit the integer columns.
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(value)
+    if not -INT4_MAX - 1 <= value <= INT4_MAX:
+        raise ValueError(value)
+    return value
+
+
+def decode_cursor(cursor: str, *types: type) -> list:
+    """The values of a cursor from encode_cursor, checked against `types`
+    (int or datetime); 400 for anything else."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(cursor)
+        return [_cursor_value(value, kind) for value, kind in zip(values, types)]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
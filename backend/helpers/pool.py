@@ -0,0 +1,69 @@
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+
+class PoolStats:
+    def __init__(self):
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def observe(self, wait: float):
+        self.acquired += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+
+    def snapshot(self) -> dict:
+        return {
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "acquire_wait_avg_ms": self.wait_total / (self.acquired or 1) * 1000,
+            "acquire_wait_max_ms": self.wait_max * 1000,
+        }
+
+
+class TimedPool:
+    """Time how long checkouts wait for a connection, including connecting."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.observe(time.perf_counter() - started)
+        return record
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep counting across it.
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def snapshot(self) -> dict:
+        counts = {}
+        if isinstance(self, QueuePool):
+            counts = {
+                "size": self.size(),
+                "max_overflow": self._max_overflow,
+                "timeout_seconds": self.timeout(),
+                "checked_out": self.checkedout(),
+                "idle": self.checkedin(),
+                "overflow": max(self.overflow(), 0),
+            }
+        return {"pool": type(self).__name__, **counts, **self.stats.snapshot()}
+
+
+class TimedQueuePool(TimedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+class TimedNullPool(TimedPool, NullPool):
+    pass
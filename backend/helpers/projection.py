@@ -0,0 +1,37 @@
+from typing import List, Optional
+from fastapi import HTTPException, status
+
+
+def parse_fields(
+    value: Optional[str], allowed: List[str], param: str = "fields"
+) -> Optional[tuple]:
+    """Split a comma-separated list of names, in the order given by ``allowed``."""
+    if value is None:
+        return None
+    requested = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown {param}: {', '.join(sorted(unknown))}",
+        )
+    return tuple(name for name in allowed if name in requested)
+
+
+def parse_ids(value: str, param: str = "ids") -> List[int]:
+    """Split a comma-separated list of integer ids, keeping order and repeats."""
+    try:
+        return [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{param} must be comma-separated integers",
+        )
+
+
+def check_ids(ids: List[int], limit: int, param: str = "ids"):
+    if len(ids) > limit:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {limit} {param} per request",
+        )
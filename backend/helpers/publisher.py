@@ -0,0 +1,147 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Iterable
+import aio_pika
+from .config import get_settings
+
+SETTINGS = get_settings()
+
+
+class PublisherStats:
+    def __init__(self):
+        self.published = 0
+        self.confirm_failures = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.channels_reopened = 0
+        self.reconnects = 0
+
+    def observe(self, latency: float, ok: bool):
+        if ok:
+            self.published += 1
+        else:
+            self.confirm_failures += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    def snapshot(self) -> dict:
+        attempts = self.published + self.confirm_failures
+        return {
+            "published": self.published,
+            "confirm_failures": self.confirm_failures,
+            "publish_latency_avg_ms": (
+                self.latency_total / attempts * 1000 if attempts else 0.0
+            ),
+            "publish_latency_max_ms": self.latency_max * 1000,
+            "channels_reopened": self.channels_reopened,
+            "reconnects": self.reconnects,
+        }
+
+
+class PublishStream:
+    def __init__(self, publisher: "Publisher", exchange):
+        self.publisher = publisher
+        self.exchange = exchange
+        self.tasks = set()
+        self.error = None
+
+    async def _publish(self, message: aio_pika.Message, routing_key: str):
+        start = time.perf_counter()
+        ok = False
+        try:
+            await self.exchange.publish(message, routing_key=routing_key)
+            ok = True
+        except Exception as e:
+            self.error = self.error or e
+        finally:
+            self.publisher.stats.observe(time.perf_counter() - start, ok)
+            self.publisher.in_flight.release()
+
+    async def publish(self, message: aio_pika.Message, routing_key: str):
+        if self.error:
+            raise self.error
+        await self.publisher.in_flight.acquire()
+        task = asyncio.create_task(self._publish(message, routing_key))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def flush(self):
+        if self.tasks:
+            await asyncio.gather(*self.tasks)
+        if self.error:
+            raise self.error
+
+
+class Publisher:
+    def __init__(self, connection, pool_size: int = None, max_in_flight: int = None):
+        self.connection = connection
+        self.pool_size = pool_size or SETTINGS.PUBLISHER_POOL_SIZE
+        self.in_flight = asyncio.Semaphore(
+            max_in_flight or SETTINGS.PUBLISHER_MAX_IN_FLIGHT
+        )
+        self.channels = asyncio.Queue()
+        self.stats = PublisherStats()
+
+    async def start(self):
+        for _ in range(self.pool_size):
+            self.channels.put_nowait(await self._open_channel())
+        self.connection.reconnect_callbacks.add(self._on_reconnect)
+
+    async def close(self):
+        while not self.channels.empty():
+            channel = self.channels.get_nowait()
+            if not channel.is_closed:
+                await channel.close()
+
+    def _on_reconnect(self, *args, **kwargs):
+        self.stats.reconnects += 1
+
+    async def _open_channel(self):
+        return await self.connection.channel(publisher_confirms=True)
+
+    async def declare_exchange(
+        self, name: str, exchange_type=aio_pika.ExchangeType.TOPIC
+    ):
+        async with self.channel() as channel:
+            return await channel.declare_exchange(name, exchange_type, durable=True)
+
+    @asynccontextmanager
+    async def channel(self):
+        channel = await self.channels.get()
+        try:
+            if channel.is_closed:
+                channel = await self._open_channel()
+                self.stats.channels_reopened += 1
+            yield channel
+        finally:
+            self.channels.put_nowait(channel)
+
+    @asynccontextmanager
+    async def stream(self, exchange_name: str = ""):
+        async with self.channel() as channel:
+            if exchange_name:
+                exchange = await channel.get_exchange(exchange_name, ensure=False)
+            else:
+                exchange = channel.default_exchange
+            stream = PublishStream(self, exchange)
+            try:
+                yield stream
+                await stream.flush()
+            finally:
+                if stream.tasks:
+                    await asyncio.gather(*stream.tasks, return_exceptions=True)
+
+    async def publish(
+        self, message: aio_pika.Message, routing_key: str, exchange_name: str = ""
+    ):
+        await self.publish_batch([(message, routing_key)], exchange_name)
+
+    async def publish_batch(
+        self,
+        messages: Iterable[tuple[aio_pika.Message, str]],
+        exchange_name: str = "",
+    ):
+        async with self.stream(exchange_name) as stream:
+            for message, routing_key in messages:
+                await stream.publish(message, routing_key)
@@ -0,0 +1,177 @@
+import asyncio
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from .config import get_settings
+from .metrics import REGISTRY, Histogram, fingerprint, route_label
+
+SETTINGS = get_settings()
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+HTTP_QUERIES = REGISTRY.register(
+    Histogram(
+        "http_request_queries",
+        "SQL statements run per request.",
+        ("method", "route"),
+        (1, 2, 3, 5, 10, 20, 50, 100, 200),
+    )
+)
+
+
+class QueryCounter:
+    def __init__(self, parent: Optional["QueryCounter"] = None):
+        self.parent = parent
+        self.count = 0
+        self.elapsed = 0.0
+        # fingerprint -> [count, normalized text]
+        self.fingerprints = {}
+
+    def record(self, key: str, text: str, elapsed: float):
+        counter = self
+        while counter is not None:
+            counter.count += 1
+            counter.elapsed += elapsed
+            seen = counter.fingerprints.get(key)
+            if seen is None:
+                counter.fingerprints[key] = [1, text]
+            else:
+                seen[0] += 1
+            counter = counter.parent
+
+    def repeated(self, threshold: int) -> list:
+        return sorted(
+            (
+                (count, key, text)
+                for key, (count, text) in self.fingerprints.items()
+                if count >= threshold
+            ),
+            reverse=True,
+        )
+
+    def summary(self, limit: int = 5) -> str:
+        return "; ".join(
+            f"{count}x [{key}] {text[:200]}"
+            for count, key, text in self.repeated(1)[:limit]
+        )
+
+
+CURRENT_QUERIES: ContextVar[Optional[QueryCounter]] = ContextVar(
+    "current_queries", default=None
+)
+EXPLAIN_ENGINES = {}
+PENDING_EXPLAINS = set()
+
+
+async def explain(engine, key: str, statement: str, parameters):
+    try:
+        async with engine.connect() as conn:
+            result = await conn.exec_driver_sql(
+                f"EXPLAIN {statement}",
+                parameters,
+                execution_options={"query_log": False},
+            )
+            plan = "\n".join(row[0] for row in result)
+    except Exception as e:
+        print(f"EXPLAIN failed for [{key}]: {e}")
+        return
+    print(f"EXPLAIN [{key}]\n{plan}")
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    if context is not None:
+        context.query_log_started = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    if context is None or context.execution_options.get("query_log") is False:
+        return
+    elapsed = time.perf_counter() - context.query_log_started
+    counter = CURRENT_QUERIES.get()
+    slow = elapsed * 1000 >= SETTINGS.SLOW_QUERY_MS
+    if counter is None and not slow:
+        return
+    operation, key, text = fingerprint(statement)
+    if counter is not None:
+        counter.record(key, text, elapsed)
+    if not slow:
+        return
+    print(f"Slow query {elapsed * 1000:.1f} ms [{key}] {text[:500]}")
+    # Re-plan it later on its own connection, off this request and transaction.
+    if (
+        not many
+        and operation in EXPLAINABLE
+        and random.random() < SETTINGS.SLOW_QUERY_EXPLAIN_SAMPLE
+    ):
+        task = asyncio.get_running_loop().create_task(
+            explain(EXPLAIN_ENGINES[conn.engine], key, statement, parameters)
+        )
+        PENDING_EXPLAINS.add(task)
+        task.add_done_callback(PENDING_EXPLAINS.discard)
+
+
+def log_queries(engine):
+    EXPLAIN_ENGINES[engine.sync_engine] = engine
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+
+def report(scope, counter: QueryCounter):
+    method, route = scope["method"], route_label(scope)
+    HTTP_QUERIES.observe((method, route), counter.count)
+    for count, key, text in counter.repeated(SETTINGS.N_PLUS_ONE_THRESHOLD):
+        print(f"Possible N+1 in {method} {route}: {count}x [{key}] {text[:500]}")
+    if counter.count > SETTINGS.QUERY_COUNT_LOG_THRESHOLD:
+        print(
+            f"{method} {route} ran {counter.count} queries in "
+            f"{counter.elapsed * 1000:.1f} ms: {counter.summary()}"
+        )
+
+
+class QueryLogMiddleware:
+    """Count each request's SQL statements, report it in X-Query-Count, and log
+    requests that run too many or repeat one statement (likely an N+1)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        counter = QueryCounter(CURRENT_QUERIES.get())
+        token = CURRENT_QUERIES.set(counter)
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=list(message["headers"]))
+                headers["x-query-count"] = str(counter.count)
+                message = {**message, "headers": headers.raw}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, counting_send)
+        finally:
+            CURRENT_QUERIES.reset(token)
+            report(scope, counter)
+
+
+@contextmanager
+def query_budget(limit: int):
+    """Fail with AssertionError if the block runs more than `limit` statements.
+
+        with query_budget(3):
+            await asgi_request(app, "GET", "/orders/", headers)
+    """
+    counter = QueryCounter(CURRENT_QUERIES.get())
+    token = CURRENT_QUERIES.set(counter)
+    try:
+        yield counter
+    finally:
+        CURRENT_QUERIES.reset(token)
+    if counter.count > limit:
+        raise AssertionError(
+            f"{counter.count} queries over a budget of {limit}: {counter.summary()}"
+        )
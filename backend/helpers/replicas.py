@@ -0,0 +1,223 @@
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from jose import JWTError, jwt
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from starlette.datastructures import Headers, MutableHeaders
+from .config import get_settings
+
+SETTINGS = get_settings()
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+PIN_COOKIE = "read_primary"
+# Unix time until which the caller reads from the primary, set on writes for
+# clients without cookies to send back.
+PIN_HEADER = "x-read-primary-until"
+# Commit time of the newest transaction a replica has replayed. It is now() on
+# the primary and on a caught-up replica, so an idle primary does not look stale.
+HORIZON_SQL = (
+    "CASE WHEN pg_is_in_recovery()"
+    " AND pg_last_wal_receive_lsn() IS DISTINCT FROM pg_last_wal_replay_lsn()"
+    " THEN pg_last_xact_replay_timestamp() ELSE now() END"
+)
+READ_HORIZON = text(f"SELECT {HORIZON_SQL}")
+REPLICA_LAG = text(f"SELECT extract(epoch FROM now() - ({HORIZON_SQL}))")
+
+
+def lag_bound(session: AsyncSession) -> float:
+    """How far behind the primary this session's reads may be, in seconds."""
+    if session.info.get("replica") is None:
+        return 0.0
+    return SETTINGS.REPLICA_MAX_LAG_SECONDS
+
+
+def requester_key(headers, client) -> str:
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            # Only read routing depends on this; auth still verifies the token.
+            return f"user:{jwt.get_unverified_claims(token).get('sub')}"
+        except JWTError:
+            pass
+    return f"addr:{client[0] if client else ''}"
+
+
+def pinned_by_header(headers) -> bool:
+    try:
+        until = float(headers.get(PIN_HEADER, 0))
+    except ValueError:
+        return False
+    # Never longer than a pin this service hands out.
+    now = time.time()
+    return now < until <= now + SETTINGS.READ_YOUR_WRITES_SECONDS + 1
+
+
+class Replica:
+    def __init__(self, name: str, engine):
+        self.name = name
+        self.engine = engine
+        self.sessions = sessionmaker(
+            bind=engine,
+            class_=AsyncSession,
+            expire_on_commit=False,
+            info={"replica": name},
+        )
+        self.healthy = True
+        self.lag_seconds = None
+        self.checked_at = None
+        self.error = None
+        self.reads = 0
+        self.marked_down = 0
+        event.listen(engine.sync_engine, "handle_error", self._on_error)
+
+    def _on_error(self, context):
+        if context.is_disconnect:
+            self.mark_down(context.original_exception)
+
+    def mark_down(self, reason):
+        if self.healthy:
+            print(f"Read replica {self.name} marked down: {reason}")
+            self.marked_down += 1
+        self.healthy = False
+        self.error = str(reason)
+
+    async def check(self):
+        try:
+            async with self.engine.connect() as conn:
+                lag = float((await conn.execute(REPLICA_LAG)).scalar_one())
+        except (DBAPIError, OSError, asyncio.TimeoutError) as e:
+            self.mark_down(e)
+            return
+        self.lag_seconds = lag
+        self.checked_at = datetime.now(timezone.utc)
+        if lag > SETTINGS.REPLICA_MAX_LAG_SECONDS:
+            self.mark_down(f"{lag:.1f}s behind the primary")
+        elif not self.healthy:
+            print(f"Read replica {self.name} is back")
+            self.healthy = True
+            self.error = None
+
+    def snapshot(self) -> dict:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag_seconds,
+            "checked_at": self.checked_at,
+            "error": self.error,
+            "reads": self.reads,
+            "marked_down": self.marked_down,
+        }
+
+
+class ReplicaSet:
+    """Round-robin read sessions over the healthy replicas, else the primary."""
+
+    def __init__(self, primary: sessionmaker, replicas: list):
+        self.primary = primary
+        self.replicas = replicas
+        self.turn = itertools.count()
+        self.pins = {}
+        self.pinned_reads = 0
+        self.fallback_reads = 0
+
+    def candidates(self) -> list:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return []
+        start = next(self.turn) % len(healthy)
+        return healthy[start:] + healthy[:start]
+
+    @asynccontextmanager
+    async def session(self, pinned: bool = False):
+        if pinned:
+            self.pinned_reads += 1
+        else:
+            for replica in self.candidates():
+                session = replica.sessions()
+                try:
+                    # Connect up front so a dead replica fails over to the next one.
+                    await session.connection()
+                except (DBAPIError, OSError, asyncio.TimeoutError) as e:
+                    await session.close()
+                    replica.mark_down(e)
+                    continue
+                replica.reads += 1
+                async with session:
+                    yield session
+                return
+            if self.replicas:
+                self.fallback_reads += 1
+        async with self.primary() as session:
+            yield session
+
+    def pin(self, requester: str):
+        self.pins[requester] = time.monotonic() + SETTINGS.READ_YOUR_WRITES_SECONDS
+
+    def is_pinned(self, requester: str) -> bool:
+        until = self.pins.get(requester)
+        return until is not None and until > time.monotonic()
+
+    async def check_health(self):
+        now = time.monotonic()
+        self.pins = {key: until for key, until in self.pins.items() if until > now}
+        await asyncio.gather(*(replica.check() for replica in self.replicas))
+
+    async def dispose(self):
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def snapshot(self) -> dict:
+        return {
+            "replicas": [replica.snapshot() for replica in self.replicas],
+            "pinned_reads": self.pinned_reads,
+            "fallback_reads": self.fallback_reads,
+            "pinned_requesters": len(self.pins),
+        }
+
+
+class ReadYourWritesMiddleware:
+    """Send a requester's reads to the primary for a while after they write.
+
+    The pin is kept in this process. On other backend processes it holds only
+    if the client sends it back: browsers return the short-lived cookie, API
+    clients must echo the X-Read-Primary-Until response header.
+    """
+
+    def __init__(self, app, replicas: ReplicaSet):
+        self.app = app
+        self.replicas = replicas
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+        requester = requester_key(Headers(scope=scope), scope.get("client"))
+        # get_read_session marks read-only routes in request.state, which is
+        # this dict even if a layer below copies the scope.
+        state = scope.setdefault("state", {})
+
+        async def pinning_send(message):
+            if (
+                message["type"] == "http.response.start"
+                and message["status"] < 400
+                and not state.get("read_only")
+            ):
+                self.replicas.pin(requester)
+                headers = MutableHeaders(raw=list(message["headers"]))
+                headers.append(
+                    "set-cookie",
+                    f"{PIN_COOKIE}=1; Max-Age={SETTINGS.READ_YOUR_WRITES_SECONDS}; "
+                    "Path=/; HttpOnly; SameSite=Lax",
+                )
+                headers[PIN_HEADER] = str(
+                    int(time.time() + SETTINGS.READ_YOUR_WRITES_SECONDS)
+                )
+                message = {**message, "headers": headers.raw}
+            await send(message)
+
+        await self.app(scope, receive, pinning_send)
+
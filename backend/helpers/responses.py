@@ -0,0 +1,29 @@
+from typing import Any, Mapping, Optional
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+ANY_ADAPTER = TypeAdapter(Any)
+
+
+class ModelResponse(Response):
+    """JSON for schema objects the services already validated.
+
+    Returning a Response skips FastAPI's second validation against
+    ``response_model``, which then only documents the route. pydantic-core
+    renders the body in one pass.
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        exclude_unset: bool = False,
+    ):
+        self.exclude_unset = exclude_unset
+        super().__init__(content, status_code, headers)
+
+    def render(self, content: Any) -> bytes:
+        return ANY_ADAPTER.dump_json(content, exclude_unset=self.exclude_unset)
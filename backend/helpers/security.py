@@ -6,13 +6,16 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
 from .config import get_settings
 from .db_conf import get_session
-from ..models import UserModel
 from ..schemas.TokenSchema import TokenData
-from ..services.UserService import get_user_by_username
+from ..schemas.UserSchema import Principal
+from ..services.UserService import get_principal
 
 
 SETTINGS = get_settings()
 OAUTH2_SCHEME = OAuth2PasswordBearer(tokenUrl="users/token")
+ADMIN_USERNAMES = {
+    name.strip() for name in SETTINGS.ADMIN_USERNAMES.split(",") if name.strip()
+}
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -49,13 +52,23 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = await get_user_by_username(session, username=token_data.username)
+    user = await get_principal(session, username=token_data.username)
     if user is None:
         raise credentials_exception
     return user
 
 
-async def get_current_active_user(current_user: UserModel = Depends(get_current_user)):
+async def get_current_active_user(current_user: Principal = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
+
+
+async def get_current_admin_user(
+    current_user: Principal = Depends(get_current_active_user),
+):
+    if current_user.username not in ADMIN_USERNAMES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required"
+        )
+    return current_user
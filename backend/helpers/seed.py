@@ -1,9 +1,20 @@
+"""Demo data for startup, and a CLI that loads the same kind of data at scale:
+
+    python -m backend.helpers.seed --users 1000000 --cars 1000000 --orders 3000000
+"""
+
+import argparse
+import asyncio
+import os
 import random
-from datetime import datetime, timedelta
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import async_sessionmaker
-from ..models import UserModel, CarModel, OrderModel
-from .db_conf import ENGINE, ORM_BASE
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from ..models import UserModel, CarModel, OrderModel, order_items
+from .db_conf import ENGINE, ORM_BASE, SQLALCHEMY_DATABASE_URL
 from .hash import hash_password
 
 FIRST_NAMES = [
@@ -97,7 +108,19 @@ FEATURES_POOL = [
     "Adaptive Headlights",
     "Blind Spot Monitoring",
 ]
-
+CAR_MODELS = [
+    "Camry",
+    "Civic",
+    "Mustang",
+    "Accord",
+    "F-150",
+    "Model 3",
+    "X5",
+    "A4",
+    "Passat",
+    "Altima",
+    "Elantra",
+]
 DESCRIPTIONS = [
     "Reliable {body_type} with great fuel efficiency.",
     "Sporty {body_type} with modern tech features.",
@@ -113,6 +136,53 @@ NUM_CARS = 500
 NUM_ORDERS = 200
 MIN_CARS_PER_ORDER = 1
 MAX_CARS_PER_ORDER = 5
+DEMO_PASSWORD = "password123"
+
+
+def fake_user(rng: random.Random, suffix: int, hashed_password: str, now) -> dict:
+    first_name = rng.choice(FIRST_NAMES)
+    last_name = rng.choice(LAST_NAMES)
+    username = f"{first_name.lower()}_{last_name.lower()}_{suffix}"
+    return {
+        "username": username,
+        "email": f"{username}@example.com",
+        "hashed_password": hashed_password,
+        "is_active": rng.choice([True, False]),
+        "created_at": now - timedelta(days=rng.randint(0, 365 * 2)),
+    }
+
+
+def fake_car(rng: random.Random) -> dict:
+    body_type = rng.choice(BODY_TYPES)
+    return {
+        "brand": rng.choice(BRANDS),
+        "model": rng.choice(CAR_MODELS),
+        "year": rng.randint(2015, 2025),
+        "body_type": body_type,
+        "engine_type": rng.choice(ENGINE_TYPES),
+        "engine_size_liters": round(rng.uniform(1.0, 6.0), 1),
+        "horsepower": rng.randint(100, 600),
+        "transmission": rng.choice(TRANSMISSIONS),
+        "fuel_type": rng.choice(FUEL_TYPES),
+        "mileage_km": rng.randint(0, 200000),
+        "top_speed_kmh": rng.randint(150, 300),
+        "color": rng.choice(COLORS),
+        "features": ", ".join(rng.sample(FEATURES_POOL, rng.randint(3, 8))),
+        "price_usd": Decimal(f"{rng.uniform(10000, 100000):.2f}"),
+        "discount_percent": Decimal(f"{rng.uniform(0, 20):.1f}"),
+        "num_in_stock": rng.randint(0, 20),
+        "description": rng.choice(DESCRIPTIONS).format(body_type=body_type.lower()),
+    }
+
+
+def fake_order(rng: random.Random, user_ids, car_ids, now) -> tuple[dict, list]:
+    """Return the order row and the ids of the cars in it."""
+    order = {
+        "user_id": rng.choice(user_ids),
+        "created_at": now - timedelta(days=rng.randint(0, 365)),
+    }
+    count = rng.randint(MIN_CARS_PER_ORDER, MAX_CARS_PER_ORDER)
+    return order, rng.sample(car_ids, min(count, len(car_ids)))
 
 
 async def seed_database():
@@ -121,109 +191,220 @@ async def seed_database():
 
     async_session = async_sessionmaker(ENGINE, expire_on_commit=False)
     async with async_session() as session:
-        users_result = await session.execute(select(UserModel))
-        if users_result.scalars().all():
+        if (await session.execute(select(UserModel.id).limit(1))).first():
             print("Database already seeded. Skipping.")
             return
 
-        users = []
-        for i in range(NUM_USERS):
-            first_name = random.choice(FIRST_NAMES)
-            last_name = random.choice(LAST_NAMES)
-            username = (
-                f"{first_name.lower()}_{last_name.lower()}_{random.randint(1, 999)}"
-            )
-            email = f"{username}@example.com"
-            user = UserModel(
-                username=username,
-                email=email,
-                hashed_password=hash_password("password123"),
-                is_active=random.choice([True, False]),
-                created_at=datetime.utcnow()
-                - timedelta(days=random.randint(0, 365 * 2)),
-            )
-            users.append(user)
-        session.add_all(users)
-        await session.commit()
-        for user in users:
-            await session.refresh(user)
-
-        cars = []
-        for i in range(NUM_CARS):
-            brand = random.choice(BRANDS)
-            model = random.choice(
-                [
-                    "Camry",
-                    "Civic",
-                    "Mustang",
-                    "Accord",
-                    "F-150",
-                    "Model 3",
-                    "X5",
-                    "A4",
-                    "Passat",
-                    "Altima",
-                    "Elantra",
-                ]
-            )
-            year = random.randint(2015, 2025)
-            body_type = random.choice(BODY_TYPES)
-            engine_type = random.choice(ENGINE_TYPES)
-            engine_size_liters = round(random.uniform(1.0, 6.0), 1)
-            horsepower = random.randint(100, 600)
-            transmission = random.choice(TRANSMISSIONS)
-            fuel_type = random.choice(FUEL_TYPES)
-            mileage_km = random.randint(0, 200000)
-            top_speed_kmh = random.randint(150, 300)
-            color = random.choice(COLORS)
-            num_features = random.randint(3, 8)
-            features = ", ".join(random.sample(FEATURES_POOL, num_features))
-            price_usd = round(random.uniform(10000, 100000), 2)
-            discount_percent = round(random.uniform(0, 20), 1)
-            num_in_stock = random.randint(0, 20)
-            description_template = random.choice(DESCRIPTIONS)
-            description = description_template.format(body_type=body_type.lower())
-
-            car = CarModel(
-                brand=brand,
-                model=model,
-                year=year,
-                body_type=body_type,
-                engine_type=engine_type,
-                engine_size_liters=engine_size_liters,
-                horsepower=horsepower,
-                transmission=transmission,
-                fuel_type=fuel_type,
-                mileage_km=mileage_km,
-                top_speed_kmh=top_speed_kmh,
-                color=color,
-                features=features,
-                price_usd=price_usd,
-                discount_percent=discount_percent,
-                num_in_stock=num_in_stock,
-                description=description,
-            )
-            cars.append(car)
-        session.add_all(cars)
-        await session.commit()
-        for car in cars:
-            await session.refresh(car)
-
-        # Seed Orders
-        orders = []
-        for i in range(NUM_ORDERS):
-            user = random.choice(users)
-            num_cars_in_order = random.randint(MIN_CARS_PER_ORDER, MAX_CARS_PER_ORDER)
-            selected_cars = random.sample(cars, num_cars_in_order)
-            order = OrderModel(
-                user_id=user.id,
-                created_at=datetime.utcnow() - timedelta(days=random.randint(0, 365)),
-                cars=selected_cars,
-            )
+        rng = random.Random()
+        now = datetime.now(timezone.utc)
+        # Every demo user has the same password, so one bcrypt hash serves all.
+        hashed_password = await hash_password(DEMO_PASSWORD)
+        users = [fake_user(rng, i + 1, hashed_password, now) for i in range(NUM_USERS)]
+        user_ids = (
+            await session.execute(insert(UserModel).returning(UserModel.id), users)
+        ).scalars().all()
+        cars = [fake_car(rng) for _ in range(NUM_CARS)]
+        car_ids = (
+            await session.execute(insert(CarModel).returning(CarModel.id), cars)
+        ).scalars().all()
+
+        orders, order_cars = [], []
+        for _ in range(NUM_ORDERS):
+            order, selected = fake_order(rng, user_ids, car_ids, now)
             orders.append(order)
-        session.add_all(orders)
+            order_cars.append(selected)
+        order_ids = (
+            await session.execute(
+                insert(OrderModel).returning(
+                    OrderModel.id, sort_by_parameter_order=True
+                ),
+                orders,
+            )
+        ).scalars().all()
+        await session.execute(
+            insert(order_items),
+            [
+                {"order_id": order_id, "car_id": car_id}
+                for order_id, selected in zip(order_ids, order_cars)
+                for car_id in selected
+            ],
+        )
         await session.commit()
 
         print(
             f"Database seeded with {NUM_USERS} users, {NUM_CARS} cars, and {NUM_ORDERS} orders."
         )
+
+
+# Load-test seeding. Ids are assigned here rather than by the sequences, and
+# each batch draws from its own generator seeded with (seed, table, first id),
+# so a seed reproduces the same rows however the batches are scheduled.
+COLUMNS = {
+    "users": ["id", "username", "email", "hashed_password", "is_active", "created_at"],
+    "cars": [
+        "id",
+        "brand",
+        "model",
+        "year",
+        "body_type",
+        "engine_type",
+        "engine_size_liters",
+        "horsepower",
+        "transmission",
+        "fuel_type",
+        "mileage_km",
+        "top_speed_kmh",
+        "color",
+        "features",
+        "price_usd",
+        "discount_percent",
+        "num_in_stock",
+        "description",
+    ],
+    "orders": ["id", "user_id", "created_at"],
+    "order_items": ["order_id", "car_id"],
+}
+
+
+def _rng(seed: int, table: str, start: int) -> random.Random:
+    return random.Random(f"{seed}:{table}:{start}")
+
+
+def user_batch(start: int, stop: int, seed: int, hashed_password: str, now) -> dict:
+    rng = _rng(seed, "users", start)
+    rows = []
+    for user_id in range(start, stop):
+        user = fake_user(rng, user_id, hashed_password, now)
+        rows.append((user_id, *(user[c] for c in COLUMNS["users"][1:])))
+    return {"users": rows}
+
+
+def car_batch(start: int, stop: int, seed: int) -> dict:
+    rng = _rng(seed, "cars", start)
+    rows = []
+    for car_id in range(start, stop):
+        car = fake_car(rng)
+        rows.append((car_id, *(car[c] for c in COLUMNS["cars"][1:])))
+    return {"cars": rows}
+
+
+# The existing user and car ids, set once per worker process by share_ids:
+# sent with every batch they would be pickled once per batch.
+ORDER_IDS_POOL = {}
+
+
+def share_ids(user_ids, car_ids):
+    ORDER_IDS_POOL.update(users=user_ids, cars=car_ids)
+
+
+def order_batch(start: int, stop: int, seed: int, now) -> dict:
+    rng = _rng(seed, "orders", start)
+    user_ids, car_ids = ORDER_IDS_POOL["users"], ORDER_IDS_POOL["cars"]
+    orders, items = [], []
+    for order_id in range(start, stop):
+        order, selected = fake_order(rng, user_ids, car_ids, now)
+        orders.append((order_id, order["user_id"], order["created_at"]))
+        items.extend((order_id, car_id) for car_id in selected)
+    return {"orders": orders, "order_items": items}
+
+
+async def id_pool(engine, table: str):
+    """All ids in `table`, as a range when they have no gaps."""
+    async with engine.connect() as conn:
+        low, high, count = (
+            await conn.execute(text(f"SELECT min(id), max(id), count(*) FROM {table}"))
+        ).one()
+        if count and high - low + 1 == count:
+            return range(low, high + 1)
+        return (
+            await conn.execute(text(f"SELECT id FROM {table} ORDER BY id"))
+        ).scalars().all()
+
+
+async def copy_batch(engine, batch: dict):
+    async with engine.begin() as conn:
+        driver = (await conn.get_raw_connection()).driver_connection
+        for table, records in batch.items():
+            await driver.copy_records_to_table(
+                table, records=records, columns=COLUMNS[table]
+            )
+
+
+async def load(
+    engine, pool, jobs: int, batch_size: int, table: str, count: int, make, *args
+):
+    """Generate `count` new rows of `table` in worker processes and COPY them in,
+    with up to `jobs` batches in flight."""
+    if count <= 0:
+        return
+    loop = asyncio.get_running_loop()
+    async with engine.connect() as conn:
+        start = (
+            await conn.execute(text(f"SELECT coalesce(max(id), 0) + 1 FROM {table}"))
+        ).scalar_one()
+    stop = start + count
+    batches = iter(range(start, stop, batch_size))
+    started = time.perf_counter()
+
+    async def worker():
+        for first in batches:
+            last = min(first + batch_size, stop)
+            batch = await loop.run_in_executor(pool, make, first, last, *args)
+            await copy_batch(engine, batch)
+
+    await asyncio.gather(*(worker() for _ in range(jobs)))
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), {stop - 1})")
+        )
+    elapsed = time.perf_counter() - started
+    print(f"{table}: {count:,} rows in {elapsed:.1f} s ({count / elapsed:,.0f} rows/s)")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load synthetic data for load tests.")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--cars", type=int, default=100_000)
+    parser.add_argument("--orders", type=int, default=300_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--password", default=DEMO_PASSWORD)
+    parser.add_argument(
+        "--password-hash",
+        help="bcrypt hash stored for every user; by default --password is hashed once",
+    )
+    args = parser.parse_args()
+
+    # Users and cars load at once, each with `jobs` COPY connections.
+    engine = create_async_engine(
+        SQLALCHEMY_DATABASE_URL, pool_size=2 * args.jobs, max_overflow=0
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(ORM_BASE.metadata.create_all)
+    hashed_password = args.password_hash or await hash_password(args.password)
+    # Timestamps count back from midnight, so reruns on the same day match.
+    now = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    with ProcessPoolExecutor(args.jobs) as pool:
+        run = (engine, pool, args.jobs, args.batch_size)
+        users = (user_batch, args.seed, hashed_password, now)
+        await asyncio.gather(
+            load(*run, "users", args.users, *users),
+            load(*run, "cars", args.cars, car_batch, args.seed),
+        )
+    if args.orders > 0:
+        ids = (await id_pool(engine, "users"), await id_pool(engine, "cars"))
+        with ProcessPoolExecutor(
+            args.jobs, initializer=share_ids, initargs=ids
+        ) as pool:
+            run = (engine, pool, args.jobs, args.batch_size)
+            await load(*run, "orders", args.orders, order_batch, args.seed, now)
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for table in COLUMNS:
+            await conn.execute(text(f"ANALYZE {table}"))
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
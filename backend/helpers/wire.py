@@ -0,0 +1,111 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+WIRE_VERSION = 1
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/x-msgpack"
+ZSTD_ENCODING = "zstd"
+
+CAR_SCHEMA = (
+    ("id", int),
+    ("brand", str),
+    ("model", str),
+    ("year", int),
+    ("body_type", str),
+    ("engine_type", str),
+    ("engine_size_liters", float),
+    ("horsepower", int),
+    ("transmission", str),
+    ("fuel_type", str),
+    ("mileage_km", int),
+    ("top_speed_kmh", int),
+    ("color", str),
+    ("features", str),
+    ("price_usd", float),
+    ("discount_percent", float),
+    ("num_in_stock", int),
+    ("description", str),
+    ("updated_at", datetime),
+)
+SCHEMAS = {"cars": ("cars.v1", CAR_SCHEMA)}
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _coerce(value, kind):
+    if value is None:
+        return None
+    if kind is float:
+        return float(value)
+    return value
+
+
+def pack_rows(table: str, rows: list[dict]) -> dict:
+    if table in SCHEMAS:
+        schema_name, schema = SCHEMAS[table]
+        columns = [name for name, _ in schema]
+        values = [
+            [_coerce(row.get(name), kind) for name, kind in schema] for row in rows
+        ]
+        return {"schema": schema_name, "columns": columns, "rows": values}
+    columns = list(rows[0]) if rows else []
+    return {"columns": columns, "rows": [[row[c] for c in columns] for row in rows]}
+
+
+def unpack_rows(payload: dict) -> list[dict]:
+    columns = payload["columns"]
+    return [dict(zip(columns, values)) for values in payload["rows"]]
+
+
+def resolve_format(wire_format: str, compression: str) -> tuple[str, str]:
+    if wire_format == "msgpack" and msgpack is None:
+        print("msgpack is not installed, falling back to JSON export messages")
+        wire_format = "json"
+    if compression == ZSTD_ENCODING and zstandard is None:
+        print("zstandard is not installed, sending uncompressed export messages")
+        compression = "none"
+    return wire_format, compression
+
+
+def encode_payload(
+    payload: dict, wire_format: str = "json", compression: str = "none"
+) -> tuple[bytes, str, str | None]:
+    payload = {"v": WIRE_VERSION, **payload}
+    if wire_format == "msgpack":
+        body = msgpack.packb(payload, default=_default, datetime=True)
+        content_type = MSGPACK_CONTENT_TYPE
+    else:
+        body = json.dumps(payload, default=_default, separators=(",", ":")).encode()
+        content_type = JSON_CONTENT_TYPE
+    content_encoding = None
+    if compression == ZSTD_ENCODING:
+        body = zstandard.ZstdCompressor(level=3).compress(body)
+        content_encoding = ZSTD_ENCODING
+    return body, content_type, content_encoding
+
+
+def decode_payload(
+    body: bytes, content_type: str | None = None, content_encoding: str | None = None
+) -> dict:
+    if content_encoding == ZSTD_ENCODING:
+        body = zstandard.ZstdDecompressor().decompress(body)
+    if content_type == MSGPACK_CONTENT_TYPE:
+        return msgpack.unpackb(body, timestamp=3)
+    return json.loads(body.decode())
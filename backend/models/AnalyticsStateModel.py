@@ -0,0 +1,11 @@
+from sqlalchemy import Column, String, DateTime, BigInteger, Float
+from ..helpers.db_conf import ORM_BASE
+
+
+class AnalyticsState(ORM_BASE):
+    __tablename__ = "analytics_state"
+
+    name = Column(String, primary_key=True)
+    refreshed_at = Column(DateTime(timezone=True), nullable=False)
+    change_count = Column(BigInteger, nullable=True)
+    duration_ms = Column(Float, nullable=False)
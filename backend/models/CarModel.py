@@ -1,5 +1,16 @@
-from sqlalchemy import Column, Integer, String, Float, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Column,
+    Computed,
+    Integer,
+    String,
+    Float,
+    Text,
+    DateTime,
+    Index,
+    func,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.types import DECIMAL
 from ..helpers.db_conf import ORM_BASE
 from .OrderItemModel import order_items
@@ -26,5 +37,45 @@ class Car(ORM_BASE):
     discount_percent = Column(DECIMAL(5, 2), nullable=False)
     num_in_stock = Column(Integer, nullable=False)
     description = Column(Text, nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        index=True,
+    )
+    effective_price = Column(
+        DECIMAL(10, 2),
+        Computed("round(price_usd * (100 - discount_percent) / 100, 2)", persisted=True),
+    )
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                "to_tsvector('english', features || ' ' || description)",
+                persisted=True,
+            ),
+        )
+    )
 
-    orders = relationship("Order", secondary=order_items, back_populates="cars")
+    orders = relationship(
+        "Order", secondary=order_items, back_populates="cars", lazy="raise_on_sql"
+    )
+
+    __table_args__ = (
+        Index("ix_cars_brand_model_year", "brand", "model", "year"),
+        Index(
+            "ix_cars_body_fuel_transmission",
+            "body_type",
+            "fuel_type",
+            "transmission",
+            "id",
+        ),
+        Index("ix_cars_effective_price", "effective_price", "id"),
+        Index(
+            "ix_cars_in_stock_effective_price",
+            "effective_price",
+            "id",
+            postgresql_where=num_in_stock > 0,
+        ),
+        Index("ix_cars_search_vector", "search_vector", postgresql_using="gin"),
+    )
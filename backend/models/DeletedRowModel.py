@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, func, insert, literal, select
+from ..helpers.db_conf import ORM_BASE
+
+
+class DeletedRow(ORM_BASE):
+    __tablename__ = "deleted_rows"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+def record_deletes_from(deleted, table_name: str):
+    """INSERT a tombstone per row of a DELETE ... RETURNING CTE, in the same
+    statement, for the export to send. ``deleted`` must expose ``id``."""
+    return insert(DeletedRow).from_select(
+        ["table_name", "row_id"], select(literal(table_name), deleted.c.id)
+    )
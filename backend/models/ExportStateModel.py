@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, DateTime
+from ..helpers.db_conf import ORM_BASE
+
+
+class ExportState(ORM_BASE):
+    __tablename__ = "export_state"
+
+    name = Column(String, primary_key=True)
+    watermark = Column(DateTime(timezone=True), nullable=False)
+    last_full_at = Column(DateTime(timezone=True), nullable=True)
@@ -6,4 +6,9 @@ order_items = Table(
     ORM_BASE.metadata,
     Column("order_id", Integer, ForeignKey("orders.id"), primary_key=True),
     Column("car_id", Integer, ForeignKey("cars.id"), primary_key=True),
+    Column("quantity", Integer, nullable=False, server_default="1"),
 )
+
+
+class OrderItem(ORM_BASE):
+    __table__ = order_items
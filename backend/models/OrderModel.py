@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index, func
 from sqlalchemy.orm import relationship
 from ..helpers.db_conf import ORM_BASE
-from .OrderItemModel import order_items
+from .OrderItemModel import order_items, OrderItem
 
 
 class Order(ORM_BASE):
@@ -9,7 +9,19 @@ class Order(ORM_BASE):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        index=True,
+    )
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
-    user = relationship("User", back_populates="orders")
-    cars = relationship("Car", secondary=order_items, back_populates="orders")
+    # Never loaded implicitly: a lazy load per order is an N+1.
+    user = relationship("User", back_populates="orders", lazy="raise_on_sql")
+    cars = relationship(
+        "Car", secondary=order_items, back_populates="orders", order_by="Car.id"
+    )
+    items = relationship(OrderItem, viewonly=True, order_by=order_items.c.car_id)
+
+    __table_args__ = (Index("ix_orders_user_created_id", "user_id", "created_at", "id"),)
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Index, func
+from sqlalchemy.dialects.postgresql import JSONB
+from ..helpers.db_conf import ORM_BASE
+
+
+class OutboxEvent(ORM_BASE):
+    __tablename__ = "outbox_events"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    aggregate = Column(String, nullable=False)
+    aggregate_id = Column(Integer, nullable=False)
+    event_type = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    published_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_outbox_events_unpublished",
+            "id",
+            postgresql_where=published_at.is_(None),
+        ),
+    )
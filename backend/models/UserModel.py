@@ -13,6 +13,11 @@ class User(ORM_BASE):
     is_active = Column(Boolean, default=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        index=True,
+    )
 
-    orders = relationship("Order", back_populates="user")
+    orders = relationship("Order", back_populates="user", lazy="raise_on_sql")
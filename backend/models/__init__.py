@@ -1,4 +1,8 @@
 from .UserModel import User as UserModel
 from .CarModel import Car as CarModel
 from .OrderModel import Order as OrderModel
-from .OrderItemModel import order_items
+from .OrderItemModel import order_items, OrderItem as OrderItemModel
+from .DeletedRowModel import DeletedRow as DeletedRowModel, record_deletes_from
+from .ExportStateModel import ExportState as ExportStateModel
+from .OutboxModel import OutboxEvent as OutboxEventModel
+from .AnalyticsStateModel import AnalyticsState as AnalyticsStateModel
@@ -0,0 +1,93 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..helpers.analytics import refresh_analytics
+from ..helpers.db_conf import ENGINE, REPLICAS, get_session
+from ..helpers.hash import HASH_STATS
+from ..helpers.outbox import replay_outbox
+from ..helpers.security import get_current_admin_user
+from ..models import AnalyticsStateModel
+from ..services.CarService import CAR_CACHE, RELATED_CARS
+from ..services.UserService import PRINCIPAL_CACHE
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(get_current_admin_user)],
+)
+
+
+@router.post("/outbox/replay")
+async def replay_outbox_events(
+    request: Request, from_id: int, to_id: Optional[int] = None
+):
+    replayed = await replay_outbox(request.app.state.publisher, from_id, to_id)
+    return {"from_id": from_id, "to_id": to_id, "replayed": replayed}
+
+
+@router.get("/publisher")
+async def read_publisher_stats(request: Request):
+    return request.app.state.publisher.stats.snapshot()
+
+
+@router.get("/cache")
+async def read_cache_stats():
+    return {"cars": CAR_CACHE.snapshot(), "principals": PRINCIPAL_CACHE.snapshot()}
+
+
+@router.get("/pool")
+async def read_pool_stats():
+    return {
+        "primary": ENGINE.pool.snapshot(),
+        "replicas": {
+            replica.name: replica.engine.pool.snapshot()
+            for replica in REPLICAS.replicas
+        },
+    }
+
+
+@router.get("/replicas")
+async def read_replica_stats():
+    return REPLICAS.snapshot()
+
+
+@router.get("/related")
+async def read_related_index_stats():
+    return RELATED_CARS.snapshot()
+
+
+@router.get("/hasher")
+async def read_hasher_stats():
+    return HASH_STATS.snapshot()
+
+
+@router.get("/leader")
+async def read_scheduler_leader(
+    request: Request, session: AsyncSession = Depends(get_session)
+):
+    elector = request.app.state.leader
+    return {
+        "leader": await elector.current_leader(session),
+        "replica": elector.identity,
+        "is_leader": elector.is_leader,
+        "leader_since": elector.leader_since,
+        "renewed_at": elector.renewed_at,
+    }
+
+
+@router.get("/analytics")
+async def read_analytics_state(session: AsyncSession = Depends(get_session)):
+    states = (await session.execute(select(AnalyticsStateModel))).scalars().all()
+    return {
+        state.name: {
+            "refreshed_at": state.refreshed_at,
+            "duration_ms": state.duration_ms,
+        }
+        for state in states
+    }
+
+
+@router.post("/analytics/refresh")
+async def refresh_analytics_views(force: bool = False):
+    return {"refreshed": await refresh_analytics(force)}
@@ -0,0 +1,67 @@
+from datetime import date
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..helpers.db_conf import get_read_session
+from ..helpers.security import get_current_active_user
+from ..schemas.AnalyticsSchema import (
+    BrandSalesReport,
+    ModelSalesReport,
+    MonthSalesReport,
+)
+from ..services.AnalyticsService import (
+    get_sales_by_brand,
+    get_sales_by_month,
+    get_top_models,
+)
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["analytics"],
+    dependencies=[Depends(get_current_active_user)],
+)
+
+
+def not_refreshed():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Analytics have not been refreshed yet",
+    )
+
+
+@router.get("/revenue-by-brand", response_model=BrandSalesReport)
+async def read_revenue_by_brand(
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    session: AsyncSession = Depends(get_read_session),
+):
+    report = await get_sales_by_brand(session, since, until)
+    if report is None:
+        raise not_refreshed()
+    return report
+
+
+@router.get("/orders-by-month", response_model=MonthSalesReport)
+async def read_orders_by_month(
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    session: AsyncSession = Depends(get_read_session),
+):
+    report = await get_sales_by_month(session, since, until)
+    if report is None:
+        raise not_refreshed()
+    return report
+
+
+@router.get("/top-models", response_model=ModelSalesReport)
+async def read_top_models(
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    by: Literal["units", "revenue"] = "units",
+    limit: int = Query(10, ge=1, le=100),
+    session: AsyncSession = Depends(get_read_session),
+):
+    report = await get_top_models(session, since, until, by, limit)
+    if report is None:
+        raise not_refreshed()
+    return report
@@ -1,9 +1,42 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Annotated, Any, List, Optional, Union
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from ..helpers.db_conf import get_session
-from ..schemas.CarSchema import Car, CarCreate, CarUpdate
-from ..services.CarService import create_car, get_cars, get_car, update_car, delete_car
+from ..helpers.bulk import BULK_FORMATS, parse_records
+from ..helpers.config import get_settings
+from ..helpers.db_conf import get_read_loaders, get_read_session, get_session
+from ..helpers.loader import Loaders
+from ..helpers.pagination import MAX_PAGE_SIZE
+from ..helpers.projection import parse_fields, parse_ids
+from ..helpers.responses import ModelResponse
+from ..schemas.CarSchema import (
+    Car,
+    CarCreate,
+    CarUpdate,
+    CarPage,
+    CarFields,
+    CarFieldsPage,
+    CarSearch,
+    CarBulkResult,
+    CarIds,
+    RelatedCar,
+)
+from ..services.CarService import (
+    create_car,
+    import_cars,
+    update_stock,
+    get_cars,
+    get_cars_page,
+    get_cars_by_ids,
+    get_related_cars,
+    RELATED_NOT_BUILT,
+    search_cars,
+    IMPORT_COLUMNS,
+    get_car,
+    update_car,
+    delete_car,
+)
+
+SETTINGS = get_settings()
 
 router = APIRouter(prefix="/cars", tags=["cars"])
 
@@ -16,21 +49,118 @@ async def create_new_car(
     return await create_car(session, car)
 
 
-@router.get("/", response_model=List[Car])
+@router.get(
+    "/",
+    response_model=Union[
+        List[Car],
+        CarPage,
+        List[CarFields],
+        CarFieldsPage,
+        List[Optional[Car]],
+        List[Optional[CarFields]],
+    ],
+    response_model_exclude_unset=True,
+)
 async def read_cars(
-    skip: int = 0, limit: int = 100, session: AsyncSession = Depends(get_session)
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    ids: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_session),
+    loaders: Loaders = Depends(get_read_loaders),
+):
+    columns = parse_fields(fields, IMPORT_COLUMNS)
+    if ids is not None:
+        cars = await get_cars_by_ids(loaders, parse_ids(ids), columns)
+    elif cursor is not None:
+        cars = await get_cars_page(session, cursor, limit, columns)
+    else:
+        cars = await get_cars(session, skip, limit, columns)
+    return ModelResponse(cars, exclude_unset=True)
+
+
+@router.get("/search", response_model=List[Car])
+async def search_car_catalog(
+    params: Annotated[CarSearch, Query()],
+    session: AsyncSession = Depends(get_read_session),
+):
+    if (
+        params.q
+        and params.sort == "relevance"
+        and params.skip + params.limit > SETTINGS.SEARCH_RANK_CANDIDATES
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Relevance results end at {SETTINGS.SEARCH_RANK_CANDIDATES}; "
+            "use a price sort or narrow the query to page further",
+        )
+    return ModelResponse(await search_cars(session, params))
+
+
+@router.post(
+    "/batch",
+    response_model=Union[List[Optional[Car]], List[Optional[CarFields]]],
+    response_model_exclude_unset=True,
+)
+async def read_car_batch(
+    batch: CarIds,
+    fields: Optional[str] = None,
+    loaders: Loaders = Depends(get_read_loaders),
+):
+    columns = parse_fields(fields, IMPORT_COLUMNS)
+    cars = await get_cars_by_ids(loaders, batch.ids, columns)
+    return ModelResponse(cars, exclude_unset=True)
+
+
+@router.post("/bulk", response_model=CarBulkResult)
+async def bulk_import_cars(
+    request: Request, session: AsyncSession = Depends(get_session)
+):
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    fmt = BULK_FORMATS.get(content_type)
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Content-Type must be one of {', '.join(BULK_FORMATS)}",
+        )
+    return await import_cars(session, parse_records(request.stream(), fmt))
+
+
+@router.patch("/stock", response_model=CarBulkResult)
+async def bulk_update_stock(
+    rows: List[Any] = Body(...), session: AsyncSession = Depends(get_session)
 ):
-    return await get_cars(session, skip, limit)
+    return await update_stock(session, rows)
 
 
 @router.get("/{car_id}", response_model=Car)
-async def read_car(car_id: int, session: AsyncSession = Depends(get_session)):
+async def read_car(car_id: int, session: AsyncSession = Depends(get_read_session)):
     car = await get_car(session, car_id)
     if not car:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Car not found"
         )
-    return car
+    return ModelResponse(car)
+
+
+@router.get("/{car_id}/related", response_model=List[RelatedCar])
+async def read_related_cars(
+    car_id: int,
+    limit: int = Query(10, ge=1, le=SETTINGS.RELATED_TOP_K),
+    loaders: Loaders = Depends(get_read_loaders),
+):
+    related = await get_related_cars(loaders, car_id, limit)
+    if related is RELATED_NOT_BUILT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Related cars are not available yet",
+        )
+    if related is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Car not found"
+        )
+    return ModelResponse(related)
 
 
 @router.put("/{car_id}", response_model=Car)
@@ -1,41 +1,80 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from ..helpers.db_conf import get_session
-from ..schemas.OrderSchema import Order, OrderCreate, OrderUpdate
+from ..helpers.db_conf import get_loaders, get_read_session, get_session
+from ..helpers.loader import Loaders
+from ..helpers.pagination import MAX_PAGE_SIZE
+from ..helpers.projection import parse_fields
+from ..helpers.responses import ModelResponse
+from ..schemas.OrderSchema import (
+    Order,
+    OrderCreate,
+    OrderUpdate,
+    OrderPage,
+    OrderWithCars,
+    OrderWithCarsPage,
+)
 from ..services.OrderService import *
-from ..models import UserModel
+from ..schemas.UserSchema import Principal
 from ..helpers.security import get_current_active_user
 
 router = APIRouter(prefix="/orders", tags=["orders"])
+EXPANSIONS = ["cars"]
 
 
 @router.post("/", response_model=Order, status_code=status.HTTP_201_CREATED)
 async def create_new_order(
     order: OrderCreate,
     session: AsyncSession = Depends(get_session),
-    current_user: UserModel = Depends(get_current_active_user),
+    loaders: Loaders = Depends(get_loaders),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    return await create_order(session, current_user.id, order)
+    return await create_order(session, current_user.id, order, loaders)
 
 
-@router.get("/", response_model=List[Order])
+@router.get(
+    "/",
+    response_model=Union[
+        List[Order], OrderPage, List[OrderWithCars], OrderWithCarsPage
+    ],
+)
 async def read_orders(
     skip: int = 0,
-    limit: int = 100,
-    session: AsyncSession = Depends(get_session),
-    current_user: UserModel = Depends(get_current_active_user),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    expand: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_session),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    return await get_orders(session, user_id=current_user.id, skip=skip, limit=limit)
+    expand_cars = "cars" in (parse_fields(expand, EXPANSIONS, "expand") or ())
+    if cursor is not None:
+        orders = await get_orders_page(
+            session,
+            user_id=current_user.id,
+            cursor=cursor,
+            limit=limit,
+            expand_cars=expand_cars,
+        )
+    else:
+        orders = await get_orders(
+            session,
+            user_id=current_user.id,
+            skip=skip,
+            limit=limit,
+            expand_cars=expand_cars,
+        )
+    return ModelResponse(orders)
 
 
-@router.get("/{order_id}", response_model=Order)
+@router.get("/{order_id}", response_model=Union[Order, OrderWithCars])
 async def read_order(
     order_id: int,
-    session: AsyncSession = Depends(get_session),
-    current_user: UserModel = Depends(get_current_active_user),
+    expand: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_session),
+    current_user: Principal = Depends(get_current_active_user),
 ):
-    order = await get_order(session, order_id)
+    expand_cars = "cars" in (parse_fields(expand, EXPANSIONS, "expand") or ())
+    order = await get_order(session, order_id, expand_cars)
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Order not found"
@@ -45,7 +84,7 @@ async def read_order(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to access this order",
         )
-    return order
+    return ModelResponse(order)
 
 
 @router.put("/{order_id}", response_model=Order)
@@ -53,7 +92,8 @@ async def update_existing_order(
     order_id: int,
     order: OrderUpdate,
     session: AsyncSession = Depends(get_session),
-    current_user: UserModel = Depends(get_current_active_user),
+    loaders: Loaders = Depends(get_loaders),
+    current_user: Principal = Depends(get_current_active_user),
 ):
     existing_order = await get_order(session, order_id)
     if not existing_order:
@@ -65,7 +105,7 @@ async def update_existing_order(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to update this order",
         )
-    updated_order = await update_order(session, order_id, order)
+    updated_order = await update_order(session, order_id, order, loaders)
     return updated_order
 
 
@@ -73,7 +113,7 @@ async def update_existing_order(
 async def delete_existing_order(
     order_id: int,
     session: AsyncSession = Depends(get_session),
-    current_user: UserModel = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_user),
 ):
     existing_order = await get_order(session, order_id)
     if not existing_order:
@@ -3,12 +3,17 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from ..helpers.config import get_settings
-from ..helpers.db_conf import get_session
-from ..schemas.UserSchema import User, UserCreate
+from ..helpers.db_conf import get_loaders, get_session
+from ..helpers.loader import Loaders
+from ..schemas.UserSchema import User, UserCreate, Principal
 from ..schemas.TokenSchema import Token
-from ..services.UserService import create_user, authenticate_user, get_user_by_email
+from ..services.UserService import (
+    create_user,
+    authenticate_user,
+    get_user_by_email,
+    load_users,
+)
 from ..helpers.security import create_access_token, get_current_active_user
-from ..models.UserModel import User as UserModel
 
 router = APIRouter(prefix="/users", tags=["users"])
 SETTINGS = get_settings()
@@ -42,5 +47,11 @@ async def login_for_access_token(
 
 
 @router.get("/me", response_model=User)
-async def read_users_me(current_user: UserModel = Depends(get_current_active_user)):
-    return current_user
+async def read_users_me(
+    current_user: Principal = Depends(get_current_active_user),
+    loaders: Loaders = Depends(get_loaders),
+):
+    user = await loaders(load_users).load(current_user.id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
@@ -1,3 +1,5 @@
 from .CarRouter import router as car_router
 from .OrderRouter import router as order_router
 from .UserRouter import router as user_router
+from .AdminRouter import router as admin_router
+from .AnalyticsRouter import router as analytics_router
@@ -0,0 +1,49 @@
+from datetime import date, datetime
+from pydantic import BaseModel
+from typing import List
+
+
+class BrandSales(BaseModel):
+    brand: str
+    units: int
+    revenue: float
+    avg_discount_percent: float
+
+    class Config:
+        from_attributes = True
+
+
+class MonthSales(BaseModel):
+    month: date
+    orders: int
+    units: int
+    revenue: float
+    avg_discount_percent: float
+
+    class Config:
+        from_attributes = True
+
+
+class ModelSales(BaseModel):
+    brand: str
+    model: str
+    units: int
+    revenue: float
+
+    class Config:
+        from_attributes = True
+
+
+class BrandSalesReport(BaseModel):
+    refreshed_at: datetime
+    items: List[BrandSales]
+
+
+class MonthSalesReport(BaseModel):
+    refreshed_at: datetime
+    items: List[MonthSales]
+
+
+class ModelSalesReport(BaseModel):
+    refreshed_at: datetime
+    items: List[ModelSales]
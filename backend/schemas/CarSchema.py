@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional
+from decimal import Decimal
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 
 
 class CarBase(BaseModel):
@@ -51,3 +52,92 @@ class Car(CarBase):
 
     class Config:
         from_attributes = True
+
+
+class CarPage(BaseModel):
+    items: List[Car]
+    next_cursor: Optional[str] = None
+
+
+class CarFields(CarUpdate):
+    id: int
+
+    class Config:
+        from_attributes = True
+
+
+class CarFieldsPage(BaseModel):
+    items: List[CarFields]
+    next_cursor: Optional[str] = None
+
+
+class CarIds(BaseModel):
+    ids: List[int]
+
+
+class CarSummary(BaseModel):
+    id: int
+    brand: str
+    model: str
+    year: int
+    price_usd: float
+
+    class Config:
+        from_attributes = True
+
+
+class CarSearch(BaseModel):
+    q: Optional[str] = None
+    brand: Optional[str] = None
+    model: Optional[str] = None
+    year_min: Optional[int] = None
+    year_max: Optional[int] = None
+    price_min: Optional[Decimal] = None
+    price_max: Optional[Decimal] = None
+    fuel_type: Optional[str] = None
+    body_type: Optional[str] = None
+    transmission: Optional[str] = None
+    in_stock: Optional[bool] = None
+    sort: Literal["relevance", "price_asc", "price_desc"] = "relevance"
+    skip: int = Field(0, ge=0)
+    limit: int = Field(20, ge=1, le=100)
+
+
+INT4_MAX = 2**31 - 1
+
+
+class CarImportRow(CarCreate):
+    id: Optional[int] = Field(None, ge=1, le=INT4_MAX)
+    year: int = Field(ge=0, le=INT4_MAX)
+    horsepower: int = Field(ge=0, le=INT4_MAX)
+    mileage_km: int = Field(ge=0, le=INT4_MAX)
+    top_speed_kmh: int = Field(ge=0, le=INT4_MAX)
+    price_usd: float = Field(ge=0, lt=1e8)
+    discount_percent: float = Field(ge=0, le=100)
+    num_in_stock: int = Field(ge=0, le=INT4_MAX)
+
+
+class CarStockUpdate(BaseModel):
+    id: int = Field(ge=1, le=INT4_MAX)
+    num_in_stock: Optional[int] = Field(None, ge=0, le=INT4_MAX)
+    price_usd: Optional[float] = Field(None, ge=0, lt=1e8)
+    discount_percent: Optional[float] = Field(None, ge=0, le=100)
+
+
+class RowError(BaseModel):
+    row: int
+    id: Optional[int] = None
+    detail: str
+
+
+class CarBulkResult(BaseModel):
+    received: int = 0
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: List[RowError] = []
+
+
+class RelatedCar(BaseModel):
+    car: Car
+    orders_together: int
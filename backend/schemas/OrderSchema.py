@@ -1,26 +1,53 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import List, Optional
-from .CarSchema import Car
+from .CarSchema import Car, CarSummary
 
 
 class OrderBase(BaseModel):
     pass
 
 
+class OrderItemCreate(BaseModel):
+    car_id: int
+    quantity: int = Field(1, ge=1)
+
+
+class OrderItem(OrderItemCreate):
+    class Config:
+        from_attributes = True
+
+
 class OrderCreate(BaseModel):
-    car_ids: List[int]
+    car_ids: List[int] = []
+    items: List[OrderItemCreate] = []
 
 
 class OrderUpdate(BaseModel):
     car_ids: Optional[List[int]] = None
+    items: Optional[List[OrderItemCreate]] = None
 
 
 class Order(OrderBase):
     id: int
     created_at: datetime
     user_id: int
-    cars: List[Car]
+    cars: List[CarSummary]
+    items: List[OrderItem] = []
 
     class Config:
         from_attributes = True
+
+
+class OrderWithCars(Order):
+    cars: List[Car]
+
+
+class OrderPage(BaseModel):
+    items: List[Order]
+    next_cursor: Optional[str] = None
+
+
+class OrderWithCarsPage(BaseModel):
+    items: List[OrderWithCars]
+    next_cursor: Optional[str] = None
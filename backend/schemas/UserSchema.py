@@ -27,3 +27,12 @@ class User(UserBase):
 
     class Config:
         from_attributes = True
+
+
+class Principal(BaseModel):
+    id: int
+    username: str
+    is_active: bool
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,114 @@
+from datetime import date, datetime
+from typing import Literal, Optional
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..helpers.analytics import sales_by_model, sales_by_month
+from ..models import AnalyticsStateModel
+from ..schemas.AnalyticsSchema import (
+    BrandSales,
+    BrandSalesReport,
+    ModelSales,
+    ModelSalesReport,
+    MonthSales,
+    MonthSalesReport,
+)
+
+
+async def refreshed_at(session: AsyncSession, view: str) -> Optional[datetime]:
+    return await session.scalar(
+        select(AnalyticsStateModel.refreshed_at).where(
+            AnalyticsStateModel.name == view
+        )
+    )
+
+
+def in_months(query, view, since: Optional[date], until: Optional[date]):
+    if since is not None:
+        query = query.where(view.c.month >= since)
+    if until is not None:
+        query = query.where(view.c.month < until)
+    return query
+
+
+def avg_discount(view):
+    return func.coalesce(
+        func.sum(view.c.discount_units) / func.nullif(func.sum(view.c.units), 0), 0
+    )
+
+
+async def get_sales_by_brand(
+    session: AsyncSession, since: Optional[date] = None, until: Optional[date] = None
+) -> Optional[BrandSalesReport]:
+    refreshed = await refreshed_at(session, sales_by_model.name)
+    if refreshed is None:
+        return None
+    revenue = func.sum(sales_by_model.c.revenue)
+    query = (
+        select(
+            sales_by_model.c.brand,
+            func.sum(sales_by_model.c.units).label("units"),
+            revenue.label("revenue"),
+            avg_discount(sales_by_model).label("avg_discount_percent"),
+        )
+        .group_by(sales_by_model.c.brand)
+        .order_by(revenue.desc(), sales_by_model.c.brand)
+    )
+    rows = (await session.execute(in_months(query, sales_by_model, since, until))).all()
+    return BrandSalesReport(
+        refreshed_at=refreshed, items=[BrandSales.model_validate(row) for row in rows]
+    )
+
+
+async def get_sales_by_month(
+    session: AsyncSession, since: Optional[date] = None, until: Optional[date] = None
+) -> Optional[MonthSalesReport]:
+    refreshed = await refreshed_at(session, sales_by_month.name)
+    if refreshed is None:
+        return None
+    query = select(
+        sales_by_month.c.month,
+        sales_by_month.c.orders,
+        sales_by_month.c.units,
+        sales_by_month.c.revenue,
+        func.coalesce(
+            sales_by_month.c.discount_units / func.nullif(sales_by_month.c.units, 0),
+            0,
+        ).label("avg_discount_percent"),
+    ).order_by(sales_by_month.c.month)
+    rows = (await session.execute(in_months(query, sales_by_month, since, until))).all()
+    return MonthSalesReport(
+        refreshed_at=refreshed, items=[MonthSales.model_validate(row) for row in rows]
+    )
+
+
+async def get_top_models(
+    session: AsyncSession,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    by: Literal["units", "revenue"] = "units",
+    limit: int = 10,
+) -> Optional[ModelSalesReport]:
+    refreshed = await refreshed_at(session, sales_by_model.name)
+    if refreshed is None:
+        return None
+    units = func.sum(sales_by_model.c.units)
+    revenue = func.sum(sales_by_model.c.revenue)
+    query = (
+        select(
+            sales_by_model.c.brand,
+            sales_by_model.c.model,
+            units.label("units"),
+            revenue.label("revenue"),
+        )
+        .group_by(sales_by_model.c.brand, sales_by_model.c.model)
+        .order_by(
+            (units if by == "units" else revenue).desc(),
+            sales_by_model.c.brand,
+            sales_by_model.c.model,
+        )
+        .limit(limit)
+    )
+    rows = (await session.execute(in_months(query, sales_by_model, since, until))).all()
+    return ModelSalesReport(
+        refreshed_at=refreshed, items=[ModelSales.model_validate(row) for row in rows]
+    )
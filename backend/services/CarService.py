@@ -1,51 +1,614 @@
-from typing import List, Optional
+import asyncio
+import json
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, AsyncIterator, List, Optional, Union
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import (
+    Column,
+    Integer,
+    MetaData,
+    Table,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    literal_column,
+    text,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.future import select
-from ..schemas.CarSchema import CarCreate, CarUpdate, Car
-from ..models import CarModel
+from ..schemas.CarSchema import (
+    CarBase,
+    CarCreate,
+    CarUpdate,
+    Car,
+    CarPage,
+    CarFields,
+    CarFieldsPage,
+    CarSearch,
+    CarImportRow,
+    CarStockUpdate,
+    CarBulkResult,
+    RowError,
+    RelatedCar,
+)
+from ..models import CarModel, OutboxEventModel, order_items, record_deletes_from
+from ..helpers.outbox import record_event, record_events_from
+from ..helpers.pagination import encode_cursor, decode_cursor
+from ..helpers.config import get_settings
+from ..helpers.cache import TTLCache
+from ..helpers.cooccurrence import RelatedIndex
+from ..helpers.db_conf import REPLICAS
+from ..helpers.loader import Loaders
+from ..helpers.projection import check_ids
+from ..helpers.replicas import lag_bound
+
+SETTINGS = get_settings()
+SEARCH_CONFIG = literal_column("'english'::regconfig")
+CAR_CACHE = TTLCache(SETTINGS.CAR_CACHE_SIZE, SETTINGS.CAR_CACHE_TTL_SECONDS)
+RELATED_CARS = RelatedIndex(
+    SETTINGS.RELATED_TOP_K,
+    SETTINGS.RELATED_MAX_ORDER_ITEMS,
+    SETTINGS.RELATED_ORDER_ID_OVERLAP,
+)
+RELATED_NOT_BUILT = object()
+ORDER_ITEMS_CHUNK = 200_000
+# Keyset pages of order_items as two arrays: far cheaper to decode than rows.
+ORDER_ITEMS_AFTER = text(
+    "SELECT array_agg(order_id ORDER BY order_id, car_id), "
+    "array_agg(car_id ORDER BY order_id, car_id) "
+    "FROM (SELECT order_id, car_id FROM order_items "
+    "WHERE (order_id, car_id) > (:order_id, :car_id) "
+    "ORDER BY order_id, car_id LIMIT :limit) page"
+)
+IMPORT_COLUMNS = list(CarBase.model_fields)
+EVENT_COLUMNS = list(Car.model_fields)
+CAR_IMPORT = Table(
+    "cars_import",
+    MetaData(),
+    Column("row", Integer, nullable=False),
+    Column("id", Integer),
+    *(Column(name, CarModel.__table__.c[name].type) for name in IMPORT_COLUMNS),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+
+def invalidate_car_cache(car_id: int):
+    # Bumps CAR_CACHE.version, which list and search keys embed, so every
+    # cached page goes stale at once and ages out of the LRU.
+    CAR_CACHE.invalidate(("car", car_id))
+
+
+def on_car_event(message):
+    invalidate_car_cache(message.headers["aggregate_id"])
+
+
+def on_order_created(message):
+    payload = json.loads(message.body)
+    RELATED_CARS.add_order(payload["id"], payload["car_ids"])
+
+
+async def read_order_items(
+    session: AsyncSession, min_order_id: int = 0
+) -> tuple[np.ndarray, np.ndarray]:
+    order_ids, car_ids = [], []
+    after = {"order_id": min_order_id, "car_id": 0}
+    while True:
+        page = (
+            await session.execute(
+                ORDER_ITEMS_AFTER, {**after, "limit": ORDER_ITEMS_CHUNK}
+            )
+        ).one()
+        if page[0] is None:
+            break
+        order_ids.append(np.array(page[0], dtype=np.int64))
+        car_ids.append(np.array(page[1], dtype=np.int64))
+        after = {"order_id": page[0][-1], "car_id": page[1][-1]}
+    if not order_ids:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    return np.concatenate(order_ids), np.concatenate(car_ids)
+
+
+async def rebuild_related_cars():
+    """Fold the orders RELATED_CARS may be missing into it, reading only those
+    above its low-water mark, or rebuild it from all order items every
+    RELATED_FULL_REBUILD_HOURS. Only a full rebuild sees updated and deleted
+    orders, which order.created events do not cover."""
+    current = RELATED_CARS.current
+    full = current is None or datetime.now(timezone.utc) - current.full_at >= (
+        timedelta(hours=SETTINGS.RELATED_FULL_REBUILD_HOURS)
+    )
+    min_order_id = 0 if full else RELATED_CARS.low_water()
+    async with REPLICAS.session() as session:
+        order_ids, car_ids = await read_order_items(session, min_order_id)
+    if full:
+        rebuilt = await asyncio.to_thread(RELATED_CARS.build, order_ids, car_ids)
+    else:
+        rebuilt = await asyncio.to_thread(
+            RELATED_CARS.extend, current, order_ids, car_ids
+        )
+    RELATED_CARS.replace(rebuilt)
 
 
 async def create_car(session: AsyncSession, car: CarCreate) -> Car:
     db_car = CarModel(**car.model_dump())
     session.add(db_car)
+    await session.flush()
+    record_event(
+        session, "car", db_car.id, "created", Car.model_validate(db_car).model_dump()
+    )
     await session.commit()
+    invalidate_car_cache(db_car.id)
     await session.refresh(db_car)
     return Car.model_validate(db_car)
 
 
-async def get_cars(session: AsyncSession, skip: int = 0, limit: int = 100) -> List[Car]:
-    result = await session.execute(select(CarModel).offset(skip).limit(limit))
+def car_columns(fields: Optional[tuple]) -> list:
+    return [CarModel.__table__.c[name] for name in ("id", *fields)]
+
+
+async def get_cars(
+    session: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    fields: Optional[tuple] = None,
+) -> List[Union[Car, CarFields]]:
+    async def load():
+        if fields is None:
+            query = select(CarModel)
+        else:
+            # Only the requested columns leave the database.
+            query = select(*car_columns(fields))
+        result = await session.execute(
+            query.order_by(CarModel.id).offset(skip).limit(limit)
+        )
+        if fields is None:
+            return [Car.model_validate(car) for car in result.scalars().all()]
+        return [CarFields.model_validate(dict(row)) for row in result.mappings()]
+
+    key = ("cars", CAR_CACHE.version, skip, limit, fields)
+    return list(await CAR_CACHE.get_or_load(key, load, lag_bound(session)))
+
+
+async def get_cars_page(
+    session: AsyncSession,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    fields: Optional[tuple] = None,
+) -> Union[CarPage, CarFieldsPage]:
+    if fields is None:
+        query = select(CarModel)
+    else:
+        query = select(*car_columns(fields))
+    query = query.order_by(CarModel.id).limit(limit + 1)
+    last_id = None
+    if cursor:
+        (last_id,) = decode_cursor(cursor, int)
+        query = query.where(CarModel.id > last_id)
+
+    async def load():
+        result = await session.execute(query)
+        if fields is None:
+            rows = result.scalars().all()
+            items = [Car.model_validate(car) for car in rows[:limit]]
+        else:
+            rows = result.mappings().all()
+            items = [CarFields.model_validate(dict(row)) for row in rows[:limit]]
+        next_cursor = encode_cursor([items[-1].id]) if len(rows) > limit else None
+        if fields is None:
+            return CarPage(items=items, next_cursor=next_cursor)
+        return CarFieldsPage(items=items, next_cursor=next_cursor)
+
+    return await CAR_CACHE.get_or_load(
+        ("cars_page", CAR_CACHE.version, last_id, limit, fields),
+        load,
+        lag_bound(session),
+    )
+
+
+async def search_cars(session: AsyncSession, params: CarSearch) -> List[Car]:
+    filters = tuple(sorted(params.model_dump(exclude_none=True).items()))
+    key = ("search", CAR_CACHE.version, filters)
+    cars = await CAR_CACHE.get_or_load(
+        key, lambda: _search_cars(session, params), lag_bound(session)
+    )
+    return list(cars)
+
+
+async def _search_cars(session: AsyncSession, params: CarSearch) -> List[Car]:
+    query = select(CarModel)
+    for column, value in (
+        (CarModel.brand, params.brand),
+        (CarModel.model, params.model),
+        (CarModel.fuel_type, params.fuel_type),
+        (CarModel.body_type, params.body_type),
+        (CarModel.transmission, params.transmission),
+    ):
+        if value is not None:
+            query = query.where(column == value)
+    if params.year_min is not None:
+        query = query.where(CarModel.year >= params.year_min)
+    if params.year_max is not None:
+        query = query.where(CarModel.year <= params.year_max)
+    if params.price_min is not None:
+        query = query.where(CarModel.effective_price >= params.price_min)
+    if params.price_max is not None:
+        query = query.where(CarModel.effective_price <= params.price_max)
+    if params.in_stock is True:
+        query = query.where(CarModel.num_in_stock > 0)
+    elif params.in_stock is False:
+        query = query.where(CarModel.num_in_stock == 0)
+
+    ts_query = None
+    if params.q:
+        ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, params.q)
+        query = query.where(CarModel.search_vector.op("@@")(ts_query))
+
+    if params.sort == "price_asc":
+        query = query.order_by(CarModel.effective_price, CarModel.id)
+    elif params.sort == "price_desc":
+        query = query.order_by(CarModel.effective_price.desc(), CarModel.id.desc())
+    elif ts_query is not None:
+        # Every match is ranked; the route bounds skip + limit, so the sort
+        # only keeps that many rows.
+        query = query.order_by(
+            func.ts_rank_cd(CarModel.search_vector, ts_query).desc(), CarModel.id
+        )
+    else:
+        query = query.order_by(CarModel.id)
+
+    result = await session.execute(query.offset(params.skip).limit(params.limit))
     return [Car.model_validate(car) for car in result.scalars().all()]
 
 
 async def get_car(session: AsyncSession, car_id: int) -> Optional[Car]:
-    result = await session.execute(select(CarModel).where(CarModel.id == car_id))
-    db_car = result.scalar_one_or_none()
-    if db_car:
-        return Car.model_validate(db_car)
-    return None
+    async def load():
+        result = await session.execute(select(CarModel).where(CarModel.id == car_id))
+        db_car = result.scalar_one_or_none()
+        if db_car:
+            return Car.model_validate(db_car)
+        return None
+
+    return await CAR_CACHE.get_or_load(("car", car_id), load, lag_bound(session))
+
+
+async def load_cars(session: AsyncSession, car_ids: list) -> dict[int, Car]:
+    """Batch function for Loaders: cached cars, the rest in one IN query."""
+
+    async def load(keys):
+        result = await session.execute(
+            select(CarModel).where(CarModel.id.in_([car_id for _, car_id in keys]))
+        )
+        return {
+            ("car", car.id): Car.model_validate(car) for car in result.scalars().all()
+        }
+
+    cars = await CAR_CACHE.get_many_or_load(
+        [("car", car_id) for car_id in car_ids], load, lag_bound(session)
+    )
+    return {car_id: car for (_, car_id), car in cars.items()}
+
+
+async def get_cars_by_ids(
+    loaders: Loaders, car_ids: List[int], fields: Optional[tuple] = None
+) -> List[Optional[Union[Car, CarFields]]]:
+    """Cars in the order asked for, with None for ids that do not exist."""
+    check_ids(car_ids, SETTINGS.CAR_BATCH_MAX_IDS)
+    cars = await loaders(load_cars).load_many(car_ids)
+    if fields is None:
+        return cars
+    include = {"id", *fields}
+    return [
+        None if car is None else CarFields(**car.model_dump(include=include))
+        for car in cars
+    ]
+
+
+async def get_related_cars(
+    loaders: Loaders, car_id: int, limit: int
+) -> Union[List[RelatedCar], None, object]:
+    """Cars most often ordered together with car_id, best first; None if the
+    car does not exist, RELATED_NOT_BUILT before the index is first built."""
+    related = RELATED_CARS.related(car_id, limit)
+    if related is None:
+        return RELATED_NOT_BUILT
+    car, *cars = await loaders(load_cars).load_many(
+        [car_id, *(other_id for other_id, _ in related)]
+    )
+    if car is None:
+        return None
+    return [
+        RelatedCar(car=other, orders_together=count)
+        for other, (_, count) in zip(cars, related)
+        if other is not None
+    ]
 
 
 async def update_car(
     session: AsyncSession, car_id: int, car_update: CarUpdate
 ) -> Optional[Car]:
-    result = await session.execute(select(CarModel).where(CarModel.id == car_id))
-    db_car = result.scalar_one_or_none()
-    if not db_car:
+    updated = (
+        update(CarModel)
+        .where(CarModel.id == car_id)
+        .values(**car_update.model_dump(exclude_unset=True), updated_at=func.now())
+        .returning(*(CarModel.__table__.c[name] for name in EVENT_COLUMNS))
+        .cte("updated")
+    )
+    events = _record_car_events(updated, "updated").cte("events")
+    result = await session.execute(select(updated).add_cte(events))
+    row = result.first()
+    if row is None:
         return None
-    update_data = car_update.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_car, key, value)
     await session.commit()
-    await session.refresh(db_car)
-    return Car.model_validate(db_car)
+    invalidate_car_cache(car_id)
+    return Car.model_validate(row)
 
 
 async def delete_car(session: AsyncSession, car_id: int) -> bool:
-    result = await session.execute(select(CarModel).where(CarModel.id == car_id))
-    db_car = result.scalar_one_or_none()
-    if not db_car:
+    # order_items rows go in the same statement; foreign keys are checked at
+    # its end, after both deletes.
+    detached = delete(order_items).where(order_items.c.car_id == car_id)
+    deleted = (
+        delete(CarModel)
+        .where(CarModel.id == car_id)
+        .returning(CarModel.id)
+        .cte("deleted")
+    )
+    events = record_events_from(deleted, "car", "deleted", ["id"]).cte("events")
+    tombstones = record_deletes_from(deleted, "cars").cte("tombstones")
+    result = await session.execute(
+        select(deleted.c.id).add_cte(detached.cte("detached"), events, tombstones)
+    )
+    if result.first() is None:
         return False
-    await session.delete(db_car)
     await session.commit()
+    invalidate_car_cache(car_id)
     return True
+
+
+def _record_failure(
+    result: CarBulkResult, row: int, car_id: Optional[int], detail: str
+):
+    result.failed += 1
+    if len(result.errors) < SETTINGS.BULK_MAX_ERRORS:
+        result.errors.append(RowError(row=row, id=car_id, detail=detail))
+
+
+def _raw_id(record) -> Optional[int]:
+    try:
+        return int(record["id"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _validation_detail(error: ValidationError) -> str:
+    return "; ".join(
+        ": ".join(filter(None, [".".join(str(p) for p in e["loc"]), e["msg"]]))
+        for e in error.errors()
+    )
+
+
+def _record_car_events(changed, event_type: str):
+    return record_events_from(changed, "car", event_type, EVENT_COLUMNS)
+
+
+async def import_cars(
+    session: AsyncSession,
+    records: AsyncIterator[tuple[int, Optional[dict], Optional[str]]],
+) -> CarBulkResult:
+    result = CarBulkResult()
+    conn = await session.connection()
+    await conn.run_sync(CAR_IMPORT.create)
+    driver = (await conn.get_raw_connection()).driver_connection
+    columns = ["row", "id", *IMPORT_COLUMNS]
+    batch = []
+
+    async def copy(records):
+        await driver.copy_records_to_table(
+            CAR_IMPORT.name, records=records, columns=columns
+        )
+
+    async for row, record, error in records:
+        result.received += 1
+        car_id = _raw_id(record)
+        if error is None:
+            try:
+                car = CarImportRow.model_validate(record)
+            except ValidationError as e:
+                error = _validation_detail(e)
+        if error is not None:
+            _record_failure(result, row, car_id, error)
+            continue
+        values = car.model_dump()
+        values["price_usd"] = Decimal(str(car.price_usd))
+        values["discount_percent"] = Decimal(str(car.discount_percent))
+        batch.append((row, car.id, *(values[name] for name in IMPORT_COLUMNS)))
+        if len(batch) >= SETTINGS.BULK_COPY_BATCH_SIZE:
+            await copy(batch)
+            batch = []
+    if batch:
+        await copy(batch)
+
+    staged = CAR_IMPORT.alias("staged")
+    later = CAR_IMPORT.alias("later")
+    rejected = await session.execute(
+        select(staged.c.row, staged.c.id)
+        .where(
+            staged.c.id.is_not(None),
+            ~exists().where(CarModel.id == staged.c.id),
+        )
+        .order_by(staged.c.row)
+    )
+    for row, car_id in rejected:
+        _record_failure(result, row, car_id, "Car not found")
+    superseded = await session.execute(
+        select(staged.c.row, staged.c.id, func.max(later.c.row))
+        .join(later, (later.c.id == staged.c.id) & (later.c.row > staged.c.row))
+        .group_by(staged.c.row, staged.c.id)
+        .order_by(staged.c.row)
+    )
+    for row, car_id, winner in superseded:
+        _record_failure(result, row, car_id, f"Duplicate id, row {winner} applied")
+
+    latest = (
+        select(CAR_IMPORT)
+        .where(CAR_IMPORT.c.id.is_not(None))
+        .distinct(CAR_IMPORT.c.id)
+        .order_by(CAR_IMPORT.c.id, CAR_IMPORT.c.row.desc())
+        .subquery("latest")
+    )
+    updated = (
+        update(CarModel)
+        .where(CarModel.id == latest.c.id)
+        .values(
+            {
+                **{name: latest.c[name] for name in IMPORT_COLUMNS},
+                "updated_at": func.now(),
+            }
+        )
+        .returning(*(CarModel.__table__.c[name] for name in EVENT_COLUMNS))
+        .cte("updated")
+    )
+    result.updated = (
+        await session.execute(_record_car_events(updated, "updated"))
+    ).rowcount
+
+    inserted = (
+        insert(CarModel)
+        .from_select(
+            IMPORT_COLUMNS,
+            select(*(CAR_IMPORT.c[name] for name in IMPORT_COLUMNS))
+            .where(CAR_IMPORT.c.id.is_(None))
+            .order_by(CAR_IMPORT.c.row),
+        )
+        .returning(*(CarModel.__table__.c[name] for name in EVENT_COLUMNS))
+        .cte("inserted")
+    )
+    result.created = (
+        await session.execute(_record_car_events(inserted, "created"))
+    ).rowcount
+
+    await session.commit()
+    CAR_CACHE.clear()
+    result.errors.sort(key=lambda e: e.row)
+    return result
+
+
+async def update_stock(session: AsyncSession, rows: List[Any]) -> CarBulkResult:
+    result = CarBulkResult(received=len(rows))
+    changes = {}
+    for row, record in enumerate(rows, start=1):
+        car_id = _raw_id(record)
+        try:
+            change = CarStockUpdate.model_validate(record)
+        except ValidationError as e:
+            _record_failure(result, row, car_id, _validation_detail(e))
+            continue
+        if change.id in changes:
+            earlier, _ = changes[change.id]
+            detail = f"Duplicate id, row {row} applied"
+            _record_failure(result, earlier, change.id, detail)
+        changes[change.id] = (row, change)
+    if not changes:
+        return result
+
+    def column(values, item_type):
+        return literal(values, ARRAY(item_type))
+
+    def decimals(name):
+        return [
+            None if getattr(c, name) is None else Decimal(str(getattr(c, name)))
+            for _, c in changes.values()
+        ]
+
+    incoming = (
+        func.unnest(
+            column(list(changes), Integer),
+            column([c.num_in_stock for _, c in changes.values()], Integer),
+            column(decimals("price_usd"), CarModel.price_usd.type),
+            column(decimals("discount_percent"), CarModel.discount_percent.type),
+        )
+        .table_valued("id", "num_in_stock", "price_usd", "discount_percent")
+        .render_derived(name="incoming")
+    )
+    updated = (
+        update(CarModel)
+        .where(CarModel.id == incoming.c.id)
+        .values(
+            num_in_stock=func.coalesce(incoming.c.num_in_stock, CarModel.num_in_stock),
+            price_usd=func.coalesce(incoming.c.price_usd, CarModel.price_usd),
+            discount_percent=func.coalesce(
+                incoming.c.discount_percent, CarModel.discount_percent
+            ),
+            updated_at=func.now(),
+        )
+        .returning(*(CarModel.__table__.c[name] for name in EVENT_COLUMNS))
+        .cte("updated")
+    )
+    events = await session.execute(
+        _record_car_events(updated, "updated").returning(OutboxEventModel.aggregate_id)
+    )
+    found = set(events.scalars().all())
+    await session.commit()
+    result.updated = len(found)
+    for car_id, (row, _) in sorted(changes.items(), key=lambda item: item[1][0]):
+        if car_id not in found:
+            _record_failure(result, row, car_id, "Car not found")
+    for car_id in found:
+        invalidate_car_cache(car_id)
+    result.errors.sort(key=lambda e: e.row)
+    return result
+
+
+async def adjust_stock(session: AsyncSession, deltas: dict[int, int]) -> set[int]:
+    """Add signed deltas to num_in_stock in one statement, never going below zero.
+
+    Rows are locked in id order first so concurrent multi-car orders cannot
+    deadlock. NO KEY UPDATE leaves the key-share locks taken by order_items
+    foreign keys free, since those arrive later and out of order. Returns the
+    ids that were adjusted; the caller rolls back when that is not every
+    requested car.
+    """
+    if not deltas:
+        return set()
+    requested = (
+        func.unnest(
+            literal(list(deltas), ARRAY(Integer)),
+            literal(list(deltas.values()), ARRAY(Integer)),
+        )
+        .table_valued("car_id", "delta")
+        .render_derived(name="requested")
+    )
+    locked = (
+        select(CarModel.id)
+        .where(CarModel.id.in_(list(deltas)))
+        .order_by(CarModel.id)
+        .with_for_update(key_share=True)
+        .cte("locked")
+        .prefix_with("MATERIALIZED")
+    )
+    adjusted = (
+        update(CarModel)
+        .where(
+            CarModel.id == locked.c.id,
+            CarModel.id == requested.c.car_id,
+            CarModel.num_in_stock + requested.c.delta >= 0,
+        )
+        .values(
+            num_in_stock=CarModel.num_in_stock + requested.c.delta,
+            updated_at=func.now(),
+        )
+        .returning(CarModel.id, CarModel.num_in_stock)
+        .cte("adjusted")
+    )
+    events = record_events_from(
+        adjusted, "car", "stock", ["id", "num_in_stock"]
+    ).cte("events")
+    result = await session.execute(select(adjusted.c.id).add_cte(events))
+    return set(result.scalars().all())
@@ -1,61 +1,258 @@
-from typing import List, Optional
+from collections import Counter
+from typing import List, Optional, Union
+from datetime import datetime
+from sqlalchemy import delete, func, insert, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
-from ..models import OrderModel, CarModel
-from ..schemas.OrderSchema import OrderCreate, OrderUpdate, Order
+from ..models import OrderModel, CarModel, order_items, record_deletes_from
+from ..schemas.CarSchema import CarSummary
+from ..schemas.OrderSchema import (
+    OrderCreate,
+    OrderUpdate,
+    Order,
+    OrderItem,
+    OrderPage,
+    OrderWithCars,
+    OrderWithCarsPage,
+)
+from ..helpers.loader import Loaders
+from ..helpers.outbox import record_event, record_events_from
+from ..helpers.pagination import encode_cursor, decode_cursor
+from .CarService import adjust_stock, invalidate_car_cache, load_cars
 
 
-async def create_order(
-    session: AsyncSession, user_id: int, order: OrderCreate
+def order_loader_options(expand_cars: bool = False) -> list:
+    cars = selectinload(OrderModel.cars)
+    if not expand_cars:
+        # Summaries skip the long text columns in SQL, not just in the response.
+        cars = cars.load_only(*(getattr(CarModel, f) for f in CarSummary.model_fields))
+    return [cars, selectinload(OrderModel.items)]
+
+
+def order_event_payload(order_id: int, user_id: int, quantities: dict) -> dict:
+    return {
+        "id": order_id,
+        "user_id": user_id,
+        "car_ids": list(quantities),
+        "items": [{"car_id": c, "quantity": q} for c, q in quantities.items()],
+    }
+
+
+def requested_quantities(order: Union[OrderCreate, OrderUpdate]) -> dict[int, int]:
+    quantities = Counter(order.car_ids or [])
+    for item in order.items or []:
+        quantities[item.car_id] += item.quantity
+    return dict(sorted(quantities.items()))
+
+
+async def insert_order_items(
+    session: AsyncSession, order_id: int, quantities: dict[int, int]
+):
+    if quantities:
+        await session.execute(
+            insert(order_items),
+            [
+                {"order_id": order_id, "car_id": c, "quantity": q}
+                for c, q in quantities.items()
+            ],
+        )
+
+
+async def write_order_items(
+    session: AsyncSession, order_id: int, quantities: dict[int, int]
+):
+    """Delete the cars whose quantity is now 0 and upsert the others."""
+    removed = [c for c, q in quantities.items() if not q]
+    kept = [
+        {"order_id": order_id, "car_id": c, "quantity": q}
+        for c, q in quantities.items()
+        if q
+    ]
+    if removed:
+        await session.execute(
+            delete(order_items).where(
+                order_items.c.order_id == order_id, order_items.c.car_id.in_(removed)
+            )
+        )
+    if kept:
+        upsert = pg_insert(order_items).values(kept)
+        await session.execute(
+            upsert.on_conflict_do_update(
+                index_elements=[order_items.c.order_id, order_items.c.car_id],
+                set_={"quantity": upsert.excluded.quantity},
+            )
+        )
+
+
+class StockError(Exception):
+    def __init__(self, car_ids: list[int]):
+        super().__init__(car_ids)
+        self.car_ids = car_ids
+
+
+class CarsNotFound(StockError):
+    pass
+
+
+class InsufficientStock(StockError):
+    pass
+
+
+async def apply_stock_changes(session: AsyncSession, deltas: dict[int, int]):
+    """Apply stock deltas, or roll back and raise CarsNotFound or
+    InsufficientStock naming the failing cars."""
+    deltas = {car_id: delta for car_id, delta in deltas.items() if delta}
+    adjusted = await adjust_stock(session, deltas)
+    failed = sorted(set(deltas) - adjusted)
+    if not failed:
+        return
+    await session.rollback()
+    result = await session.execute(select(CarModel.id).where(CarModel.id.in_(failed)))
+    existing = set(result.scalars().all())
+    missing = [car_id for car_id in failed if car_id not in existing]
+    if missing:
+        raise CarsNotFound(missing)
+    raise InsufficientStock(failed)
+
+
+async def order_response(
+    loaders: Loaders,
+    order_id: int,
+    user_id: int,
+    created_at: datetime,
+    quantities: dict[int, int],
 ) -> Order:
-    result = await session.execute(
-        select(CarModel).where(CarModel.id.in_(order.car_ids))
+    """Build a written order's response from what the write already knows; only
+    the car summaries are read, through the request's car loader.
+
+    Lists cars and items by car id, as reading the order back does, and leaves
+    out cars deleted meanwhile from both.
+    """
+    car_ids = sorted(quantities)
+    cars = await loaders(load_cars).load_many(car_ids)
+    found = [car for car in cars if car is not None]
+    return Order(
+        id=order_id,
+        created_at=created_at,
+        user_id=user_id,
+        cars=[CarSummary.model_validate(car) for car in found],
+        items=[OrderItem(car_id=car.id, quantity=quantities[car.id]) for car in found],
     )
-    cars_list = result.scalars().all()
-    db_order = OrderModel(user_id=user_id, cars=cars_list)
+
+
+async def create_order(
+    session: AsyncSession,
+    user_id: int,
+    order: OrderCreate,
+    loaders: Optional[Loaders] = None,
+) -> Order:
+    quantities = requested_quantities(order)
+    await apply_stock_changes(session, {c: -q for c, q in quantities.items()})
+    db_order = OrderModel(user_id=user_id)
     session.add(db_order)
+    await session.flush()
+    await insert_order_items(session, db_order.id, quantities)
+    record_event(
+        session,
+        "order",
+        db_order.id,
+        "created",
+        order_event_payload(db_order.id, user_id, quantities),
+    )
     await session.commit()
-    await session.refresh(db_order, ["user"])
-
-    return Order.model_validate(db_order)
+    for car_id in quantities:
+        invalidate_car_cache(car_id)
+    return await order_response(
+        loaders or Loaders(session),
+        db_order.id,
+        user_id,
+        db_order.created_at,
+        quantities,
+    )
 
 
 async def get_orders(
-    session: AsyncSession, user_id: int = None, skip: int = 0, limit: int = 100
-) -> List[Order]:
-    query = select(OrderModel).options(
-        selectinload(OrderModel.cars), selectinload(OrderModel.user)
-    )
+    session: AsyncSession,
+    user_id: int = None,
+    skip: int = 0,
+    limit: int = 100,
+    expand_cars: bool = False,
+) -> List[Union[Order, OrderWithCars]]:
+    schema = OrderWithCars if expand_cars else Order
+    query = select(OrderModel).options(*order_loader_options(expand_cars))
     if user_id is not None:
         query = query.where(OrderModel.user_id == user_id)
 
     query = query.offset(skip).limit(limit)
     result = await session.execute(query)
-    return [Order.model_validate(order) for order in result.scalars().all()]
+    return [schema.model_validate(order) for order in result.scalars().all()]
+
+
+async def get_orders_page(
+    session: AsyncSession,
+    user_id: int = None,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    expand_cars: bool = False,
+) -> Union[OrderPage, OrderWithCarsPage]:
+    schema = OrderWithCars if expand_cars else Order
+    query = (
+        select(OrderModel)
+        .options(*order_loader_options(expand_cars))
+        .order_by(OrderModel.created_at, OrderModel.id)
+        .limit(limit + 1)
+    )
+    if user_id is not None:
+        query = query.where(OrderModel.user_id == user_id)
+    if cursor:
+        created_at, last_id = decode_cursor(cursor, datetime, int)
+        query = query.where(
+            tuple_(OrderModel.created_at, OrderModel.id) > (created_at, last_id)
+        )
+
+    result = await session.execute(query)
+    rows = result.scalars().all()
+    items = [schema.model_validate(order) for order in rows[:limit]]
+    next_cursor = (
+        encode_cursor([items[-1].created_at, items[-1].id])
+        if len(rows) > limit
+        else None
+    )
+    if expand_cars:
+        return OrderWithCarsPage(items=items, next_cursor=next_cursor)
+    return OrderPage(items=items, next_cursor=next_cursor)
 
 
-async def get_order(session: AsyncSession, order_id: int) -> Optional[Order]:
+async def get_order(
+    session: AsyncSession, order_id: int, expand_cars: bool = False
+) -> Optional[Union[Order, OrderWithCars]]:
     stmt = (
         select(OrderModel)
         .where(OrderModel.id == order_id)
-        .options(selectinload(OrderModel.cars), selectinload(OrderModel.user))
+        .options(*order_loader_options(expand_cars))
     )
     result = await session.execute(stmt)
     db_order = result.scalar_one_or_none()
 
     if db_order:
-        return Order.model_validate(db_order)
+        schema = OrderWithCars if expand_cars else Order
+        return schema.model_validate(db_order)
     return None
 
 
 async def update_order(
-    session: AsyncSession, order_id: int, order_update: OrderUpdate
+    session: AsyncSession,
+    order_id: int,
+    order_update: OrderUpdate,
+    loaders: Optional[Loaders] = None,
 ) -> Optional[Order]:
     stmt = (
         select(OrderModel)
         .where(OrderModel.id == order_id)
-        .options(selectinload(OrderModel.cars), selectinload(OrderModel.user))
+        .options(selectinload(OrderModel.items))
+        .with_for_update(of=OrderModel)
     )
     result = await session.execute(stmt)
     db_order = result.scalar_one_or_none()
@@ -63,24 +260,93 @@ async def update_order(
     if not db_order:
         return None
 
-    if order_update.car_ids is not None:
-        result = await session.execute(
-            select(CarModel).where(CarModel.id.in_(order_update.car_ids))
+    changed = set()
+    old = {item.car_id: item.quantity for item in db_order.items}
+    new = old
+    if order_update.car_ids is not None or order_update.items is not None:
+        new = requested_quantities(order_update)
+        changed = sorted(c for c in old.keys() | new.keys() if old.get(c) != new.get(c))
+        # Positive deltas release stock, negative ones reserve it.
+        await apply_stock_changes(
+            session, {c: old.get(c, 0) - new.get(c, 0) for c in changed}
+        )
+        await write_order_items(session, order_id, {c: new.get(c, 0) for c in changed})
+        db_order.updated_at = func.now()
+        record_event(
+            session,
+            "order",
+            order_id,
+            "updated",
+            order_event_payload(order_id, db_order.user_id, new),
         )
-        cars = result.scalars().all()
-        db_order.cars = cars
 
     await session.commit()
-    await session.refresh(db_order, ["cars", "user"])
-
-    return Order.model_validate(db_order)
+    for car_id in changed:
+        invalidate_car_cache(car_id)
+    return await order_response(
+        loaders or Loaders(session),
+        order_id,
+        db_order.user_id,
+        db_order.created_at,
+        new,
+    )
 
 
 async def delete_order(session: AsyncSession, order_id: int) -> bool:
-    result = await session.execute(select(OrderModel).where(OrderModel.id == order_id))
-    db_order = result.scalar_one_or_none()
-    if not db_order:
+    """Delete the order, its items and return their stock in one statement.
+
+    A concurrent update_order that adds items after this statement's snapshot
+    leaves a dangling order_items row, so the foreign key check fails the
+    statement instead of losing stock.
+    """
+    deleted = (
+        delete(OrderModel)
+        .where(OrderModel.id == order_id)
+        .returning(OrderModel.id)
+        .cte("deleted")
+    )
+    released = (
+        delete(order_items)
+        .where(order_items.c.order_id == order_id)
+        .returning(order_items.c.car_id, order_items.c.quantity)
+        .cte("released")
+    )
+    locked = (
+        select(CarModel.id)
+        .where(CarModel.id.in_(select(released.c.car_id)))
+        .order_by(CarModel.id)
+        .with_for_update(key_share=True)
+        .cte("locked")
+        .prefix_with("MATERIALIZED")
+    )
+    restocked = (
+        update(CarModel)
+        .where(CarModel.id == locked.c.id, CarModel.id == released.c.car_id)
+        .values(
+            num_in_stock=CarModel.num_in_stock + released.c.quantity,
+            updated_at=func.now(),
+        )
+        .returning(CarModel.id, CarModel.num_in_stock)
+        .cte("restocked")
+    )
+    result = await session.execute(
+        select(
+            deleted.c.id,
+            select(func.array_agg(restocked.c.id)).scalar_subquery(),
+        ).add_cte(
+            record_events_from(
+                restocked, "car", "stock", ["id", "num_in_stock"]
+            ).cte("stock_events"),
+            record_events_from(deleted, "order", "deleted", ["id"]).cte(
+                "order_events"
+            ),
+            record_deletes_from(deleted, "orders").cte("tombstones"),
+        )
+    )
+    row = result.first()
+    if row is None:
         return False
-    await session.delete(db_order)
     await session.commit()
+    for car_id in row[1] or []:
+        invalidate_car_cache(car_id)
     return True
@@ -1,18 +1,39 @@
 from typing import Optional
+from sqlalchemy import delete, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from ..models import UserModel
-from ..schemas.UserSchema import UserCreate, UserUpdate, User
+from ..models import UserModel, record_deletes_from
+from ..schemas.UserSchema import UserCreate, UserUpdate, User, Principal
 from ..helpers.hash import hash_password, verify_password
+from ..helpers.cache import TTLCache
+from ..helpers.config import get_settings
+from ..helpers.outbox import record_events_from
+
+SETTINGS = get_settings()
+PRINCIPAL_CACHE = TTLCache(
+    SETTINGS.PRINCIPAL_CACHE_SIZE, SETTINGS.PRINCIPAL_CACHE_TTL_SECONDS
+)
+USER_EVENT_COLUMNS = ["id", "username", "email", "is_active"]
+
+
+def invalidate_principal(user_id: int):
+    PRINCIPAL_CACHE.invalidate_where(
+        lambda key, principal: principal is not None and principal.id == user_id
+    )
+
+
+def on_user_event(message):
+    invalidate_principal(message.headers["aggregate_id"])
 
 
 async def create_user(session: AsyncSession, user: UserCreate) -> User:
-    hashed_password = hash_password(user.password)
+    hashed_password = await hash_password(user.password)
     db_user = UserModel(
         username=user.username, email=user.email, hashed_password=hashed_password
     )
     session.add(db_user)
     await session.commit()
+    PRINCIPAL_CACHE.invalidate(user.username)
     await session.refresh(db_user)
     return User.model_validate(db_user)
 
@@ -25,6 +46,12 @@ async def get_user(session: AsyncSession, user_id: int) -> Optional[User]:
     return None
 
 
+async def load_users(session: AsyncSession, user_ids: list) -> dict[int, User]:
+    """Batch function for Loaders: users by id in one IN query."""
+    result = await session.execute(select(UserModel).where(UserModel.id.in_(user_ids)))
+    return {user.id: User.model_validate(user) for user in result.scalars().all()}
+
+
 async def get_user_by_username(
     session: AsyncSession, username: str
 ) -> Optional[UserModel]:
@@ -34,6 +61,19 @@ async def get_user_by_username(
     return result.scalar_one_or_none()
 
 
+async def get_principal(session: AsyncSession, username: str) -> Optional[Principal]:
+    async def load():
+        result = await session.execute(
+            select(UserModel.id, UserModel.username, UserModel.is_active).where(
+                UserModel.username == username
+            )
+        )
+        row = result.first()
+        return Principal.model_validate(row) if row else None
+
+    return await PRINCIPAL_CACHE.get_or_load(username, load)
+
+
 async def get_user_by_email(session: AsyncSession, email: str) -> Optional[UserModel]:
     result = await session.execute(select(UserModel).where(UserModel.email == email))
     return result.scalar_one_or_none()
@@ -42,27 +82,44 @@ async def get_user_by_email(session: AsyncSession, email: str) -> Optional[UserM
 async def update_user(
     session: AsyncSession, user_id: int, user_update: UserUpdate
 ) -> Optional[User]:
-    result = await session.execute(select(UserModel).where(UserModel.id == user_id))
-    db_user = result.scalar_one_or_none()
-    if not db_user:
-        return None
     update_data = user_update.model_dump(exclude_unset=True)
     if "password" in update_data:
-        update_data["hashed_password"] = hash_password(update_data.pop("password"))
-    for key, value in update_data.items():
-        setattr(db_user, key, value)
+        password = update_data.pop("password")
+        update_data["hashed_password"] = await hash_password(password)
+    updated = (
+        update(UserModel)
+        .where(UserModel.id == user_id)
+        .values(**update_data, updated_at=func.now())
+        .returning(*(UserModel.__table__.c[name] for name in User.model_fields))
+        .cte("updated")
+    )
+    events = record_events_from(
+        updated, "user", "updated", USER_EVENT_COLUMNS
+    ).cte("events")
+    result = await session.execute(select(updated).add_cte(events))
+    row = result.first()
+    if row is None:
+        return None
     await session.commit()
-    await session.refresh(db_user)
-    return User.model_validate(db_user)
+    invalidate_principal(user_id)
+    PRINCIPAL_CACHE.invalidate(row.username)
+    return User.model_validate(row)
 
 
 async def delete_user(session: AsyncSession, user_id: int) -> bool:
-    result = await session.execute(select(UserModel).where(UserModel.id == user_id))
-    db_user = result.scalar_one_or_none()
-    if not db_user:
+    deleted = (
+        delete(UserModel)
+        .where(UserModel.id == user_id)
+        .returning(UserModel.id)
+        .cte("deleted")
+    )
+    events = record_events_from(deleted, "user", "deleted", ["id"]).cte("events")
+    tombstones = record_deletes_from(deleted, "users").cte("tombstones")
+    result = await session.execute(select(deleted.c.id).add_cte(events, tombstones))
+    if result.first() is None:
         return False
-    await session.delete(db_user)
     await session.commit()
+    invalidate_principal(user_id)
     return True
 
 
@@ -72,6 +129,6 @@ async def authenticate_user(
     db_user = await get_user_by_username(session, username)
     if not db_user:
         return None
-    if not verify_password(password, db_user.hashed_password):
+    if not await verify_password(password, db_user.hashed_password):
         return None
     return db_user
@@ -1,3 +1,6 @@
+import hashlib
+import json
+from collections import OrderedDict
 from ..store import BaseNLP, BaseVectorDB, PromptFactory
 from ..core import get_settings, TaskModelConfig
 
@@ -6,10 +9,14 @@ SETTINGS = get_settings()
 
 
 class DescripeAgent:
-    def __init__(self, nlp: BaseNLP, vectordb: BaseVectorDB):
+    def __init__(
+        self, nlp: BaseNLP, vectordb: BaseVectorDB, max_tracked_cars: int = 100_000
+    ):
         self.nlp = nlp
         self.vectordb = vectordb
         self.prompt_factory = PromptFactory()
+        self.max_tracked_cars = max_tracked_cars
+        self.indexed_digests = OrderedDict()
 
     async def descripe_cars(self, contents: list[str]):
         descriptions = list()
@@ -27,3 +34,36 @@ class DescripeAgent:
         embeddings = self.nlp.embed(contents)
         metadata = [{"id": car_id, "text": text} for text, car_id in zip(contents, ids)]
         self.vectordb.add_points(namespace, ids, embeddings, metadata)
+
+    async def index_cars(self, namespace: str, cars: list[dict]) -> int:
+        contents, ids, digests = [], [], []
+        for car in cars:
+            car = dict(car)
+            car.pop("_sa_instance_state", None)
+            car.pop("updated_at", None)
+            car_id = car.pop("id", None)
+            content = json.dumps(
+                car, ensure_ascii=False, separators=(",", ":"), sort_keys=True, default=str
+            )
+            digest = hashlib.blake2b(content.encode(), digest_size=16).digest()
+            if self.indexed_digests.get(car_id) == digest:
+                continue
+            contents.append(content)
+            ids.append(car_id)
+            digests.append(digest)
+        if not ids:
+            return 0
+
+        descs = await self.descripe_cars(contents)
+        await self.process_cars(namespace, descs, ids)
+        for car_id, digest in zip(ids, digests):
+            self.indexed_digests[car_id] = digest
+            self.indexed_digests.move_to_end(car_id)
+        while len(self.indexed_digests) > self.max_tracked_cars:
+            self.indexed_digests.popitem(last=False)
+        return len(ids)
+
+    def remove_cars(self, namespace: str, ids: list):
+        self.vectordb.delete_points(namespace, ids)
+        for car_id in ids:
+            self.indexed_digests.pop(car_id, None)
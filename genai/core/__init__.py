@@ -1,3 +1,5 @@
 from .config import get_settings
 from .enums import GeminiChat, OpenAIChat, NodesNames, GeminiModel, TaskModelConfig
 from .schemas import Car, ManyCars, SemanticDescription
+from .wire import decode_payload, unpack_rows
+from .metrics import CONTENT_TYPE, REGISTRY, MetricsMiddleware
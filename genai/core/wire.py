@@ -0,0 +1,39 @@
+import json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MSGPACK_CONTENT_TYPE = "application/x-msgpack"
+ZSTD_ENCODING = "zstd"
+SUPPORTED_SCHEMAS = {"cars.v1"}
+
+
+def decode_payload(
+    body: bytes, content_type: str | None = None, content_encoding: str | None = None
+) -> dict:
+    if content_encoding == ZSTD_ENCODING:
+        if zstandard is None:
+            raise ValueError("Received a zstd message but zstandard is not installed")
+        body = zstandard.ZstdDecompressor().decompress(body)
+    elif content_encoding:
+        raise ValueError(f"Unsupported content encoding: {content_encoding}")
+    if content_type == MSGPACK_CONTENT_TYPE:
+        if msgpack is None:
+            raise ValueError("Received a msgpack message but msgpack is not installed")
+        return msgpack.unpackb(body, timestamp=3)
+    return json.loads(body.decode())
+
+
+def unpack_rows(payload: dict) -> list[dict]:
+    schema = payload.get("schema")
+    if schema is not None and schema not in SUPPORTED_SCHEMAS:
+        raise ValueError(f"Unsupported row schema: {schema}")
+    columns = payload["columns"]
+    return [dict(zip(columns, values)) for values in payload["rows"]]
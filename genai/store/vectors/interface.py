@@ -20,6 +20,9 @@ class BaseVectorDB(ABC):
         metadata: dict,
     ): ...
 
+    @abstractmethod
+    def delete_points(self, collection_name: str, ids: list[str]): ...
+
     @abstractmethod
     def semantic_search(
         self, collection_name: str, vectors: list[float], top_k: int
@@ -21,6 +21,10 @@ class ChromaDB(BaseVectorDB):
         collection = self.client.get_collection(name=collection_name)
         collection.add(ids=ids, embeddings=embeddings, metadatas=metadata)
 
+    def delete_points(self, collection_name, ids):
+        collection = self.client.get_collection(name=collection_name)
+        collection.delete(ids=ids)
+
     def semantic_search(self, collection_name, vector, top_k):
         collection = self.client.get_collection(name=collection_name)
         results = collection.query(query_embeddings=vector, n_results=top_k)
@@ -29,6 +29,13 @@ class QdrantDB(BaseVectorDB):
         ]
         self.client.upsert(collection_name=collection_name, points=points, wait=True)
 
+    def delete_points(self, collection_name, ids):
+        self.client.delete(
+            collection_name=collection_name,
+            points_selector=models.PointIdsList(points=ids),
+            wait=True,
+        )
+
     def semantic_search(self, collection_name, vectors, top_k):
         nearest = self.qdrant_client.query_batch_points(
             collection_name=collection_name,